@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+User = get_user_model()
+
+USER_KEY = 'auth:user:{}'
+
+
+def forget_user(user_id):
+    cache.delete(USER_KEY.format(user_id))
+
+
+def cached_user(user_id):
+    key = USER_KEY.format(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User._default_manager.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """Пользователь из сессии берётся из кеша; запись сбрасывается
+    сигналами при любом изменении строки auth_user."""
+
+    def get_user(self, user_id):
+        user = cached_user(user_id)
+        if user is None or not self.user_can_authenticate(user):
+            return None
+        return user
@@ -0,0 +1,71 @@
+"""Кеш, хранилище и бэкенд миниатюр с метриками и трассировкой."""
+import fcntl
+import os
+import pickle
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends import filebased, locmem
+from django.core.files import storage
+from sorl.thumbnail import base
+
+from .metrics import MeteredCacheMixin, MeteredThumbnailMixin
+from .tracing import (
+    TracedCacheMixin, TracedStorageMixin, TracedThumbnailMixin,
+)
+
+
+class LocMemCache(MeteredCacheMixin, TracedCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class AtomicFileBasedCache(filebased.FileBasedCache):
+    """Файловый кеш, в котором add, incr и decr атомарны между
+    процессами: они выполняются под flock по служебному файлу каталога.
+    incr сохраняет срок жизни ключа, как LocMemCache."""
+    lock_name = 'atomic.lock'
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        with open(os.path.join(self._dir, self.lock_name), 'ab') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def add(self, key, *args, **kwargs):
+        with self._locked():
+            return super().add(key, *args, **kwargs)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        with self._locked():
+            try:
+                with open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except (FileNotFoundError, EOFError):
+                expiry = 0
+            if expiry is not None and expiry < time.time():
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            timeout = None if expiry is None else expiry - time.time()
+            self.set(key, value, timeout, version)
+            return value
+
+
+class FileBasedCache(MeteredCacheMixin, TracedCacheMixin,
+                     AtomicFileBasedCache):
+    pass
+
+
+class FileSystemStorage(TracedStorageMixin, storage.FileSystemStorage):
+    pass
+
+
+class ThumbnailBackend(MeteredThumbnailMixin, TracedThumbnailMixin,
+                       base.ThumbnailBackend):
+    pass
@@ -0,0 +1,185 @@
+"""Очередь фоновых задач в основной базе.
+
+enqueue() сохраняет задачу строкой Job в той же транзакции основной
+базы, что и данные, поэтому задача не теряется и не выполняется раньше
+коммита. Для данных из другой базы (шарда постов) общей транзакции нет:
+с using=<база> задача записывается после коммита в этой базе. Раньше
+коммита она не выполнится, но при падении процесса между коммитом и
+записью задачи потеряется.
+Команда runworker забирает готовые задачи и выполняет их в пуле
+потоков или процессов. Захват строки -- условный UPDATE (или SELECT ...
+FOR UPDATE SKIP LOCKED, если база умеет): второй обработчик ту же
+строку не получит. Захват действует JOB_LEASE секунд, после чего
+задачу упавшего обработчика берёт другой. Неудачная задача повторяется
+с экспоненциальной задержкой, пока не исчерпаны попытки.
+
+Ключ dedup_key уникален, пока задача не завершена: повторный enqueue
+с тем же ключом вернёт уже стоящую в очереди задачу. Число
+одновременно выполняемых задач каждой очереди ограничено JOB_QUEUES
+для всех обработчиков вместе. Периодические задачи из JOB_SCHEDULE
+ставятся обработчиком с ключом schedule:<имя>.
+"""
+import json
+import logging
+import os
+import socket
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, connection, router, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger('yatube.jobs')
+
+WORKER_ID = f'{socket.gethostname()}:{os.getpid()}'
+
+
+def task_path(task):
+    if isinstance(task, str):
+        return task
+    return f'{task.__module__}.{task.__qualname__}'
+
+
+def enqueue(task, args=(), kwargs=None, *, queue='default', run_at=None,
+            delay=None, dedup_key=None, max_attempts=None, using=None):
+    """Ставит вызов task(*args, **kwargs) в очередь. task -- функция
+    уровня модуля или её путь; аргументы должны сериализоваться в
+    JSON. using -- база, где записаны данные задачи: если это не база
+    очереди, задача ставится после коммита в ней и возвращается None."""
+    if queue not in settings.JOB_QUEUES:
+        raise ValueError(f'Неизвестная очередь {queue}')
+    if using is not None and using != router.db_for_write(Job):
+        transaction.on_commit(partial(
+            enqueue, task, args, kwargs, queue=queue, run_at=run_at,
+            delay=delay, dedup_key=dedup_key, max_attempts=max_attempts,
+        ), using=using)
+        return None
+    if run_at is None:
+        run_at = timezone.now()
+    if delay is not None:
+        run_at += timedelta(seconds=delay)
+    job = Job(
+        queue=queue, task=task_path(task),
+        payload=json.dumps({'args': list(args), 'kwargs': kwargs or {}}),
+        run_at=run_at, dedup_key=dedup_key,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    if dedup_key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        return Job.objects.get(dedup_key=dedup_key)
+    return job
+
+
+def retry_delay(attempts):
+    seconds = settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return timedelta(seconds=seconds)
+
+
+def _ready(queue, now):
+    """Готовые задачи очереди и задачи с истёкшим захватом."""
+    return Job.objects.filter(
+        Q(status=Job.QUEUED, run_at__lte=now)
+        | Q(status=Job.RUNNING, locked_until__lt=now),
+        queue=queue,
+    ).order_by('run_at')
+
+
+def _running(queue, now):
+    return Job.objects.filter(
+        queue=queue, status=Job.RUNNING, locked_until__gte=now).count()
+
+
+def claim(queue, limit, worker_id=WORKER_ID):
+    """Захватывает до limit задач очереди с учётом общего лимита
+    JOB_QUEUES[queue]. Возвращает id захваченных задач."""
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.JOB_LEASE)
+    with transaction.atomic():
+        free = settings.JOB_QUEUES[queue] - _running(queue, now)
+        if free <= 0 or limit <= 0:
+            return []
+        ready = _ready(queue, now)
+        if connection.features.has_select_for_update_skip_locked:
+            ids = list(ready.select_for_update(skip_locked=True)
+                       .values_list('id', flat=True)[:min(free, limit)])
+            Job.objects.filter(id__in=ids).update(
+                status=Job.RUNNING, locked_by=worker_id,
+                locked_until=lease, attempts=F('attempts') + 1)
+            return ids
+        claimed = []
+        for job_id, status, locked_until in ready.values_list(
+                'id', 'status', 'locked_until')[:min(free, limit)]:
+            # Строка захвачена, только если не изменилась с момента
+            # чтения.
+            if Job.objects.filter(
+                id=job_id, status=status, locked_until=locked_until,
+            ).update(status=Job.RUNNING, locked_by=worker_id,
+                     locked_until=lease, attempts=F('attempts') + 1):
+                claimed.append(job_id)
+        return claimed
+
+
+def run(job_id):
+    """Выполняет захваченную задачу и записывает результат. Возвращает
+    новый статус задачи."""
+    job = Job.objects.get(id=job_id)
+    payload = json.loads(job.payload)
+    try:
+        import_string(job.task)(*payload['args'], **payload['kwargs'])
+    except Exception as error:
+        logger.exception('Задача %s (%s) упала', job.pk, job.task)
+        job.last_error = repr(error)
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + retry_delay(job.attempts)
+        else:
+            job.status = Job.FAILED
+            job.finished = timezone.now()
+            job.dedup_key = None
+    else:
+        job.status = Job.DONE
+        job.finished = timezone.now()
+        job.dedup_key = None
+        job.last_error = ''
+    job.locked_by = ''
+    job.locked_until = None
+    job.save(update_fields=[
+        'status', 'run_at', 'finished', 'dedup_key', 'last_error',
+        'locked_by', 'locked_until',
+    ])
+    return job.status
+
+
+def schedule_periodic(now=None):
+    """Ставит периодические задачи JOB_SCHEDULE, которых нет в очереди,
+    на начало следующего периода."""
+    now = now or timezone.now()
+    for name, entry in settings.JOB_SCHEDULE.items():
+        key = f'schedule:{name}'
+        if Job.objects.filter(dedup_key=key).exists():
+            continue
+        every = entry['every']
+        start = (now.timestamp() // every + 1) * every
+        enqueue(
+            entry['task'], entry.get('args', ()), entry.get('kwargs'),
+            queue=entry.get('queue', 'default'), dedup_key=key,
+            run_at=now + timedelta(seconds=start - now.timestamp()),
+        )
+
+
+def purge(older_than):
+    """Удаляет завершённые задачи старше older_than."""
+    return Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        finished__lt=timezone.now() - older_than,
+    ).delete()[0]
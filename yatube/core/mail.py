@@ -0,0 +1,131 @@
+"""Отправка почты через очередь в базе.
+
+QueuedEmailBackend только сохраняет письма в QueuedEmail, поэтому сброс
+пароля и другие формы не ждут SMTP. Команда send_queued_mail отправляет
+их пачками через одно соединение EMAIL_DELIVERY_BACKEND; неудачная
+попытка повторяется с экспоненциальной задержкой, пока не исчерпано
+EMAIL_MAX_ATTEMPTS. Та же отправка ставится задачей в очередь mail
+(core.jobs), так что её выполняет и runworker.
+"""
+import base64
+import json
+from datetime import timedelta
+from email import message_from_bytes
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.utils import timezone
+
+from .jobs import enqueue
+from .models import QueuedEmail
+
+FIELDS = ('subject', 'body', 'from_email', 'to', 'cc', 'bcc', 'reply_to',
+          'extra_headers')
+
+
+def _encode(content):
+    if isinstance(content, str):
+        content = content.encode()
+    return base64.b64encode(content).decode()
+
+
+def _load_mime(raw):
+    """Восстанавливает вложение MIMEBase из байтов as_bytes()."""
+    parsed = message_from_bytes(base64.b64decode(raw))
+    part = MIMEBase(parsed.get_content_maintype(),
+                    parsed.get_content_subtype())
+    for header in list(part.keys()):
+        del part[header]
+    for header, value in parsed.items():
+        part[header] = value
+    part.set_payload(parsed.get_payload())
+    return part
+
+
+def dump_message(message):
+    payload = {field: getattr(message, field) for field in FIELDS}
+    payload['alternatives'] = list(getattr(message, 'alternatives', []))
+    payload['attachments'] = []
+    for attachment in message.attachments:
+        if isinstance(attachment, MIMEBase):
+            payload['attachments'].append(
+                {'mime': _encode(attachment.as_bytes())})
+            continue
+        filename, content, mimetype = attachment
+        payload['attachments'].append(
+            [filename, _encode(content), mimetype])
+    return json.dumps(payload)
+
+
+def load_message(payload, connection=None):
+    data = json.loads(payload)
+    alternatives = data.pop('alternatives')
+    attachments = data.pop('attachments')
+    data['headers'] = data.pop('extra_headers')
+    message = EmailMultiAlternatives(
+        connection=connection, alternatives=alternatives, **data)
+    for attachment in attachments:
+        if isinstance(attachment, dict):
+            message.attach(_load_mime(attachment['mime']))
+            continue
+        filename, content, mimetype = attachment
+        message.attach(filename, base64.b64decode(content), mimetype)
+    return message
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        queued = QueuedEmail.objects.bulk_create([
+            QueuedEmail(payload=dump_message(message))
+            for message in email_messages if message.recipients()
+        ])
+        if queued:
+            enqueue(send_queued, [settings.EMAIL_BATCH_SIZE],
+                    queue='mail', dedup_key='mail:send')
+        return len(queued)
+
+
+def retry_delay(attempts):
+    seconds = settings.EMAIL_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return timedelta(seconds=seconds)
+
+
+def _claim(email, now):
+    """Переносит следующую попытку вперёд, чтобы параллельный
+    обработчик не взял то же письмо."""
+    return QueuedEmail.objects.filter(
+        pk=email.pk, next_attempt=email.next_attempt, sent__isnull=True,
+    ).update(next_attempt=now + retry_delay(email.attempts + 1))
+
+
+def send_queued(batch_size):
+    """Отправляет до batch_size готовых писем. Возвращает пару
+    (отправлено, неудачно)."""
+    now = timezone.now()
+    emails = list(QueuedEmail.objects.filter(
+        sent__isnull=True, next_attempt__lte=now,
+        attempts__lt=settings.EMAIL_MAX_ATTEMPTS,
+    )[:batch_size])
+    emails = [email for email in emails if _claim(email, now)]
+    if not emails:
+        return 0, 0
+    sent = failed = 0
+    with get_connection(settings.EMAIL_DELIVERY_BACKEND) as connection:
+        for email in emails:
+            email.attempts += 1
+            try:
+                connection.send_messages([load_message(email.payload)])
+            except Exception as error:
+                email.last_error = repr(error)
+                email.next_attempt = timezone.now() + retry_delay(
+                    email.attempts)
+                failed += 1
+            else:
+                email.sent = timezone.now()
+                email.last_error = ''
+                sent += 1
+            email.save(update_fields=[
+                'attempts', 'next_attempt', 'sent', 'last_error'])
+    return sent, failed
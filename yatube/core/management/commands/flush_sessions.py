@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.sessions import flush_dirty_sessions
+
+
+class Command(BaseCommand):
+    help = 'Переносит изменённые в кеше сессии в базу.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = flush_dirty_sessions()
+            self.stdout.write(f'Записано сессий: {flushed}')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,90 @@
+import os
+import signal
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.memory import growth, reports
+
+
+def _megabytes(size):
+    return f'{size / 1024 / 1024:.1f} МБ' if size is not None else '?'
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает снимки tracemalloc рабочих процессов с первым '
+            'снимком и показывает размер LocMemCache по префиксам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.MEMORY_DIR)
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument(
+            '--group-by', choices=('lineno', 'filename', 'traceback'),
+            default='lineno',
+        )
+        parser.add_argument(
+            '--refresh', type=float, default=0, metavar='SECONDS',
+            help='Попросить процессы снять свежий снимок (SIGUSR1) и '
+                 'ждать его не дольше SECONDS.',
+        )
+
+    def handle(self, *args, **options):
+        directory = options['dir']
+        if not os.path.isdir(directory) or not reports(directory):
+            raise CommandError(f'В {directory} нет отчётов о памяти')
+        if options['refresh']:
+            self.refresh(directory, options['refresh'])
+        for report in reports(directory):
+            self.show(directory, report, options)
+
+    def refresh(self, directory, timeout):
+        requested = {}
+        for report in reports(directory):
+            try:
+                os.kill(report['pid'], signal.SIGUSR1)
+            except ProcessLookupError:
+                continue
+            requested[report['pid']] = report['time']
+        deadline = time.monotonic() + timeout
+        while requested and time.monotonic() < deadline:
+            time.sleep(0.1)
+            for report in reports(directory):
+                if report['time'] > requested.get(report['pid'], 1e20):
+                    del requested[report['pid']]
+        for pid in requested:
+            self.stderr.write(f'Процесс {pid} не обновил снимок')
+
+    def show(self, directory, report, options):
+        pid = report['pid']
+        try:
+            os.kill(pid, 0)
+            state = ''
+        except ProcessLookupError:
+            state = ' (процесс завершён)'
+        age = time.time() - report['time']
+        self.stdout.write(
+            f'Процесс {pid}{state}: RSS {_megabytes(report["rss"])}, '
+            f'tracemalloc {_megabytes(report["traced"])} '
+            f'(пик {_megabytes(report["traced_peak"])}), '
+            f'снимок {age:.0f} с назад')
+        baseline, latest = (
+            os.path.join(directory, f'{pid}.{name}.snapshot')
+            for name in ('baseline', 'latest'))
+        if os.path.exists(baseline) and os.path.exists(latest):
+            self.stdout.write('  Рост с первого снимка:')
+            for stat in growth(
+                    tracemalloc.Snapshot.load(baseline),
+                    tracemalloc.Snapshot.load(latest),
+                    options['group_by'], options['top']):
+                self.stdout.write(
+                    f'    +{stat["size_diff"] / 1024:.1f} КБ '
+                    f'({stat["count_diff"]:+d} блоков) {stat["site"]}')
+        for name, prefixes in report['locmem'].items():
+            total = sum(size for count, size in prefixes.values())
+            self.stdout.write(f'  LocMemCache {name}: {total / 1024:.1f} КБ')
+            ranked = sorted(prefixes.items(), key=lambda item: -item[1][1])
+            for prefix, (count, size) in ranked[:options['top']]:
+                self.stdout.write(
+                    f'    {prefix}: {count} ключей, {size / 1024:.1f} КБ')
@@ -0,0 +1,60 @@
+import glob
+import os
+import pstats
+from collections import Counter
+from io import StringIO
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import profile_token, read_collapsed, write_collapsed
+
+
+class Command(BaseCommand):
+    help = 'Сводит профили cProfile всех процессов и показывает топ функций.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.CPROFILE_DIR)
+        parser.add_argument(
+            '--url-name', help='Только профили этого маршрута.')
+        parser.add_argument('--top', type=int, default=25)
+        parser.add_argument(
+            '--sort', default='cumulative',
+            help='Ключ сортировки pstats: cumulative, tottime, ncalls.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Куда записать сводный .prof; рядом пишется .collapsed.',
+        )
+        parser.add_argument(
+            '--token', action='store_true',
+            help='Напечатать значение заголовка X-Profile и выйти.',
+        )
+
+    def handle(self, *args, **options):
+        if options['token']:
+            self.stdout.write(profile_token())
+            return
+        name = (options['url_name'] or '*').replace(':', '-')
+        pattern = os.path.join(options['dir'], f'{name}.*.prof')
+        paths = sorted(glob.glob(pattern))
+        if not paths:
+            raise CommandError(f'В {options["dir"]} нет профилей')
+        # OutputWrapper добавляет перевод строки к каждому write, а pstats
+        # печатает кусками, поэтому таблица собирается в буфер.
+        report = StringIO()
+        stats = pstats.Stats(*paths, stream=report)
+        self.stdout.write(
+            f'Файлов: {len(paths)}, вызовов: {stats.total_calls}, '
+            f'время: {stats.total_tt:.3f} с')
+        stats.sort_stats(options['sort']).print_stats(options['top'])
+        self.stdout.write(report.getvalue(), ending='')
+        if options['output']:
+            stats.dump_stats(options['output'])
+            collapsed = os.path.splitext(options['output'])[0] + '.collapsed'
+            stacks = Counter()
+            for path in paths:
+                stacks.update(
+                    read_collapsed(os.path.splitext(path)[0] + '.collapsed'))
+            write_collapsed(stacks, collapsed)
+            self.stdout.write(f'Записаны {options["output"]} и {collapsed}')
@@ -0,0 +1,111 @@
+import signal
+import time
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+from core.jobs import WORKER_ID, claim, run, schedule_periodic
+
+
+def execute(job_id):
+    close_old_connections()
+    try:
+        return run(job_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди Job.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queues', help='Очереди через запятую; по умолчанию все.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--pool', choices=('thread', 'process'), default='thread')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти.',
+        )
+        parser.add_argument(
+            '--no-schedule', action='store_true',
+            help='Не ставить периодические задачи JOB_SCHEDULE.',
+        )
+
+    def handle(self, *args, **options):
+        queues = self.get_queues(options['queues'])
+        concurrency = max(options['concurrency'], 1)
+        executor = self.get_executor(options['pool'], concurrency)
+        self.stopping = False
+        if not options['once']:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+        statuses = []
+        running = set()
+        try:
+            self.poll(queues, concurrency, executor, options, statuses,
+                      running)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+                statuses += [future.result() for future in running]
+        self.stdout.write(
+            f'Выполнено задач: {statuses.count("done")}, '
+            f'с ошибкой: {statuses.count("failed")}, '
+            f'отложено: {statuses.count("queued")}')
+
+    def get_queues(self, names):
+        queues = names.split(',') if names else list(settings.JOB_QUEUES)
+        unknown = set(queues) - set(settings.JOB_QUEUES)
+        if unknown:
+            raise CommandError(f'Неизвестные очереди: {", ".join(unknown)}')
+        return queues
+
+    def get_executor(self, pool, concurrency):
+        """Пул для задач; None -- выполнять в главном потоке."""
+        if pool == 'thread' and concurrency == 1:
+            return None
+        if pool == 'thread':
+            return ThreadPoolExecutor(concurrency)
+        # Дочерние процессы не должны наследовать открытые соединения.
+        connections.close_all()
+        return ProcessPoolExecutor(concurrency, initializer=django.setup)
+
+    def poll(self, queues, concurrency, executor, options, statuses,
+             running):
+        """Забирает и выполняет задачи, пока не придёт сигнал (или, с
+        --once, пока готовые задачи не кончатся). Статусы выполненных
+        задач дописываются в statuses, незавершённые остаются в
+        running."""
+        while not self.stopping:
+            if not options['no_schedule']:
+                schedule_periodic()
+            done = {future for future in running if future.done()}
+            statuses += [future.result() for future in done]
+            running -= done
+            claimed = []
+            for queue in queues:
+                claimed += claim(
+                    queue, concurrency - len(running) - len(claimed),
+                    WORKER_ID)
+            if executor is None:
+                statuses += [run(job_id) for job_id in claimed]
+            else:
+                running |= {executor.submit(execute, job_id)
+                            for job_id in claimed}
+            if claimed:
+                continue
+            if options['once'] and not running:
+                break
+            if running:
+                wait(running, settings.JOB_POLL_INTERVAL, FIRST_COMPLETED)
+            else:
+                time.sleep(settings.JOB_POLL_INTERVAL)
+
+    def stop(self, signum, frame):
+        self.stopping = True
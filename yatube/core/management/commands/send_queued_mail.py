@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.mail import send_queued
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди через одно соединение.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.EMAIL_BATCH_SIZE)
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                sent, failed = send_queued(options['batch_size'])
+            except Exception as error:
+                if not options['interval']:
+                    raise
+                self.stderr.write(f'Почтовый сервер недоступен: {error!r}')
+                sent = failed = 0
+            if sent or failed or not options['interval']:
+                self.stdout.write(
+                    f'Отправлено писем: {sent}, неудачно: {failed}')
+            if not options['interval']:
+                break
+            if sent < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,59 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.slow_queries import read_entries
+
+SORT_KEYS = {
+    'total': lambda shape: shape['total'],
+    'count': lambda shape: shape['count'],
+    'max': lambda shape: shape['max'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Ранжирует формы медленных запросов из журнала.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', default=settings.SLOW_QUERY_LOG)
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument(
+            '--sort', choices=sorted(SORT_KEYS), default='total',
+            help='Суммарное время, число или худшее время запроса.',
+        )
+        parser.add_argument('--url-name', help='Только этот маршрут.')
+
+    def handle(self, *args, **options):
+        shapes = defaultdict(lambda: {
+            'count': 0, 'total': 0.0, 'max': 0.0,
+            'sources': Counter(), 'params': Counter(),
+        })
+        for entry in read_entries(options['log']):
+            if options['url_name'] and (
+                    entry['url_name'] != options['url_name']):
+                continue
+            shape = shapes[entry['sql']]
+            shape['count'] += 1
+            shape['total'] += entry['duration_ms']
+            shape['max'] = max(shape['max'], entry['duration_ms'])
+            shape['params'][entry['params']] += 1
+            shape['sources'][
+                entry['url_name'] or '-',
+                entry['frame'] or entry['template'] or '-',
+            ] += 1
+        if not shapes:
+            raise CommandError(f'В {options["log"]} нет записей')
+        ranked = sorted(shapes.items(), key=lambda item: -SORT_KEYS[
+            options['sort']](item[1]))
+        for place, (sql, shape) in enumerate(ranked[:options['top']], 1):
+            self.stdout.write(
+                f'{place}. {shape["total"]:.1f} мс всего, '
+                f'{shape["count"]} раз, худший {shape["max"]:.1f} мс, '
+                f'в среднем {shape["total"] / shape["count"]:.1f} мс')
+            self.stdout.write(f'   {sql}')
+            params, count = shape['params'].most_common(1)[0]
+            self.stdout.write(f'   параметры: {params or "-"}')
+            for (url_name, source), count in (
+                    shape['sources'].most_common(3)):
+                self.stdout.write(f'   {url_name} {source} x{count}')
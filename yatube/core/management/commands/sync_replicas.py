@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.replication import replica_lag, sync_replica
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует primary SQLite в локальные реплики из DATABASE_REPLICAS. '
+        'Алиасы реплик в DATABASES должны указывать TEST: '
+        '{"MIRROR": "default"}.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять синхронизацию каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for alias in settings.DATABASE_REPLICAS:
+                lag = replica_lag(alias)
+                sync_replica(alias)
+                self.stdout.write(f'{alias}: синхронизирована, '
+                                  f'отставание было {lag}')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,159 @@
+"""Диагностика роста памяти рабочих процессов.
+
+Включается MEMORY_DIAGNOSTICS: процесс запускает tracemalloc и раз в
+MEMORY_SNAPSHOT_INTERVAL секунд (или по SIGUSR1) сохраняет в MEMORY_DIR
+снимок <pid>.latest.snapshot и отчёт <pid>.json: RSS, объём
+отслеживаемой памяти, места с наибольшим ростом с прошлого снимка и
+размер LocMemCache по префиксам ключей. Первый снимок остаётся как
+<pid>.baseline.snapshot; команда memory_report сравнивает с ним
+последний. tracemalloc замедляет выделение памяти в разы, поэтому
+включать диагностику стоит на одном-двух процессах.
+"""
+import json
+import os
+import re
+import signal
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache.backends import locmem
+
+KEY_VERSION = re.compile(r'^[^:]*:\d+:')
+IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_wake = threading.Event()
+_lock = threading.Lock()
+_previous = None
+
+
+def key_prefix(key):
+    """Начало ключа до первой части с цифрами: 'feed:count:12' ->
+    'feed:count'."""
+    parts = []
+    for part in re.split(r'[:.]', KEY_VERSION.sub('', key)):
+        if not part or any(char.isdigit() for char in part):
+            break
+        parts.append(part)
+        if len(parts) == 4:
+            break
+    return ':'.join(parts) or '(other)'
+
+
+def locmem_usage():
+    """{имя кеша: {префикс: [ключей, байт]}} по всем LocMemCache
+    процесса. Значения хранятся в pickle, их длина и есть размер."""
+    usage = {}
+    for name, entries in list(locmem._caches.items()):
+        with locmem._locks[name]:
+            items = list(entries.items())
+        prefixes = defaultdict(lambda: [0, 0])
+        for key, pickled in items:
+            stats = prefixes[key_prefix(key)]
+            stats[0] += 1
+            stats[1] += len(key) + len(pickled)
+        usage[name or 'default'] = dict(prefixes)
+    return usage
+
+
+def rss():
+    """Текущий RSS в байтах или None вне Linux."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+def growth(old, new, key_type='lineno', limit=10):
+    return [
+        {
+            'site': str(stat.traceback),
+            'size_diff': stat.size_diff,
+            'size': stat.size,
+            'count_diff': stat.count_diff,
+        }
+        for stat in new.compare_to(old, key_type)[:limit]
+        if stat.size_diff > 0
+    ]
+
+
+def _path(name, pid=None):
+    return os.path.join(
+        settings.MEMORY_DIR, f'{pid or os.getpid()}.{name}')
+
+
+def take_snapshot():
+    """Сохраняет снимок и отчёт текущего процесса."""
+    global _previous
+    with _lock:
+        snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED)
+        os.makedirs(settings.MEMORY_DIR, exist_ok=True)
+        if _previous is None:
+            snapshot.dump(_path('baseline.snapshot'))
+            grown = []
+        else:
+            grown = growth(_previous, snapshot,
+                           limit=settings.MEMORY_REPORT_TOP)
+        snapshot.dump(_path('latest.snapshot'))
+        _previous = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        report = {
+            'pid': os.getpid(),
+            'time': time.time(),
+            'rss': rss(),
+            'traced': current,
+            'traced_peak': peak,
+            'growth': grown,
+            'locmem': locmem_usage(),
+        }
+        partial = _path('json.tmp')
+        with open(partial, 'w') as output:
+            json.dump(report, output, ensure_ascii=False)
+        os.replace(partial, _path('json'))
+        return report
+
+
+def _run(interval):
+    while True:
+        _wake.wait(interval)
+        _wake.clear()
+        take_snapshot()
+
+
+def start():
+    """Запускает tracemalloc и поток снимков. Вызывается в wsgi.py
+    основного потока, где можно поставить обработчик SIGUSR1."""
+    if tracemalloc.is_tracing():
+        return
+    tracemalloc.start(settings.MEMORY_TRACEBACK_FRAMES)
+    take_snapshot()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: _wake.set())
+    threading.Thread(
+        target=_run, args=(settings.MEMORY_SNAPSHOT_INTERVAL,),
+        name='memory-snapshots', daemon=True,
+    ).start()
+
+
+def stop():
+    global _previous
+    tracemalloc.stop()
+    _previous = None
+
+
+def reports(directory):
+    """Отчёты всех процессов, сохранивших их в directory."""
+    found = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as report:
+                found.append(json.load(report))
+    return found
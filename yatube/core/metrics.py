@@ -0,0 +1,375 @@
+"""Метрики приложения в формате Prometheus без внешних зависимостей.
+
+Каждый рабочий процесс пишет свои значения в собственный файл
+<pid>.db в METRICS_DIR, отображённый в память через mmap: запись --
+обновление восьми байт без блокировок и системных вызовов. Страница
+/metrics читает файлы всех процессов и складывает значения. Файлы
+завершившихся процессов остаются, чтобы счётчики не уменьшались;
+каталог очищается при выкладке.
+
+Файл: 8 байт -- занятый объём, затем записи: длина ключа (4 байта),
+ключ в UTF-8 с выравниванием до 8 байт и значение double. Занятый объём
+обновляется после записи, поэтому читатель видит только целые записи.
+"""
+import bisect
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+REQUEST_SECONDS = 'yatube_request_duration_seconds'
+RESPONSES = 'yatube_responses_total'
+DB_QUERIES = 'yatube_db_queries_total'
+DB_SECONDS = 'yatube_db_query_seconds_total'
+TEMPLATE_SECONDS = 'yatube_template_render_seconds'
+CACHE_REQUESTS = 'yatube_cache_requests_total'
+THUMBNAIL_SECONDS = 'yatube_thumbnail_seconds'
+
+METRICS = {
+    REQUEST_SECONDS: ('histogram', 'Время ответа по имени маршрута.'),
+    RESPONSES: ('counter', 'Ответы по имени маршрута и классу статуса.'),
+    DB_QUERIES: ('counter', 'Запросы к базе по имени маршрута.'),
+    DB_SECONDS: ('counter', 'Время запросов к базе по имени маршрута.'),
+    TEMPLATE_SECONDS: ('histogram', 'Время рендера шаблонов страницы.'),
+    CACHE_REQUESTS: ('counter', 'Чтения из кеша: попадания и промахи.'),
+    THUMBNAIL_SECONDS: ('histogram', 'Время создания миниатюр sorl.'),
+}
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+URLCONFS = ('posts.urls', 'users.urls', 'about.urls')
+OTHER = 'other'
+
+_INITIAL_SIZE = 64 * 1024
+_USED = struct.Struct('i4x')
+_LENGTH = struct.Struct('i')
+_VALUE = struct.Struct('d')
+
+_lock = threading.Lock()
+_state = threading.local()
+_files = {}
+_view_names = None
+_original_render = None
+_MISSING = object()
+
+
+def _padded(length):
+    return length + (-length) % 8
+
+
+class MmapValues:
+    """Значения одного процесса в файле path."""
+
+    def __init__(self, path):
+        self.path = path
+        exists = os.path.exists(path)
+        self._file = open(path, 'a+b')
+        if not exists or os.path.getsize(path) < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = _USED.unpack_from(self._map, 0)[0] or _USED.size
+        self._offsets = {
+            key: offset for key, value, offset in _entries(self._map)}
+
+    def _append(self, key):
+        encoded = key.encode()
+        size = _padded(_LENGTH.size + len(encoded)) + _VALUE.size
+        if self._used + size > len(self._map):
+            capacity = len(self._map)
+            while self._used + size > capacity:
+                capacity *= 2
+            self._map.close()
+            self._file.truncate(capacity)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        _LENGTH.pack_into(self._map, self._used, len(encoded))
+        self._map[self._used + _LENGTH.size:
+                  self._used + _LENGTH.size + len(encoded)] = encoded
+        offset = self._used + size - _VALUE.size
+        _VALUE.pack_into(self._map, offset, 0.0)
+        self._used += size
+        _USED.pack_into(self._map, 0, self._used)
+        self._offsets[key] = offset
+        return offset
+
+    def inc(self, key, amount):
+        with _lock:
+            offset = self._offsets.get(key)
+            if offset is None:
+                offset = self._append(key)
+            value = _VALUE.unpack_from(self._map, offset)[0]
+            _VALUE.pack_into(self._map, offset, value + amount)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _entries(data):
+    used = _USED.unpack_from(data, 0)[0]
+    position = _USED.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        start = position + _LENGTH.size
+        key = bytes(data[start:start + length]).decode()
+        offset = position + _padded(_LENGTH.size + length)
+        yield key, _VALUE.unpack_from(data, offset)[0], offset
+        position = offset + _VALUE.size
+
+
+def _values():
+    """Файл текущего процесса; после fork открывается новый."""
+    path = os.path.join(settings.METRICS_DIR, f'{os.getpid()}.db')
+    values = _files.get(path)
+    if values is None:
+        with _lock:
+            values = _files.get(path)
+            if values is None:
+                os.makedirs(settings.METRICS_DIR, exist_ok=True)
+                values = _files[path] = MmapValues(path)
+    return values
+
+
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+def inc(name, labels=None, amount=1):
+    if settings.METRICS_ENABLED:
+        _values().inc(_key(name, labels or {}), amount)
+
+
+def observe(name, seconds, labels=None):
+    """Наблюдение гистограммы. Хранится только корзина, в которую оно
+    попало; накопительные значения считаются при выводе."""
+    if not settings.METRICS_ENABLED:
+        return
+    labels = labels or {}
+    index = bisect.bisect_left(BUCKETS, seconds)
+    le = str(BUCKETS[index]) if index < len(BUCKETS) else '+Inf'
+    values = _values()
+    values.inc(_key(name + '_bucket', {**labels, 'le': le}), 1)
+    values.inc(_key(name + '_count', labels), 1)
+    values.inc(_key(name + '_sum', labels), seconds)
+
+
+def collect():
+    """Сумма значений всех процессов: {(имя, метки): значение}."""
+    totals = {}
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.db')):
+        with open(path, 'rb') as values:
+            data = values.read()
+        if len(data) < _USED.size:
+            continue
+        for key, value, offset in _entries(data):
+            name, labels = json.loads(key)
+            sample = (name, tuple(map(tuple, labels)))
+            totals[sample] = totals.get(sample, 0.0) + value
+    return totals
+
+
+def _escape(value):
+    return (value.replace('\\', r'\\').replace('\n', r'\n')
+            .replace('"', r'\"'))
+
+
+def _sample(name, labels, value):
+    if labels:
+        name += '{%s}' % ','.join(
+            f'{label}="{_escape(text)}"' for label, text in labels)
+    return f'{name} {value:.17g}' if value % 1 else f'{name} {value:.0f}'
+
+
+def _buckets(rows):
+    """Накопительные корзины всех рядов гистограммы, включая пустые."""
+    series = {}
+    for (name, labels), value in rows:
+        labels = dict(labels)
+        le = labels.pop('le')
+        counts = series.setdefault(tuple(sorted(labels.items())), {})
+        counts[le] = counts.get(le, 0.0) + value
+    lines = []
+    for labels, counts in sorted(series.items()):
+        running = 0.0
+        for le in [*map(str, BUCKETS), '+Inf']:
+            running += counts.get(le, 0.0)
+            lines.append(_sample(
+                rows[0][0][0], (*labels, ('le', le)), running))
+    return lines
+
+
+def exposition():
+    """Текст в формате Prometheus 0.0.4."""
+    samples = {}
+    for (name, labels), value in collect().items():
+        base = name.rsplit('_', 1)[0]
+        if METRICS.get(base, ('',))[0] != 'histogram':
+            base = name
+        samples.setdefault(base, []).append(((name, labels), value))
+    lines = []
+    for base in sorted(samples):
+        kind, help_text = METRICS.get(base, ('untyped', ''))
+        lines += [f'# HELP {base} {help_text}', f'# TYPE {base} {kind}']
+        rows = sorted(samples[base])
+        buckets = [row for row in rows if row[0][0].endswith('_bucket')]
+        if buckets:
+            lines += _buckets(buckets)
+        lines += [_sample(name, labels, value)
+                  for (name, labels), value in rows
+                  if not name.endswith('_bucket')]
+    return '\n'.join(lines) + '\n'
+
+
+def view_names():
+    """Имена маршрутов posts, users и about; остальные адреса
+    учитываются как other, чтобы не плодить метки."""
+    global _view_names
+    if _view_names is None:
+        from importlib import import_module
+
+        names = set()
+        for urlconf in URLCONFS:
+            module = import_module(urlconf)
+            prefix = getattr(module, 'app_name', None)
+            for pattern in module.urlpatterns:
+                if pattern.name:
+                    names.add(
+                        f'{prefix}:{pattern.name}' if prefix
+                        else pattern.name)
+        _view_names = frozenset(names)
+    return _view_names
+
+
+def _timed_render(self, context):
+    current = getattr(_state, 'current', None)
+    if current is None or current['depth']:
+        return _original_render(self, context)
+    current['depth'] += 1
+    start = perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        current['depth'] -= 1
+        current['template'] += perf_counter() - start
+
+
+def install_template_timer():
+    """Оборачивает Template.render; вложенные include и extends
+    входят во время внешнего шаблона."""
+    global _original_render
+    if _original_render is None:
+        _original_render = Template.render
+        Template.render = _timed_render
+
+
+def _count_query(execute, sql, params, many, context):
+    current = getattr(_state, 'current', None)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if current is not None:
+            current['queries'] += 1
+            current['db'] += perf_counter() - start
+
+
+def _query_counters():
+    stack = ExitStack()
+    for alias in connections:
+        stack.enter_context(
+            connections[alias].execute_wrapper(_count_query))
+    return stack
+
+
+class MetricsMiddleware:
+    """Время ответа, число и время запросов к базе и время рендера
+    шаблонов по имени маршрута. Потоковый ответ учитывается, когда
+    отдано всё тело."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_timer()
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        current = _state.current = {
+            'depth': 0, 'queries': 0, 'db': 0.0, 'template': 0.0}
+        start = perf_counter()
+        try:
+            with _query_counters():
+                response = self.get_response(request)
+        finally:
+            _state.current = None
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+        if view not in view_names():
+            view = OTHER
+        if response.streaming:
+            response.streaming_content = self._metered_stream(
+                iter(response.streaming_content), current, start, view,
+                response.status_code,
+            )
+        else:
+            _record(current, perf_counter() - start, view,
+                    response.status_code)
+        return response
+
+    @staticmethod
+    def _metered_stream(chunks, current, start, view, status):
+        try:
+            while True:
+                # Время отдачи тела и есть рендер шаблона; вложенные
+                # Template.render уже входят в него.
+                _state.current = current
+                current['depth'] += 1
+                chunk_start = perf_counter()
+                try:
+                    with _query_counters():
+                        chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    current['template'] += perf_counter() - chunk_start
+                    current['depth'] -= 1
+                    _state.current = None
+                yield chunk
+        finally:
+            _record(current, perf_counter() - start, view, status)
+
+
+def _record(current, seconds, view, status):
+    labels = {'view': view}
+    observe(REQUEST_SECONDS, seconds, labels)
+    inc(RESPONSES, {'view': view, 'status': f'{status // 100}xx'})
+    if current['queries']:
+        inc(DB_QUERIES, labels, current['queries'])
+        inc(DB_SECONDS, labels, current['db'])
+    if current['template']:
+        observe(TEMPLATE_SECONDS, current['template'], labels)
+
+
+class MeteredCacheMixin:
+    """Считает попадания и промахи get; get_many идёт через get."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        hit = value is not _MISSING
+        inc(CACHE_REQUESTS, {'result': 'hit' if hit else 'miss'})
+        return value if hit else default
+
+
+class MeteredThumbnailMixin:
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        start = perf_counter()
+        try:
+            return super()._create_thumbnail(
+                source_image, geometry_string, options, thumbnail)
+        finally:
+            observe(THUMBNAIL_SECONDS, perf_counter() - start)
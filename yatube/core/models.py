@@ -0,0 +1,56 @@
+from django.db import models
+from django.utils import timezone
+
+
+class QueuedEmail(models.Model):
+    payload = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now, db_index=True)
+    sent = models.DateTimeField(blank=True, null=True, db_index=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['next_attempt']
+
+    def __str__(self):
+        return f'Письмо {self.pk}'
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+        (FAILED, 'Ошибка'),
+    )
+
+    queue = models.CharField(max_length=50, default='default')
+    task = models.CharField(max_length=200)
+    payload = models.TextField(default='{}')
+    status = models.CharField(
+        max_length=7, choices=STATUS_CHOICES, default=QUEUED)
+    dedup_key = models.CharField(
+        max_length=200, blank=True, null=True, unique=True)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_at'],
+                         name='core_job_ready'),
+        ]
+
+    def __str__(self):
+        return f'{self.task} ({self.get_status_display()})'
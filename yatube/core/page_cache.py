@@ -0,0 +1,182 @@
+"""Общий для всех пользователей кеш страниц.
+
+cache_page хранит отдельную копию страницы на каждый набор cookie, и
+вошедшие пользователи друг с другом её не делят. Декоратор shared_page
+рендерит одну копию на адрес, а всё личное -- навигацию, кнопку
+подписки, ссылку «Редактировать», форму с CSRF-токеном -- шаблон
+выделяет тегом {% personal 'фрагмент.html' имя=значение %}. В общей
+копии на месте тега остаётся метка с именем фрагмента и аргументами,
+и перед отдачей каждая метка заменяется фрагментом, отрендеренным для
+текущего пользователя. Фрагменты получают аргументы, контекст запроса
+и маленький личный контекст из PAGE_CACHE_PERSONAL_CONTEXT, который
+кешируется на пользователя.
+
+Копии сбрасываются по областям: scopes=('user:{username}',) -- это
+строки формата по аргументам вью, их версии входят в ключ страницы,
+и invalidate() меняет версию области. Области содержат имена
+пользователей, поэтому в ключ кеша идёт md5 области. Без областей копия
+живёт до тайм-аута.
+
+Сами копии и личный контекст лежат в кеше процесса, а версии областей
+-- в общем кеше shared: сброс в одном процессе или в команде меняет
+ключи копий во всех процессах. Личный контекст версионируется так же,
+областью personal:{id пользователя}.
+"""
+import hashlib
+import re
+import uuid
+from functools import wraps
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template import loader
+from django.utils.cache import patch_cache_control
+from django.utils.module_loading import import_string
+from django.utils.safestring import SafeData, mark_safe
+
+PAGE_KEY = 'page:{}:{}'
+SCOPE_KEY = 'page:scope:{}'
+PERSONAL_KEY = 'page:personal:{}:{}'
+
+# Текст страниц экранируется, поэтому «<!--» в нём бывает только от тега
+# personal. Безопасные значения (SafeData) помечены «!» перед именем.
+MARKER = re.compile(r'<!--personal ([\w./-]+) ([^\s<>]*)-->')
+
+
+def marker(template_name, args):
+    return '<!--personal {} {}-->'.format(template_name, urlencode([
+        ('!' + name if isinstance(value, SafeData) else name, str(value))
+        for name, value in args.items()
+    ]))
+
+
+def _args(query):
+    args = {}
+    for name, value in parse_qsl(query, keep_blank_values=True):
+        if name.startswith('!'):
+            name, value = name[1:], mark_safe(value)
+        args[name] = value
+    return args
+
+
+def is_shared(request):
+    return getattr(request, 'shared_page', False)
+
+
+def forget_personal(user_id):
+    invalidate(f'personal:{user_id}')
+
+
+def personal_context(user):
+    """Личный контекст фрагментов. У анонима он пуст и не кешируется."""
+    if not user.is_authenticated:
+        return {}
+    key = PERSONAL_KEY.format(_versions([f'personal:{user.pk}']), user.pk)
+    context = cache.get(key)
+    if context is None:
+        context = import_string(settings.PAGE_CACHE_PERSONAL_CONTEXT)(user)
+        cache.set(key, context, settings.PAGE_CACHE_PERSONAL_TIMEOUT)
+    return context
+
+
+def fill(content, request):
+    """Заменяет метки в content фрагментами для пользователя запроса."""
+    personal = None
+    templates = {}
+
+    def render(match):
+        nonlocal personal
+        if personal is None:
+            personal = personal_context(request.user)
+        name = match.group(1)
+        if name not in templates:
+            templates[name] = loader.get_template(name)
+        return templates[name].render(
+            {**personal, **_args(match.group(2))}, request)
+
+    return MARKER.sub(render, content)
+
+
+def scope_key(scope):
+    return SCOPE_KEY.format(hashlib.md5(scope.encode()).hexdigest())
+
+
+def invalidate(*scopes):
+    caches['shared'].delete_many([scope_key(scope) for scope in scopes])
+
+
+def _versions(scopes):
+    keys = [scope_key(scope) for scope in scopes]
+    shared = caches['shared']
+    versions = shared.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            shared.add(key, uuid.uuid4().hex[:8], None)
+            versions[key] = shared.get(key)
+    return '.'.join(versions[key] for key in keys)
+
+
+def _filled_stream(content, request, key, content_type, timeout):
+    """Отдаёт куски потокового ответа с заполненными метками, а общую
+    копию сохраняет в кеш в конце. Метка -- один кусок вывода шаблона
+    и границу куска не пересекает."""
+    chunks = []
+    for chunk in content:
+        chunk = chunk.decode()
+        chunks.append(chunk)
+        yield fill(chunk, request)
+    cache.set(key, (content_type, ''.join(chunks)), timeout)
+
+
+def shared_page(timeout=None, scopes=()):
+    """Кеширует GET-ответ вью одной копией на адрес. timeout по
+    умолчанию -- PAGE_CACHE_TIMEOUT."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            request.shared_page = True
+            if request.user.is_authenticated:
+                # Cookie с токеном нужно выставить до заполнения формы.
+                get_token(request)
+            versions = _versions(
+                [scope.format(**kwargs) for scope in scopes])
+            digest = hashlib.md5(
+                request.get_full_path().encode()).hexdigest()
+            key = PAGE_KEY.format(versions, digest)
+            cached = cache.get(key)
+            if cached is not None:
+                content_type, content = cached
+                response = HttpResponse(
+                    fill(content, request), content_type=content_type)
+            else:
+                response = view(request, *args, **kwargs)
+                response = _store(response, request, key, timeout)
+            patch_cache_control(response, private=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def _store(response, request, key, timeout):
+    if timeout is None:
+        timeout = settings.PAGE_CACHE_TIMEOUT
+    content_type = response.get('Content-Type')
+    if response.streaming:
+        content = response.streaming_content
+        if response.status_code == 200:
+            content = _filled_stream(
+                content, request, key, content_type, timeout)
+        else:
+            content = (fill(chunk.decode(), request) for chunk in content)
+        response.streaming_content = content
+        return response
+    content = response.content.decode(response.charset)
+    if response.status_code == 200:
+        cache.set(key, (content_type, content), timeout)
+    response.content = fill(content, request)
+    return response
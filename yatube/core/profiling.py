@@ -0,0 +1,163 @@
+"""Выборочное профилирование запросов через cProfile.
+
+Профилируется доля CPROFILE_SAMPLE_RATE запросов, а также запросы с
+заголовком X-Profile, подписанным profile_token(). Профили копятся в
+памяти процесса по имени маршрута и после каждого запроса сохраняются в
+CPROFILE_DIR: <маршрут>.<pid>.prof для pstats и <маршрут>.<pid>.collapsed
+(число выборок стека раз в CPROFILE_STACK_INTERVAL) для flame graph
+(flamegraph.pl, speedscope). Тело потокового ответа
+профилируется по мере отдачи. Команда profile_report сводит файлы всех
+процессов.
+"""
+import cProfile
+import os
+import pstats
+import random
+import sys
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'core.profiling'
+HEADER = 'HTTP_X_PROFILE'
+
+_lock = threading.Lock()
+_stats = {}
+_stacks = {}
+
+
+def profile_token():
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def _has_valid_token(request):
+    token = request.META.get(HEADER)
+    if not token:
+        return False
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.CPROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class StackSampler(threading.Thread):
+    """Снимает стек профилируемого потока каждые interval секунд.
+
+    cProfile хранит только пары «вызывающий — вызываемый», и через
+    рекурсивную цепочку middleware стеки из них не восстановить, поэтому
+    для flame graph стеки собираются выборкой. Кадры выше root_code
+    (сам middleware и сервер) отбрасываются.
+    """
+
+    def __init__(self, thread_id, root_code, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.root_code = root_code
+        self.interval = interval
+        self.stacks = Counter()
+        self.running = threading.Event()
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            if self.running.is_set():
+                self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        labels = []
+        while frame is not None and frame.f_code is not self.root_code:
+            code = frame.f_code
+            labels.append(f'{os.path.basename(code.co_filename)}:'
+                          f'{code.co_firstlineno}:{code.co_name}')
+            frame = frame.f_back
+        if labels:
+            self.stacks[';'.join(reversed(labels))] += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+
+
+def write_collapsed(stacks, path):
+    with open(path, 'w') as output:
+        for key, count in sorted(stacks.items()):
+            output.write(f'{key} {count}\n')
+
+
+def read_collapsed(path):
+    stacks = Counter()
+    with open(path) as collapsed:
+        for line in collapsed:
+            key, count = line.rstrip('\n').rsplit(' ', 1)
+            stacks[key] += int(count)
+    return stacks
+
+
+def _record(name, profiler, sampler):
+    sampler.stop()
+    os.makedirs(settings.CPROFILE_DIR, exist_ok=True)
+    base = os.path.join(
+        settings.CPROFILE_DIR, f'{name.replace(":", "-")}.{os.getpid()}')
+    with _lock:
+        if name in _stats:
+            _stats[name].add(profiler)
+            _stacks[name].update(sampler.stacks)
+        else:
+            _stats[name] = pstats.Stats(profiler)
+            _stacks[name] = Counter(sampler.stacks)
+        _stats[name].dump_stats(base + '.prof')
+        write_collapsed(_stacks[name], base + '.collapsed')
+
+
+def _profiled_stream(chunks, profiler, sampler, name):
+    try:
+        while True:
+            sampler.running.set()
+            profiler.enable()
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                profiler.disable()
+                sampler.running.clear()
+            yield chunk
+    finally:
+        _record(name, profiler, sampler)
+
+
+class CProfileMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (random.random() < settings.CPROFILE_SAMPLE_RATE
+                or _has_valid_token(request)):
+            return self.get_response(request)
+        sampler = StackSampler(
+            threading.get_ident(), sys._getframe().f_code,
+            settings.CPROFILE_STACK_INTERVAL,
+        )
+        sampler.start()
+        profiler = cProfile.Profile()
+        sampler.running.set()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            sampler.running.clear()
+        match = getattr(request, 'resolver_match', None)
+        name = (match.view_name if match else None) or 'unresolved'
+        if response.streaming:
+            sampler.root_code = _profiled_stream.__code__
+            response.streaming_content = _profiled_stream(
+                iter(response.streaming_content), profiler, sampler, name)
+        else:
+            _record(name, profiler, sampler)
+        return response
@@ -0,0 +1,107 @@
+"""Ограничение частоты запросов к пишущим страницам.
+
+Для каждой страницы из RATELIMITS ведутся два token bucket: по
+пользователю (если он вошёл) и по IP. Бакет хранится в кеше shared,
+общем для всех процессов, как одно целое число -- теоретическое время
+прибытия следующего запроса в микросекундах (GCRA). Проверка -- один
+атомарный incr, поэтому лимит действует на весь сайт, а не на каждый
+процесс по отдельности. Счётчики отказов лежат там же. Если один бакет
+отказал, токены, взятые у остальных, возвращаются: отклонённый запрос
+не расходует лимит.
+"""
+import math
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+REJECTED_KEY = 'ratelimit:rejected:{}'
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'10/m' -> (ёмкость бакета, интервал пополнения в мкс)."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period] * 1_000_000 // int(count)
+
+
+def take_token(key, rate):
+    """Забирает токен из бакета. Возвращает 0, если запрос разрешён,
+    иначе число секунд до появления токена."""
+    burst, interval = parse_rate(rate)
+    now = int(time.time() * 1_000_000)
+    timeout = math.ceil(burst * interval / 1_000_000) + 1
+    shared = caches['shared']
+    try:
+        tat = shared.incr(key, interval)
+    except ValueError:
+        if shared.add(key, now + interval, timeout):
+            return 0
+        tat = shared.incr(key, interval)
+    if tat - interval < now:
+        shared.set(key, now + interval, timeout)
+        return 0
+    excess = tat - now - burst * interval
+    if excess <= 0:
+        return 0
+    shared.decr(key, interval)
+    return math.ceil(excess / 1_000_000)
+
+
+def return_token(key, rate):
+    """Возвращает в бакет токен, взятый take_token."""
+    try:
+        caches['shared'].decr(key, parse_rate(rate)[1])
+    except ValueError:
+        pass
+
+
+def client_ip(request):
+    return request.META.get(settings.RATELIMIT_IP_META, '')
+
+
+def rejected_counts():
+    keys = {name: REJECTED_KEY.format(name) for name in settings.RATELIMITS}
+    counts = caches['shared'].get_many(keys.values())
+    return {name: counts.get(key, 0) for name, key in keys.items()}
+
+
+def _count_rejected(name):
+    key = REJECTED_KEY.format(name)
+    shared = caches['shared']
+    if not shared.add(key, 1, None):
+        shared.incr(key)
+
+
+class RateLimitMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        name = request.resolver_match.url_name
+        limit = settings.RATELIMITS.get(name)
+        if limit is None or request.method not in limit['methods']:
+            return None
+        keys = [f'ratelimit:{name}:ip:{client_ip(request)}']
+        if request.user.is_authenticated:
+            keys.append(f'ratelimit:{name}:user:{request.user.pk}')
+        waits = {key: take_token(key, limit['rate']) for key in keys}
+        retry_after = max(waits.values())
+        if not retry_after:
+            return None
+        for key, wait in waits.items():
+            if not wait:
+                return_token(key, limit['rate'])
+        _count_rejected(name)
+        response = HttpResponse(
+            'Слишком много запросов, попробуйте позже.', status=429,
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
@@ -0,0 +1,141 @@
+"""Чтение с реплик для read-only страниц с закреплением за primary
+после записи (read-your-writes).
+
+Запросом с записью считается любой, выполнивший INSERT, UPDATE или
+DELETE на primary, а не только POST: подписка, например, пишет на GET.
+Время последней записи и синхронизации реплик хранится в кеше shared:
+его видят и рабочие процессы, и команда sync_replicas.
+"""
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+PRIMARY_WRITE_KEY = 'replication:primary_write'
+SYNCED_KEY = 'replication:synced:{}'
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD')
+WRITE_VERBS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_state = threading.local()
+
+
+def mark_primary_write():
+    caches['shared'].set(PRIMARY_WRITE_KEY, time.time(), None)
+
+
+def track_writes(execute, sql, params, many, context):
+    """execute_wrapper: отмечает запись на primary в текущем запросе."""
+    if (context['connection'].alias not in settings.DATABASE_REPLICAS
+            and sql.lstrip()[:7].upper().startswith(WRITE_VERBS)):
+        _state.wrote = True
+    return execute(sql, params, many, context)
+
+
+def replica_lag(alias):
+    """Отставание реплики в секундах или None, если она ни разу
+    не синхронизировалась."""
+    shared = caches['shared']
+    synced = shared.get(SYNCED_KEY.format(alias))
+    if synced is None:
+        return None
+    if shared.get(PRIMARY_WRITE_KEY, 0) <= synced:
+        return 0.0
+    return time.time() - synced
+
+
+def healthy_replicas():
+    replicas = []
+    for alias in settings.DATABASE_REPLICAS:
+        lag = replica_lag(alias)
+        if lag is not None and lag <= settings.REPLICA_MAX_LAG:
+            replicas.append(alias)
+    return replicas
+
+
+def pick_replica():
+    replicas = healthy_replicas()
+    return random.choice(replicas) if replicas else None
+
+
+def bind_replica(chunks):
+    """Сохраняет выбор реплики для потокового ответа: его тело
+    рендерится и читает базу уже после выхода из middleware."""
+    alias = getattr(_state, 'alias', None)
+    chunks = iter(chunks)
+    while True:
+        _state.alias = alias
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        finally:
+            _state.alias = None
+        yield chunk
+
+
+def sync_replica(alias, source='default'):
+    """Копирует файл primary в реплику через backup API SQLite.
+
+    Копирование идёт поверх открытого файла реплики, поэтому рабочие
+    процессы с постоянными соединениями сразу видят новые данные.
+    """
+    started = time.time()
+    src = sqlite3.connect(connections.databases[source]['NAME'])
+    dst = sqlite3.connect(connections.databases[alias]['NAME'])
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+    caches['shared'].set(SYNCED_KEY.format(alias), started, None)
+    return started
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return getattr(_state, 'alias', None)
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.alias = None
+        if settings.DATABASE_REPLICAS and _state.wrote:
+            mark_primary_write()
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (settings.DATABASE_REPLICAS
+                and request.method in SAFE_METHODS
+                and PIN_COOKIE not in request.COOKIES
+                and request.resolver_match.url_name
+                in settings.REPLICA_READ_VIEWS):
+            _state.alias = pick_replica()
@@ -0,0 +1,82 @@
+"""Сессии в кеше с отложенной записью в базу.
+
+Сессия читается из кеша, а база нужна только при промахе. Неизменённая
+сессия не сохраняется вовсе. Изменения, не затрагивающие вход
+пользователя, пишутся только в кеш и помечаются грязными; команда
+flush_sessions переносит их в базу пачкой. Создание сессии, вход и выход
+по-прежнему сразу пишутся в базу.
+
+SESSION_CACHE_ALIAS должен указывать на кеш, общий для всех процессов
+(в настройках это shared), иначе процессы не увидят сессии друг друга,
+а flush_sessions -- очередь грязных сессий воркеров.
+"""
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.backends.base import UpdateError
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+AUTH_KEYS = (SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY)
+DIRTY_SEQ_KEY = 'sessions:dirty:seq'
+FLUSHED_SEQ_KEY = 'sessions:dirty:flushed'
+DIRTY_KEY = 'sessions:dirty:{}'
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = 'yatube.sessions.'
+
+    def load(self):
+        data = super().load()
+        self._loaded = dict(data)
+        return data
+
+    def save(self, must_create=False):
+        loaded = getattr(self, '_loaded', None)
+        if must_create or loaded is None or not settings.SESSION_WRITE_BEHIND:
+            super().save(must_create)
+            self._loaded = dict(self._session)
+            return
+        data = self._get_session()
+        if data == loaded:
+            return
+        if any(data.get(key) != loaded.get(key) for key in AUTH_KEYS):
+            super().save()
+        else:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
+            self._mark_dirty()
+        self._loaded = dict(data)
+
+    def _mark_dirty(self):
+        if self._cache.add(DIRTY_SEQ_KEY, 1, None):
+            seq = 1
+        else:
+            seq = self._cache.incr(DIRTY_SEQ_KEY)
+        self._cache.set(DIRTY_KEY.format(seq), self.session_key, None)
+
+    def persist(self):
+        """Записывает в базу версию сессии из кеша."""
+        data = self._cache.get(self.cache_key)
+        if data is None:
+            return False
+        self._session_cache = data
+        try:
+            DBStore.save(self)
+        except UpdateError:
+            return False
+        return True
+
+
+def flush_dirty_sessions():
+    store = SessionStore()
+    cache = store._cache
+    start = cache.get(FLUSHED_SEQ_KEY, 0)
+    last = cache.get(DIRTY_SEQ_KEY, 0)
+    dirty_keys = [DIRTY_KEY.format(seq) for seq in range(start + 1, last + 1)]
+    session_keys = set(cache.get_many(dirty_keys).values())
+    flushed = sum(
+        SessionStore(session_key).persist() for session_key in session_keys
+    )
+    cache.delete_many(dirty_keys)
+    cache.set(FLUSHED_SEQ_KEY, last, None)
+    return flushed
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .auth import forget_user
+from .replication import track_writes
+from .slow_queries import slow_query_wrapper
+from .tracing import trace_query
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(connection_created)
+def instrument_queries(sender, connection, **kwargs):
+    for wrapper in (slow_query_wrapper, trace_query, track_writes):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
@@ -0,0 +1,180 @@
+"""Журнал медленных запросов к базе.
+
+Обёртка execute_wrapper ставится на каждое соединение при его создании,
+поэтому видит запросы страниц, потоковых ответов и команд. Запрос
+дольше SLOW_QUERY_THRESHOLD секунд пишется строкой JSON в
+SLOW_QUERY_LOG: нормализованный SQL (литералы заменены на ?, списки IN
+свёрнуты), типы параметров, время, имя маршрута, кадр во views.py и
+узел шаблона, из которого пришёл запрос. Команда slow_queries
+ранжирует формы запросов.
+
+В файл пишут все рабочие процессы, поэтому сами они его не ротируют:
+ротацию делает logrotate (без copytruncate и сжатия последней копии),
+а WatchedFileHandler замечает переименование и открывает новый файл.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import WatchedFileHandler
+from time import perf_counter
+
+from django.conf import settings
+from django.template.base import Node
+
+LITERALS = re.compile(
+    r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\?", re.ASCII)
+LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+SPACES = re.compile(r'\s+')
+
+_state = threading.local()
+_lock = threading.Lock()
+_handlers = {}
+
+
+def normalize(sql):
+    sql = LITERALS.sub('?', sql)
+    sql = LISTS.sub('(...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+def _type_runs(values):
+    runs = []
+    for value in values:
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return ','.join(
+        name if count == 1 else f'{name}*{count}' for name, count in runs)
+
+
+def params_shape(params, many=False):
+    """'int,str*3' для параметров; для executemany -- число строк
+    и форма первой строки."""
+    if params is None:
+        return ''
+    if many:
+        rows = list(params)
+        return f'{len(rows)}x({_type_runs(rows[0]) if rows else ""})'
+    if isinstance(params, dict):
+        return _type_runs(params.values())
+    return _type_runs(params)
+
+
+def _origin(frame):
+    """Ближайший кадр во views.py проекта и самый глубокий узел
+    шаблона в стеке вызова."""
+    view_frame = template = None
+    while frame is not None and not (view_frame and template):
+        code = frame.f_code
+        if (view_frame is None
+                and code.co_filename.startswith(settings.BASE_DIR)
+                and os.path.basename(code.co_filename) == 'views.py'):
+            view_frame = (
+                f'{os.path.relpath(code.co_filename, settings.BASE_DIR)}'
+                f':{frame.f_lineno} {code.co_name}')
+        node = frame.f_locals.get('self')
+        if template is None and isinstance(node, Node):
+            token = getattr(node, 'token', None)
+            origin = getattr(node, 'origin', None)
+            if token is not None and origin is not None:
+                template = (f'{origin.template_name}:{token.lineno} '
+                            f'{{% {token.contents[:60]} %}}')
+        frame = frame.f_back
+    return view_frame, template
+
+
+def _handler(path):
+    handler = _handlers.get(path)
+    if handler is None:
+        with _lock:
+            handler = _handlers.get(path)
+            if handler is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handler = WatchedFileHandler(
+                    path, encoding='utf-8', delay=True)
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                _handlers[path] = handler
+    return handler
+
+
+def log_query(sql, params, many, seconds, alias):
+    request = getattr(_state, 'request', None)
+    match = getattr(request, 'resolver_match', None)
+    view_frame, template = _origin(sys._getframe(2))
+    entry = {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'sql': normalize(sql),
+        'params': params_shape(params, many),
+        'duration_ms': round(seconds * 1000, 3),
+        'alias': alias,
+        'url_name': match.view_name if match else None,
+        'path': request.path if request is not None else None,
+        'request_id': getattr(request, 'request_id', None),
+        'frame': view_frame,
+        'template': template,
+    }
+    _handler(settings.SLOW_QUERY_LOG).handle(logging.makeLogRecord(
+        {'msg': json.dumps(entry, ensure_ascii=False)}))
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    if settings.SLOW_QUERY_THRESHOLD is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        seconds = perf_counter() - start
+        if seconds >= settings.SLOW_QUERY_THRESHOLD:
+            log_query(sql, params, many, seconds,
+                      context['connection'].alias)
+
+
+def read_entries(path):
+    """Записи текущего файла и SLOW_QUERY_LOG_BACKUPS несжатых
+    ротированных копий (path.1 -- самая свежая), от старых к новым."""
+    paths = [f'{path}.{number}' for number in range(
+        settings.SLOW_QUERY_LOG_BACKUPS, 0, -1)] + [path]
+    for name in paths:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding='utf-8') as log:
+            for line in log:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class SlowQueryMiddleware:
+    """Запоминает запрос, чтобы записи журнала получили имя маршрута."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.request = request
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.request = None
+        if response.streaming:
+            response.streaming_content = self._bound_stream(
+                iter(response.streaming_content), request)
+        return response
+
+    @staticmethod
+    def _bound_stream(chunks, request):
+        while True:
+            _state.request = request
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                _state.request = None
+            yield chunk
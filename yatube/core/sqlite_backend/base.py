@@ -0,0 +1,137 @@
+"""SQLite для продакшена: PRAGMA при подключении, BEGIN IMMEDIATE
+и опциональный единственный писатель на файл базы.
+
+OPTIONS помимо стандартных параметров sqlite3.connect:
+    pragmas -- словарь PRAGMA, выполняемых на каждом новом соединении;
+    immediate_transactions -- начинать atomic-блоки с BEGIN IMMEDIATE;
+    serialize_writes -- пропускать все записи через одну межпроцессную
+        блокировку (flock по файлу рядом с базой).
+"""
+import fcntl
+import os
+import threading
+
+from django.db.backends.sqlite3 import base
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+CUSTOM_OPTIONS = ('pragmas', 'immediate_transactions', 'serialize_writes')
+
+_writer_locks = {}
+_writer_locks_guard = threading.Lock()
+
+
+class WriterLock:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def writer_lock_for(db_name):
+    path = f'{db_name}.writer.lock'
+    with _writer_locks_guard:
+        if path not in _writer_locks:
+            _writer_locks[path] = WriterLock(path)
+        return _writer_locks[path]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = options.get('pragmas', {})
+        self.immediate_transactions = options.get(
+            'immediate_transactions', False
+        )
+        self.writer_lock = None
+        if options.get('serialize_writes') and not self.is_in_memory_db():
+            self.writer_lock = writer_lock_for(self.settings_dict['NAME'])
+            self.execute_wrappers.append(self._serialize_write)
+        self._holds_writer_lock = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in CUSTOM_OPTIONS:
+            params.pop(option, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def enable_constraint_checking(self):
+        # Миграции включают foreign_keys обратно на том же соединении;
+        # базы шардов держат внешние ключи на default и проверять их
+        # не могут.
+        if str(self.pragmas.get('foreign_keys', 'ON')).upper() != 'OFF':
+            super().enable_constraint_checking()
+
+    def _start_transaction_under_autocommit(self):
+        if self.writer_lock is not None:
+            self.writer_lock.acquire()
+            self._holds_writer_lock = True
+        begin = 'BEGIN IMMEDIATE' if self.immediate_transactions else 'BEGIN'
+        try:
+            self.cursor().execute(begin)
+        except BaseException:
+            self._release_writer_lock()
+            raise
+
+    def _serialize_write(self, execute, sql, params, many, context):
+        if (self._holds_writer_lock
+                or not sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS)):
+            return execute(sql, params, many, context)
+        with self.writer_lock:
+            return execute(sql, params, many, context)
+
+    def _release_writer_lock(self):
+        if self._holds_writer_lock:
+            self._holds_writer_lock = False
+            self.writer_lock.release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_writer_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_writer_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_writer_lock()
@@ -0,0 +1,101 @@
+"""Статика с отпечатками содержимого, заранее сжатыми копиями и
+долгим кешированием.
+
+collectstatic с CompressedManifestStorage кладёт рядом с каждым
+текстовым файлом .gz и, если установлен brotli, .br. StaticFilesMiddleware
+отдаёт из STATIC_ROOT подходящую сжатую копию, а файлам с хешем в имени
+ставит Cache-Control immutable на год.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.txt', '.html', '.json', '.map',
+                '.xml')
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compress_file(path):
+    with open(path, 'rb') as source:
+        content = source.read()
+    if len(content) < settings.STATIC_COMPRESS_MIN_SIZE:
+        return []
+    written = []
+    with open(path + '.gz', 'wb') as target:
+        target.write(gzip.compress(content, compresslevel=9, mtime=0))
+    written.append(path + '.gz')
+    if brotli is not None:
+        with open(path + '.br', 'wb') as target:
+            target.write(brotli.compress(content))
+        written.append(path + '.br')
+    return written
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_files = super().post_process(paths, dry_run, **options)
+        for name, hashed_name, processed in processed_files:
+            yield name, hashed_name, processed
+            if dry_run or isinstance(processed, Exception):
+                continue
+            for target in (name, hashed_name):
+                if target and target.endswith(COMPRESSIBLE):
+                    compress_file(self.path(target))
+
+
+class StaticFilesMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.root = os.path.realpath(settings.STATIC_ROOT)
+
+    def __call__(self, request):
+        if request.path.startswith(settings.STATIC_URL):
+            response = self.serve(request)
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request):
+        name = request.path[len(settings.STATIC_URL):]
+        path = os.path.realpath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return None
+        stat = os.stat(path)
+        last_modified = http_date(stat.st_mtime)
+        if request.META.get('HTTP_IF_MODIFIED_SINCE') == last_modified:
+            return HttpResponseNotModified()
+        content_type, _ = mimetypes.guess_type(path)
+        accepted = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        encoding = None
+        for candidate, suffix in ENCODINGS:
+            if candidate in accepted and os.path.isfile(path + suffix):
+                encoding, path = candidate, path + suffix
+                break
+        response = FileResponse(
+            open(path, 'rb'),
+            content_type=content_type or 'application/octet-stream',
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Vary'] = 'Accept-Encoding'
+        response['Last-Modified'] = last_modified
+        response['Cache-Control'] = (
+            IMMUTABLE if HASHED_NAME.search(name)
+            else f'public, max-age={settings.STATIC_MAX_AGE}'
+        )
+        return response
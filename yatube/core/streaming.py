@@ -0,0 +1,225 @@
+"""Потоковый рендер шаблонов.
+
+render() собирает всю страницу в памяти и только потом отдаёт первый
+байт. stream_render() обходит дерево узлов шаблона сам и отдаёт готовые
+куски по мере рендера: extends, block, include и for разворачиваются
+в генераторы, а узлы с методом iter_render (например, post_cards)
+отдают результат по частям. Куски копятся до STREAM_CHUNK_SIZE байт;
+тег {% flush %} отправляет накопленное сразу, поэтому шапка и навигация
+из misc/base.html уходят клиенту до запросов за комментариями. Страницу
+ленты feed_page выбирает ещё во view, так что запросы лент выполняются
+до первого куска.
+
+Цикл for по ещё не выполненному QuerySet читает строки через iterator(),
+если тело цикла не смотрит на длину (forloop.last, revcounter): весь
+queryset не загружается в память перед первой итерацией.
+
+Ошибку посреди потока уже нельзя превратить в страницу 500, поэтому при
+STREAM_RESPONSES = False (по умолчанию в DEBUG) страница рендерится
+обычным render().
+"""
+import re
+from itertools import chain
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import render
+from django.template import loader
+from django.template.base import Node, TextNode
+from django.template.context import make_context
+from django.template.defaulttags import ForNode
+from django.template.loader_tags import (BLOCK_CONTEXT_KEY, BlockContext,
+                                         BlockNode, ExtendsNode, IncludeNode)
+
+from .replication import bind_replica
+
+
+class FlushNode(Node):
+    """Граница, на которой накопленный вывод уходит клиенту."""
+
+    def render(self, context):
+        return ''
+
+
+FLUSH = object()
+
+# forloop без .counter, .counter0 и .first требует длину цикла.
+LENGTH_LOOKUP = re.compile(r'\bforloop\b(?!\.(?:counter0?|first)\b)')
+
+
+def iter_nodelist(nodelist, context):
+    for node in nodelist:
+        if isinstance(node, TextNode):
+            yield node.s
+        elif isinstance(node, FlushNode):
+            yield FLUSH
+        elif hasattr(node, 'iter_render'):
+            yield from node.iter_render(context)
+        elif isinstance(node, ExtendsNode):
+            yield from iter_extends(node, context)
+        elif isinstance(node, BlockNode):
+            yield from iter_block(node, context)
+        elif isinstance(node, IncludeNode):
+            yield from iter_include(node, context)
+        elif isinstance(node, ForNode):
+            yield from iter_for(node, context)
+        else:
+            yield node.render_annotated(context)
+
+
+def iter_extends(node, context):
+    """ExtendsNode.render, отдающий родительский шаблон по частям."""
+    parent = node.get_parent(context)
+    if BLOCK_CONTEXT_KEY not in context.render_context:
+        context.render_context[BLOCK_CONTEXT_KEY] = BlockContext()
+    block_context = context.render_context[BLOCK_CONTEXT_KEY]
+    block_context.add_blocks(node.blocks)
+    for parent_node in parent.nodelist:
+        if not isinstance(parent_node, TextNode):
+            if not isinstance(parent_node, ExtendsNode):
+                block_context.add_blocks({
+                    block.name: block for block in
+                    parent.nodelist.get_nodes_by_type(BlockNode)
+                })
+            break
+    with context.render_context.push_state(parent, isolated_context=False):
+        yield from iter_nodelist(parent.nodelist, context)
+
+
+def iter_block(node, context):
+    block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+    with context.push():
+        if block_context is None:
+            context['block'] = node
+            yield from iter_nodelist(node.nodelist, context)
+            return
+        push = block = block_context.pop(node.name)
+        if block is None:
+            block = node
+        block = type(node)(block.name, block.nodelist)
+        block.context = context
+        context['block'] = block
+        yield from iter_nodelist(block.nodelist, context)
+        if push is not None:
+            block_context.push(node.name, push)
+
+
+def iter_include(node, context):
+    template = node.template.resolve(context)
+    if not callable(getattr(template, 'render', None)):
+        cache = context.render_context.dicts[0].setdefault(node, {})
+        template_name = template
+        template = cache.get(template_name)
+        if template is None:
+            template = context.template.engine.get_template(template_name)
+            cache[template_name] = template
+    elif hasattr(template, 'template'):
+        template = template.template
+    values = {
+        name: var.resolve(context)
+        for name, var in node.extra_context.items()
+    }
+    if node.isolated_context:
+        yield template.render(context.new(values))
+        return
+    with context.push(**values):
+        with context.render_context.push_state(template):
+            yield from iter_nodelist(template.nodelist, context)
+
+
+def needs_length(node):
+    """Смотрит ли тело цикла на его длину. Шаблоны, подключённые без
+    only, могут читать forloop, поэтому тоже считаются."""
+    if not hasattr(node, '_needs_length'):
+        node._needs_length = any(
+            isinstance(child, IncludeNode) and not child.isolated_context
+            or not isinstance(child, TextNode) and hasattr(child, 'token')
+            and LENGTH_LOOKUP.search(child.token.contents)
+            for child in node.nodelist_loop.get_nodes_by_type(Node)
+        )
+    return node._needs_length
+
+
+def lazy_values(values):
+    """Итератор строк невыполненного QuerySet или None."""
+    if (not isinstance(values, QuerySet) or values._result_cache is not None
+            or values._prefetch_related_lookups):
+        return None
+    rows = values.iterator()
+    first = next(rows, None)
+    return [] if first is None else chain([first], rows)
+
+
+def iter_for(node, context):
+    """ForNode.render, отдающий каждую итерацию цикла отдельно."""
+    if len(node.loopvars) > 1:
+        yield node.render_annotated(context)
+        return
+    parentloop = context['forloop'] if 'forloop' in context else {}
+    with context.push():
+        values = node.sequence.resolve(context, ignore_failures=True)
+        if values is None:
+            values = []
+        rows = len_values = None
+        if not node.is_reversed and not needs_length(node):
+            rows = lazy_values(values)
+        if rows is not None:
+            values = rows
+        else:
+            if not hasattr(values, '__len__'):
+                values = list(values)
+            len_values = len(values)
+        if rows == [] or len_values == 0:
+            yield from iter_nodelist(node.nodelist_empty, context)
+            return
+        if node.is_reversed:
+            values = reversed(values)
+        loop_dict = context['forloop'] = {'parentloop': parentloop}
+        for i, item in enumerate(values):
+            loop_dict['counter0'] = i
+            loop_dict['counter'] = i + 1
+            loop_dict['first'] = (i == 0)
+            if len_values is not None:
+                loop_dict['revcounter'] = len_values - i
+                loop_dict['revcounter0'] = len_values - i - 1
+                loop_dict['last'] = (i == len_values - 1)
+            context[node.loopvars[0]] = item
+            yield from iter_nodelist(node.nodelist_loop, context)
+
+
+def iter_template(template, context):
+    """Рендер Template по частям, склеенным до STREAM_CHUNK_SIZE байт."""
+    buffer, size = [], 0
+    with context.render_context.push_state(template):
+        with context.bind_template(template):
+            context.template_name = template.name
+            for piece in iter_nodelist(template.nodelist, context):
+                if piece is not FLUSH:
+                    piece = str(piece)
+                    buffer.append(piece)
+                    size += len(piece)
+                if buffer and (piece is FLUSH
+                               or size >= settings.STREAM_CHUNK_SIZE):
+                    yield ''.join(buffer)
+                    buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_render(request, template_name, context=None, status=None):
+    if not settings.STREAM_RESPONSES:
+        return render(request, template_name, context, status=status)
+    backend_template = loader.get_template(template_name)
+    template = backend_template.template
+    context = make_context(
+        context, request, autoescape=backend_template.backend.engine.autoescape
+    )
+    # Cookie с CSRF-токеном нужно выставить до отправки заголовков,
+    # а {% csrf_token %} сработает уже во время потока.
+    get_token(request)
+    return StreamingHttpResponse(
+        bind_replica(iter_template(template, context)),
+        status=status,
+    )
@@ -0,0 +1,97 @@
+"""Профилирование шаблонов и предварительная компиляция."""
+import logging
+import os
+import threading
+from time import perf_counter
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.base import Template
+from django.template.utils import get_app_template_dirs
+
+logger = logging.getLogger('yatube.templates')
+
+_state = threading.local()
+_original_render = None
+
+
+def _timed_render(self, context):
+    stats = getattr(_state, 'stats', None)
+    if stats is None:
+        return _original_render(self, context)
+    start = perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        entry = stats.setdefault(self.origin.template_name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += perf_counter() - start
+
+
+def install_profiler():
+    """Оборачивает Template._render: через него проходят и extends,
+    и include, так что учитывается каждый шаблон страницы."""
+    global _original_render
+    if _original_render is None:
+        _original_render = Template._render
+        Template._render = _timed_render
+
+
+def template_names():
+    engine = engines['django'].engine
+    names = set()
+    for directory in [*engine.dirs, *get_app_template_dirs('templates')]:
+        for root, dirs, files in os.walk(directory):
+            for file_name in files:
+                if file_name.endswith(('.html', '.txt')):
+                    path = os.path.join(root, file_name)
+                    names.add(os.path.relpath(path, directory))
+    return sorted(names)
+
+
+def precompile_templates():
+    """Загружает все шаблоны в кеширующий загрузчик до первого запроса."""
+    engine = engines['django'].engine
+    compiled = 0
+    for name in template_names():
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError as error:
+            logger.warning('Шаблон %s не скомпилирован: %s', name, error)
+        else:
+            compiled += 1
+    return compiled
+
+
+class TemplateProfilerMiddleware:
+    """Время рендера по шаблонам для каждого запроса: в заголовке
+    Server-Timing и в логе yatube.templates. Потоковые ответы
+    рендерятся уже после заголовков и не профилируются."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if settings.TEMPLATE_PROFILING:
+            install_profiler()
+
+    def __call__(self, request):
+        if not settings.TEMPLATE_PROFILING:
+            return self.get_response(request)
+        _state.stats = stats = {}
+        try:
+            response = self.get_response(request)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        finally:
+            _state.stats = None
+        if response.streaming:
+            return response
+        timings = sorted(stats.items(), key=lambda item: -item[1][1])
+        response['Server-Timing'] = ', '.join(
+            f'tpl{number};desc="{name} x{count}";dur={total * 1000:.2f}'
+            for number, (name, (count, total)) in enumerate(timings)
+        )
+        logger.info('%s %s', request.path, ' '.join(
+            f'{name}:{count}x{total * 1000:.2f}ms'
+            for name, (count, total) in timings
+        ))
+        return response
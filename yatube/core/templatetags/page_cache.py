@@ -0,0 +1,42 @@
+from django import template
+from django.template.base import token_kwargs
+
+from ..page_cache import is_shared, marker
+
+register = template.Library()
+
+
+class PersonalNode(template.Node):
+    def __init__(self, template_name, extra_context):
+        self.template_name = template_name
+        self.extra_context = extra_context
+
+    def render(self, context):
+        template_name = self.template_name.resolve(context)
+        values = {
+            name: var.resolve(context)
+            for name, var in self.extra_context.items()
+        }
+        if is_shared(context.get('request')):
+            return marker(template_name, values)
+        fragment = context.template.engine.get_template(template_name)
+        with context.push(**values):
+            return fragment.render(context)
+
+
+@register.tag
+def personal(parser, token):
+    """{% personal 'фрагмент.html' имя=значение ... %}
+
+    Вне общего кеша страниц работает как include. В общей копии
+    оставляет метку, которую shared_page заполняет для каждого
+    пользователя; значения аргументов превращаются в строки."""
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает имя шаблона фрагмента')
+    extra_context = token_kwargs(bits[2:], parser)
+    if len(extra_context) != len(bits) - 2:
+        raise template.TemplateSyntaxError(
+            f'Аргументы {bits[0]} записываются как имя=значение')
+    return PersonalNode(parser.compile_filter(bits[1]), extra_context)
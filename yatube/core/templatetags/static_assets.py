@@ -0,0 +1,29 @@
+from django import template
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+_inlined = {}
+
+
+def _read_static(path):
+    if staticfiles_storage.exists(path):
+        with staticfiles_storage.open(path) as static_file:
+            return static_file.read().decode()
+    found = finders.find(path)
+    if found is None:
+        raise template.TemplateSyntaxError(
+            f'Статический файл {path} не найден')
+    with open(found, encoding='utf-8') as static_file:
+        return static_file.read()
+
+
+@register.simple_tag
+def inline_css(path):
+    """Встраивает критический CSS прямо в страницу; файл читается один
+    раз на процесс."""
+    if path not in _inlined:
+        _inlined[path] = mark_safe(f'<style>{_read_static(path)}</style>')
+    return _inlined[path]
@@ -0,0 +1,13 @@
+from django import template
+
+from ..streaming import FlushNode
+
+register = template.Library()
+
+
+@register.tag
+def flush(parser, token):
+    """Отправляет накопленную часть страницы при потоковом рендере."""
+    if len(token.split_contents()) != 1:
+        raise template.TemplateSyntaxError('Тег flush не принимает аргументов')
+    return FlushNode()
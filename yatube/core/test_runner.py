@@ -0,0 +1,44 @@
+"""Запуск тестов с отдельным и чистым кешем shared.
+
+Кеш shared лежит в файлах и переживает не только тест, но и весь
+запуск, поэтому на время тестов он переносится во временный каталог
+и очищается перед каждым тестом, как и кеш процесса между запросами
+не переносит состояние из одного теста в другой.
+"""
+import shutil
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class ClearSharedCacheMixin:
+    def startTest(self, test):
+        caches['shared'].clear()
+        super().startTest(test)
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._shared_cache_dir = tempfile.mkdtemp(prefix='shared_cache_')
+        self._shared_cache_override = override_settings(CACHES={
+            **settings.CACHES,
+            'shared': {
+                **settings.CACHES['shared'],
+                'LOCATION': self._shared_cache_dir,
+            },
+        })
+        self._shared_cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._shared_cache_override.disable()
+        shutil.rmtree(self._shared_cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
+
+    def get_resultclass(self):
+        base = super().get_resultclass() or unittest.TextTestResult
+        return type('SharedCacheTestResult', (ClearSharedCacheMixin, base), {})
@@ -0,0 +1,36 @@
+"""Временные базы для тестов шардирования.
+
+В настройках баз шардов нет, пока шардирование выключено, поэтому
+тесты, которым нужны шарды, создают их сами на время класса: копии
+default в памяти с выключенными внешними ключами, как у шардов.
+"""
+from django.db import connections
+
+
+class ExtraDatabasesMixin:
+    extra_databases = ()
+
+    @classmethod
+    def setUpClass(cls):
+        default = connections.databases['default']
+        for alias in cls.extra_databases:
+            options = default.get('OPTIONS', {})
+            connections.databases[alias] = {
+                **default,
+                'NAME': alias,
+                'OPTIONS': {**options, 'pragmas': {
+                    **options.get('pragmas', {}), 'foreign_keys': 'OFF',
+                }},
+                'TEST': {**default.get('TEST', {}), 'NAME': None},
+            }
+            connections[alias].creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in cls.extra_databases:
+            connections[alias].creation.destroy_test_db(alias, verbosity=0)
+            del connections[alias]
+            del connections.databases[alias]
@@ -0,0 +1,119 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.mail import send_mail
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .. import jobs
+from ..models import Job
+from .databases import ExtraDatabasesMixin
+
+CALLS = []
+
+
+def record(value):
+    CALLS.append(value)
+
+
+def explode():
+    raise RuntimeError('сбой')
+
+
+@override_settings(
+    JOB_QUEUES={'default': 2, 'mail': 1},
+    JOB_RETRY_BACKOFF=30,
+    JOB_SCHEDULE={'tick': {'task': 'core.tests.test_jobs.record',
+                           'args': ['tick'], 'every': 60}},
+)
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_dedup_key_until_finished(self):
+        """Функция проверяет дедупликацию задач до их завершения."""
+        first = jobs.enqueue(record, ['a'], dedup_key='same')
+        second = jobs.enqueue(record, ['b'], dedup_key='same')
+        self.assertEqual(first.pk, second.pk)
+        [job_id] = jobs.claim('default', 5)
+        self.assertEqual(jobs.run(job_id), Job.DONE)
+        self.assertEqual(CALLS, ['a'])
+        third = jobs.enqueue(record, ['c'], dedup_key='same')
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_queue_concurrency_limit_and_lease(self):
+        """Функция проверяет общий лимит очереди и повторный захват
+        задачи с истёкшим захватом."""
+        for number in range(3):
+            jobs.enqueue(record, [number])
+        claimed = jobs.claim('default', 10, 'first')
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(jobs.claim('default', 10, 'second'), [])
+        Job.objects.filter(pk=claimed[0]).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = jobs.claim('default', 10, 'second')
+        self.assertEqual(reclaimed, [claimed[0]])
+        self.assertEqual(Job.objects.get(pk=claimed[0]).attempts, 2)
+
+    def test_retry_with_backoff_then_fail(self):
+        """Функция проверяет повтор с задержкой и итоговую ошибку."""
+        job = jobs.enqueue(explode, max_attempts=2)
+        [job_id] = jobs.claim('default', 1)
+        with self.assertLogs('yatube.jobs', 'ERROR'):
+            self.assertEqual(jobs.run(job_id), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertIn('сбой', job.last_error)
+        self.assertGreater(job.run_at,
+                           timezone.now() + timedelta(seconds=25))
+        self.assertEqual(jobs.claim('default', 1), [])
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        [job_id] = jobs.claim('default', 1)
+        with self.assertLogs('yatube.jobs', 'ERROR'):
+            self.assertEqual(jobs.run(job_id), Job.FAILED)
+
+    def test_delayed_and_periodic_jobs(self):
+        """Функция проверяет отложенные и периодические задачи."""
+        jobs.enqueue(record, ['later'], delay=60)
+        self.assertEqual(jobs.claim('default', 5), [])
+        jobs.schedule_periodic()
+        jobs.schedule_periodic()
+        tick = Job.objects.get(dedup_key='schedule:tick')
+        self.assertEqual(tick.run_at.timestamp() % 60, 0)
+        self.assertEqual(Job.objects.count(), 2)
+
+    @override_settings(
+        EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+        EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.'
+                               'EmailBackend',
+    )
+    def test_runworker_sends_queued_mail(self):
+        """Функция проверяет отправку письма командой runworker."""
+        send_mail('Тема', 'Текст', 'from@example.com', ['to@example.com'])
+        send_mail('Тема', 'Текст', 'from@example.com', ['to@example.com'])
+        self.assertEqual(Job.objects.filter(queue='mail').count(), 1)
+        out = StringIO()
+        call_command('runworker', once=True, concurrency=1,
+                     no_schedule=True, stdout=out)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('Выполнено задач: 1', out.getvalue())
+
+
+class ShardEnqueueTests(ExtraDatabasesMixin, TransactionTestCase):
+    extra_databases = ['posts_shard_0']
+    databases = {'default', 'posts_shard_0'}
+
+    def test_job_for_other_database_waits_for_its_commit(self):
+        """Функция проверяет, что задача для данных шарда появляется
+        только после коммита в шарде."""
+        with transaction.atomic(using='posts_shard_0'):
+            self.assertIsNone(
+                jobs.enqueue(record, ['shard'], using='posts_shard_0'))
+            self.assertFalse(Job.objects.exists())
+        self.assertEqual(Job.objects.get().task, 'core.tests.test_jobs.record')
+        with transaction.atomic(using='posts_shard_0'):
+            jobs.enqueue(record, ['lost'], using='posts_shard_0')
+            transaction.set_rollback(True, using='posts_shard_0')
+        self.assertEqual(Job.objects.count(), 1)
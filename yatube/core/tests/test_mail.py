@@ -0,0 +1,84 @@
+from email.mime.text import MIMEText
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import User
+
+from ..mail import dump_message, load_message, send_queued
+from ..models import QueuedEmail
+
+
+class FailingBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError('SMTP недоступен')
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.QueuedEmailBackend',
+    EMAIL_DELIVERY_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class QueuedEmailTests(TestCase):
+    def setUp(self):
+        User.objects.create_user(
+            username='Forgetful', email='forgetful@example.com',
+            password='secret-password',
+        )
+
+    def request_reset(self):
+        Client().post(reverse('password_reset'),
+                      {'email': 'forgetful@example.com'})
+
+    def test_reset_mail_queued_and_sent_later(self):
+        """Функция проверяет, что письмо сброса пароля ставится в очередь
+        и отправляется обработчиком."""
+        self.request_reset()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(QueuedEmail.objects.count(), 1)
+        self.assertEqual(send_queued(10), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['forgetful@example.com'])
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
+        self.assertEqual(send_queued(10), (0, 0))
+
+    @override_settings(EMAIL_DELIVERY_BACKEND=f'{__name__}.FailingBackend',
+                       EMAIL_RETRY_BACKOFF=60)
+    def test_failed_mail_retried_with_backoff(self):
+        """Функция проверяет отложенный повтор неудачной отправки."""
+        self.request_reset()
+        self.assertEqual(send_queued(10), (0, 1))
+        email = QueuedEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertIsNone(email.sent)
+        self.assertGreater(email.next_attempt, timezone.now())
+        self.assertEqual(send_queued(10), (0, 0))
+        QueuedEmail.objects.update(next_attempt=timezone.now())
+        with self.settings(EMAIL_DELIVERY_BACKEND=(
+                'django.core.mail.backends.locmem.EmailBackend')):
+            self.assertEqual(send_queued(10), (1, 0))
+        self.assertEqual(QueuedEmail.objects.get().attempts, 2)
+
+
+class MessagePayloadTests(TestCase):
+    def test_attachments_survive_queue(self):
+        """Функция проверяет, что обычные вложения и вложения MIMEBase
+        переживают сохранение в очередь."""
+        part = MIMEText('Отчёт за неделю', 'plain', 'utf-8')
+        part.add_header('Content-Disposition', 'attachment',
+                        filename='report.txt')
+        message = mail.EmailMessage(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com'])
+        message.attach('data.csv', 'a,b\n1,2\n', 'text/csv')
+        message.attach(part)
+        loaded = load_message(dump_message(message))
+        self.assertEqual(loaded.attachments[0],
+                         ('data.csv', 'a,b\n1,2\n', 'text/csv'))
+        restored = loaded.attachments[1]
+        self.assertEqual(restored.get_filename(), 'report.txt')
+        self.assertEqual(
+            restored.get_payload(decode=True).decode('utf-8'),
+            'Отчёт за неделю')
+        self.assertIn(b'report.txt', loaded.message().as_bytes())
@@ -0,0 +1,49 @@
+import shutil
+import tempfile
+import tracemalloc
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from .. import memory
+
+
+class MemoryDiagnosticsTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(MEMORY_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+
+    def test_key_prefix(self):
+        """Функция проверяет префиксы ключей кеша."""
+        self.assertEqual(memory.key_prefix(':1:feed:count:12'), 'feed:count')
+        self.assertEqual(memory.key_prefix(':1:trending:top'), 'trending:top')
+        self.assertEqual(memory.key_prefix(':1:user:5'), 'user')
+        self.assertEqual(memory.key_prefix(':1:42'), '(other)')
+
+    def test_snapshots_compared_and_cache_sized(self):
+        """Функция проверяет рост между снимками и размер кеша по
+        префиксам в отчёте команды memory_report."""
+        tracemalloc.start()
+        self.addCleanup(memory.stop)
+        memory.take_snapshot()
+        grown = [bytearray(1024) for number in range(200)]
+        cache.set('feed:count:1', 'x' * 5000)
+        cache.set('feed:count:2', 'y' * 5000)
+        report = memory.take_snapshot()
+        self.assertTrue(any('test_memory.py' in stat['site']
+                            for stat in report['growth']))
+        self.assertEqual(report['locmem']['default']['feed:count'][0], 2)
+        self.assertGreater(
+            report['locmem']['default']['feed:count'][1], 10000)
+        out = StringIO()
+        call_command('memory_report', dir=self.directory, top=5, stdout=out)
+        self.assertIn('Рост с первого снимка', out.getvalue())
+        self.assertIn('test_memory.py', out.getvalue())
+        self.assertIn('feed:count: 2 ключей', out.getvalue())
+        del grown
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from .. import metrics
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(METRICS_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+
+    def test_values_summed_across_process_files(self):
+        """Функция проверяет сложение значений из файлов разных
+        процессов и рост файла."""
+        first = metrics.MmapValues(os.path.join(self.directory, '1.db'))
+        second = metrics.MmapValues(os.path.join(self.directory, '2.db'))
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        key = metrics._key(metrics.RESPONSES, {'view': 'index'})
+        first.inc(key, 2)
+        second.inc(key, 3)
+        for number in range(3000):
+            first.inc(metrics._key('many', {'n': str(number)}), 1)
+        totals = metrics.collect()
+        self.assertEqual(
+            totals[metrics.RESPONSES, (('view', 'index'),)], 5)
+        self.assertEqual(totals['many', (('n', '2999'),)], 1)
+        reopened = metrics.MmapValues(first.path)
+        self.addCleanup(reopened.close)
+        reopened.inc(key, 1)
+        self.assertEqual(
+            metrics.collect()[metrics.RESPONSES, (('view', 'index'),)], 6)
+
+    def test_request_metrics_exposed(self):
+        """Функция проверяет гистограмму времени ответа, запросы к базе
+        и кеш на странице /metrics."""
+        user = User.objects.create_user(username='Measured')
+        Post.objects.create(author=user, text='Метрика')
+        client = Client()
+        client.get(reverse('profile', args=['Measured']))
+        client.get(reverse('index'))
+        client.get(reverse('index'))
+        client.get('/no/such/page/')
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      text)
+        self.assertIn('yatube_request_duration_seconds_bucket'
+                      '{view="index",le="+Inf"} 2', text)
+        self.assertIn('yatube_request_duration_seconds_count'
+                      '{view="index"} 2', text)
+        self.assertIn('yatube_responses_total'
+                      '{status="4xx",view="other"} 1', text)
+        self.assertIn('yatube_db_queries_total{view="profile"}', text)
+        self.assertIn('yatube_template_render_seconds_count'
+                      '{view="profile"} 1', text)
+        self.assertIn('yatube_cache_requests_total{result="hit"}', text)
+        self.assertIn('yatube_cache_requests_total{result="miss"}', text)
+
+    @override_settings(STREAM_RESPONSES=True)
+    def test_streamed_response_counted_after_body(self):
+        """Функция проверяет учёт потокового ответа после отдачи тела."""
+        User.objects.create_user(username='Streamed')
+        response = Client().get(reverse('profile', args=['Streamed']))
+        self.assertNotIn(
+            'yatube_request_duration_seconds', metrics.exposition())
+        b''.join(response.streaming_content)
+        text = metrics.exposition()
+        self.assertIn('yatube_template_render_seconds_count'
+                      '{view="profile"} 1', text)
+        self.assertIn('yatube_db_queries_total{view="profile"}', text)
+
+    def test_metrics_forbidden_from_other_hosts(self):
+        """Функция проверяет закрытый доступ к /metrics."""
+        response = Client(REMOTE_ADDR='10.0.0.1').get('/metrics')
+        self.assertEqual(response.status_code, 403)
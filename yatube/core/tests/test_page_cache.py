@@ -0,0 +1,116 @@
+import warnings
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post, User
+
+from ..page_cache import forget_personal, invalidate, personal_context
+
+
+class SharedPageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='Author')
+        self.reader = User.objects.create_user(username='Reader')
+        self.post = Post.objects.create(
+            author=self.author,
+            text='<!--personal misc/nav.html -->Общий пост')
+        self.url = reverse('posts', args=[self.author.username, self.post.id])
+        self.edit_url = reverse(
+            'post_edit', args=[self.author.username, self.post.id])
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def test_one_copy_with_personal_fragments(self):
+        """Функция проверяет, что все получают одну копию страницы со
+        своей навигацией, ссылкой на правку и формой комментария."""
+        anonymous = Client().get(self.url)
+        self.assertIn('post', anonymous.context)
+        self.assertContains(anonymous, reverse('login'))
+        self.assertNotContains(anonymous, 'csrfmiddlewaretoken')
+        author = self.client_for(self.author).get(self.url)
+        self.assertNotIn('post', author.context)
+        self.assertContains(author, self.edit_url)
+        self.assertContains(author, 'csrfmiddlewaretoken')
+        reader = self.client_for(self.reader).get(self.url)
+        self.assertContains(reader, reverse('profile', args=['Reader']))
+        self.assertNotContains(reader, self.edit_url)
+        self.assertEqual(reader['Cache-Control'], 'private')
+
+    def test_post_text_cannot_add_fragments(self):
+        """Функция проверяет, что метка в тексте поста остаётся текстом."""
+        response = Client().get(self.url)
+        self.assertContains(response, '&lt;!--personal misc/nav.html --&gt;')
+
+    def test_follow_invalidates_profile(self):
+        """Функция проверяет сброс копии профиля и личного контекста при
+        подписке."""
+        client = self.client_for(self.reader)
+        url = reverse('profile', args=[self.author.username])
+        self.assertContains(client.get(url), 'Подписчиков: 0')
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = client.get(url)
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(
+            response, reverse('profile_unfollow', args=['Author']))
+
+    def test_moved_post_leaves_old_group_page(self):
+        """Функция проверяет сброс страницы группы, из которой пост
+        перенесли."""
+        old = Group.objects.create(title='Старая', slug='old')
+        new = Group.objects.create(title='Новая', slug='new')
+        self.post.group = old
+        self.post.save()
+        url = reverse('group', args=['old'])
+        self.assertContains(Client().get(url), 'Общий пост')
+        self.post.group = new
+        self.post.save()
+        self.assertNotContains(Client().get(url), 'Общий пост')
+
+    def test_scope_keys_safe_for_any_username(self):
+        """Функция проверяет, что имя с пробелами не даёт
+        CacheKeyWarning."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            invalidate('user:имя с пробелами')
+            self.client_for(self.author).get(self.url)
+
+    def test_invalidation_reaches_other_processes(self):
+        """Функция проверяет, что версии областей лежат в общем кеше:
+        сброс, сделанный другим процессом, меняет копию и здесь."""
+        self.assertContains(Client().get(self.url), 'Общий пост')
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        self.assertContains(Client().get(self.url), 'Общий пост')
+        caches['shared'].clear()
+        self.assertContains(Client().get(self.url), 'Новый текст')
+
+    def test_forget_personal_versions_context(self):
+        """Функция проверяет, что forget_personal сбрасывает личный
+        контекст через общий кеш."""
+        with mock.patch('posts.views.personal_context',
+                        return_value={}) as build:
+            personal_context(self.reader)
+            personal_context(self.reader)
+            forget_personal(self.reader.pk)
+            personal_context(self.reader)
+        self.assertEqual(build.call_count, 2)
+
+    @override_settings(STREAM_RESPONSES=True)
+    def test_streamed_copy_is_stored(self):
+        """Функция проверяет, что потоковый ответ заполняется по кускам
+        и сохраняется общей копией."""
+        client = self.client_for(self.author)
+        response = client.get(self.url)
+        streamed = b''.join(response.streaming_content)
+        self.assertIn(self.edit_url.encode(), streamed)
+        self.assertNotIn(b'<!--personal', streamed)
+        cached = client.get(self.url)
+        self.assertFalse(cached.streaming)
+        self.assertNotContains(Client().get(self.url), self.edit_url)
+        self.assertEqual(cached.content.count(b'csrfmiddlewaretoken'), 1)
@@ -0,0 +1,76 @@
+import glob
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from ..profiling import _stacks, _stats, profile_token
+
+
+class CProfileMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        _stats.clear()
+        _stacks.clear()
+        self.profiles = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profiles, ignore_errors=True)
+        user = User.objects.create_user(username='Profiled')
+        Post.objects.create(author=user, text='Профиль')
+        self.url = reverse('profile', args=['Profiled'])
+
+    expected = [('profile', 'collapsed'), ('profile', 'prof')]
+
+    def written(self):
+        names = []
+        for path in glob.glob(os.path.join(self.profiles, '*')):
+            name, pid, extension = os.path.basename(path).split('.')
+            names.append((name, extension))
+        return sorted(names)
+
+    def test_sampled_request_written_per_url_name(self):
+        """Функция проверяет запись pstats и collapsed-стеков по имени
+        маршрута."""
+        with self.settings(CPROFILE_SAMPLE_RATE=1.0,
+                           CPROFILE_STACK_INTERVAL=0.0005,
+                           CPROFILE_DIR=self.profiles):
+            Client().get(self.url)
+            Client().get(self.url)
+        self.assertEqual(self.written(), self.expected)
+        collapsed = glob.glob(os.path.join(self.profiles, '*.collapsed'))[0]
+        with open(collapsed) as stacks:
+            lines = stacks.read().splitlines()
+        self.assertTrue(any('views.py' in line for line in lines))
+        self.assertFalse(any(line.startswith('profiling.py')
+                             for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit()
+                            for line in lines))
+
+    @override_settings(STREAM_RESPONSES=True)
+    def test_signed_header_profiles_streamed_body(self):
+        """Функция проверяет профилирование по подписанному заголовку,
+        включая тело потокового ответа."""
+        with self.settings(CPROFILE_SAMPLE_RATE=0.0,
+                           CPROFILE_DIR=self.profiles):
+            response = Client().get(self.url, HTTP_X_PROFILE='подделка')
+            b''.join(response.streaming_content)
+            self.assertEqual(self.written(), [])
+            cache.clear()
+            response = Client().get(self.url, HTTP_X_PROFILE=profile_token())
+            self.assertEqual(self.written(), [])
+            b''.join(response.streaming_content)
+        self.assertEqual(self.written(), self.expected)
+        out = StringIO()
+        merged = os.path.join(self.profiles, 'merged.prof')
+        call_command('profile_report', dir=self.profiles, top=50,
+                     output=merged, stdout=out)
+        self.assertIn('Файлов: 1', out.getvalue())
+        self.assertIn('iter_template', out.getvalue())
+        self.assertTrue(os.path.exists(
+            os.path.join(self.profiles, 'merged.collapsed')))
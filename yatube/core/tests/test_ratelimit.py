@@ -0,0 +1,87 @@
+import threading
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import User
+
+from ..ratelimit import rejected_counts, take_token
+
+RATELIMITS = {'new_post': {'rate': '3/m', 'methods': ('POST',)}}
+
+
+class TokenBucketTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+
+    def test_bucket_allows_burst_then_refills(self):
+        """Функция проверяет ёмкость бакета и его пополнение."""
+        with mock.patch('core.ratelimit.time.time', return_value=1000.0):
+            allowed = [take_token('bucket', '3/m') for _ in range(4)]
+        self.assertEqual(allowed[:3], [0, 0, 0])
+        self.assertEqual(allowed[3], 20)
+        with mock.patch('core.ratelimit.time.time', return_value=1020.0):
+            self.assertEqual(take_token('bucket', '3/m'), 0)
+            self.assertGreater(take_token('bucket', '3/m'), 0)
+
+    def test_shared_incr_is_atomic_and_keeps_timeout(self):
+        """Функция проверяет, что параллельные incr общего кеша не
+        теряют приращений и не продлевают срок жизни ключа."""
+        caches['shared'].set('counter', 0, 30)
+
+        def work():
+            for _ in range(25):
+                caches['shared'].incr('counter')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(caches['shared'].get('counter'), 200)
+        with mock.patch('time.time', return_value=10 ** 10):
+            with self.assertRaises(ValueError):
+                caches['shared'].incr('counter')
+
+
+@override_settings(RATELIMITS=RATELIMITS)
+class RateLimitMiddlewareTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = User.objects.create_user(username='Spammer')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_burst_gets_429_with_retry_after(self):
+        """Функция проверяет ответ 429 с Retry-After при всплеске."""
+        for _ in range(3):
+            response = self.client.post(reverse('new_post'), {'text': 'x'})
+            self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.client.post(reverse('new_post'), {'text': 'x'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertTrue(int(response['Retry-After']) > 0)
+        self.assertEqual(rejected_counts(), {'new_post': 1})
+
+    def test_rejected_request_keeps_other_bucket(self):
+        """Функция проверяет, что отказ по IP не тратит токены
+        пользователя."""
+        neighbour = Client()
+        neighbour.force_login(User.objects.create_user(username='Neighbour'))
+        for _ in range(3):
+            neighbour.post(reverse('new_post'), {'text': 'x'})
+        for _ in range(3):
+            response = self.client.post(reverse('new_post'), {'text': 'x'})
+            self.assertEqual(response.status_code,
+                             HTTPStatus.TOO_MANY_REQUESTS)
+        response = self.client.post(
+            reverse('new_post'), {'text': 'x'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_safe_methods_are_not_limited(self):
+        """Функция проверяет, что GET не расходует токены."""
+        for _ in range(5):
+            response = self.client.get(reverse('new_post'))
+            self.assertEqual(response.status_code, HTTPStatus.OK)
@@ -0,0 +1,69 @@
+import time
+
+from django.core.cache import caches
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve
+
+from posts.models import Group, Post
+
+from ..replication import (PIN_COOKIE, SYNCED_KEY, ReplicaMiddleware,
+                           mark_primary_write, replica_lag)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.factory = RequestFactory()
+        self.routed = []
+
+        def get_response(request):
+            self.routed.append(router.db_for_read(Post))
+            if request.path.endswith('/follow/') or request.method == 'POST':
+                Group.objects.create(title='Запись', slug=request.method)
+            return HttpResponse()
+
+        self.middleware = ReplicaMiddleware(get_response)
+
+    def run_request(self, request):
+        request.resolver_match = resolve(request.path)
+        self.middleware.process_view(request, None, (), {})
+        return self.middleware(request)
+
+    def test_fresh_replica_serves_read_views(self):
+        """Функция проверяет, что свежая реплика обслуживает чтение."""
+        caches['shared'].set(SYNCED_KEY.format('replica'), time.time())
+        self.run_request(self.factory.get('/'))
+        self.assertEqual(self.routed, ['replica'])
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_lagging_replica_is_skipped(self):
+        """Функция проверяет, что отстающая реплика не используется."""
+        caches['shared'].set(SYNCED_KEY.format('replica'), time.time() - 60)
+        mark_primary_write()
+        self.assertGreater(replica_lag('replica'), 5)
+        self.run_request(self.factory.get('/'))
+        self.assertEqual(self.routed, ['default'])
+
+    def test_write_pins_client_to_primary(self):
+        """Функция проверяет закрепление за primary после записи."""
+        caches['shared'].set(SYNCED_KEY.format('replica'), time.time())
+        response = self.run_request(self.factory.post('/new/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.run_request(request)
+        self.assertEqual(self.routed, ['default', 'default'])
+
+    def test_get_with_write_pins_client(self):
+        """Функция проверяет, что запись на GET тоже закрепляет клиента
+        за primary, а чтение без записи -- нет."""
+        caches['shared'].set(SYNCED_KEY.format('replica'), time.time())
+        response = self.run_request(self.factory.get('/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(replica_lag('replica'), 0)
+        response = self.run_request(self.factory.get('/author/follow/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertGreater(replica_lag('replica'), 0)
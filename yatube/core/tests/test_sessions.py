@@ -0,0 +1,66 @@
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import User
+
+from ..sessions import SessionStore, flush_dirty_sessions
+
+
+class CachedSessionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['shared'].clear()
+        self.user = User.objects.create_user(
+            username='Session', password='secret-password')
+        self.client = Client()
+        self.client.login(username='Session', password='secret-password')
+        self.session_key = self.client.session.session_key
+
+    def db_session(self):
+        return Session.objects.get(session_key=self.session_key).get_decoded()
+
+    def test_authenticated_page_needs_no_queries(self):
+        """Функция проверяет, что сессия и пользователь берутся из кеша."""
+        self.client.get(reverse('about:author'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('about:author'))
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_changes_written_behind(self):
+        """Функция проверяет отложенную запись изменённой сессии."""
+        store = SessionStore(self.session_key)
+        store['theme'] = 'dark'
+        with self.assertNumQueries(0):
+            store.save()
+        self.assertNotIn('theme', self.db_session())
+        self.assertEqual(SessionStore(self.session_key)['theme'], 'dark')
+        self.assertEqual(flush_dirty_sessions(), 1)
+        self.assertEqual(self.db_session()['theme'], 'dark')
+        self.assertEqual(flush_dirty_sessions(), 0)
+
+    def test_dirty_sessions_visible_to_other_processes(self):
+        """Функция проверяет, что очередь грязных сессий лежит в общем
+        кеше, а не в кеше процесса, который её заполнил."""
+        store = SessionStore(self.session_key)
+        store['theme'] = 'light'
+        store.save()
+        cache.clear()
+        self.assertEqual(flush_dirty_sessions(), 1)
+        self.assertEqual(self.db_session()['theme'], 'light')
+
+    def test_unchanged_session_not_saved(self):
+        """Функция проверяет, что неизменённая сессия не сохраняется."""
+        store = SessionStore(self.session_key)
+        store.load()
+        store.save()
+        self.assertEqual(flush_dirty_sessions(), 0)
+
+    def test_cached_user_dropped_on_change(self):
+        """Функция проверяет сброс закешированного пользователя."""
+        self.client.get(reverse('about:author'))
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('about:author'))
+        self.assertFalse(response.context['user'].is_authenticated)
@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from ..slow_queries import normalize, params_shape, read_entries
+
+
+class NormalizeTests(TestCase):
+    def test_literals_and_lists_collapsed(self):
+        """Функция проверяет нормализацию SQL и форму параметров."""
+        self.assertEqual(
+            normalize("SELECT * FROM t WHERE a = 'x''y' AND b IN "
+                      "(%s, %s,\n %s) LIMIT 10"),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) LIMIT ?',
+        )
+        self.assertEqual(params_shape([1, 2, 'a', None]),
+                         'int*2,str,NoneType')
+        self.assertEqual(params_shape([(1, 'a'), (2, 'b')], many=True),
+                         '2x(int,str)')
+
+
+class SlowQueryLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.log = os.path.join(directory, 'slow.jsonl')
+        user = User.objects.create_user(username='Slow')
+        Post.objects.create(author=user, text='Медленно')
+
+    def test_entries_attributed_to_view_and_ranked(self):
+        """Функция проверяет запись запросов с именем маршрута, кадром
+        во views.py и ранжирование командой slow_queries."""
+        with self.settings(SLOW_QUERY_THRESHOLD=0, SLOW_QUERY_LOG=self.log):
+            Client().get(reverse('profile', args=['Slow']))
+        entries = list(read_entries(self.log))
+        self.assertTrue(entries)
+        self.assertTrue(all(entry['url_name'] == 'profile'
+                            for entry in entries))
+        self.assertTrue(any(entry['frame'] and entry['frame'].startswith(
+            os.path.join('posts', 'views.py')) for entry in entries))
+        self.assertTrue(any(entry['template'] for entry in entries))
+        self.assertFalse(any("'Slow'" in entry['sql'] for entry in entries))
+        out = StringIO()
+        call_command('slow_queries', log=self.log, top=3, stdout=out)
+        self.assertIn('1. ', out.getvalue())
+        self.assertIn('profile posts', out.getvalue())
+
+    @override_settings(STREAM_RESPONSES=True)
+    def test_streamed_body_keeps_url_name(self):
+        """Функция проверяет имя маршрута у запросов потокового тела."""
+        with self.settings(SLOW_QUERY_THRESHOLD=0, SLOW_QUERY_LOG=self.log):
+            response = Client().get(reverse('profile', args=['Slow']))
+            b''.join(response.streaming_content)
+        self.assertTrue(any(
+            entry['url_name'] == 'profile' and entry['template']
+            for entry in read_entries(self.log)))
+
+    def test_fast_queries_not_logged(self):
+        """Функция проверяет порог журнала."""
+        with self.settings(SLOW_QUERY_THRESHOLD=60,
+                           SLOW_QUERY_LOG=self.log):
+            Client().get(reverse('profile', args=['Slow']))
+        self.assertFalse(os.path.exists(self.log))
+
+    def test_external_rotation_reopens_log(self):
+        """Функция проверяет, что после переименования журнала снаружи
+        записи идут в новый файл, а команда читает оба."""
+        with self.settings(SLOW_QUERY_THRESHOLD=0, SLOW_QUERY_LOG=self.log):
+            Client().get(reverse('profile', args=['Slow']))
+            os.rename(self.log, f'{self.log}.1')
+            cache.clear()
+            Client().get(reverse('profile', args=['Slow']))
+            entries = list(read_entries(self.log))
+        with open(f'{self.log}.1') as rotated, open(self.log) as fresh:
+            counts = [len(rotated.readlines()), len(fresh.readlines())]
+        self.assertTrue(all(counts))
+        self.assertEqual(len(entries), sum(counts))
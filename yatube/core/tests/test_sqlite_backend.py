@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import SimpleTestCase
+
+from ..sqlite_backend.base import DatabaseWrapper
+
+
+class SQLiteBackendTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+
+    def make_wrapper(self, **options):
+        settings_dict = {
+            **connection.settings_dict,
+            'NAME': os.path.join(self.tmp_dir, 'db.sqlite3'),
+            'OPTIONS': {
+                'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+                **options,
+            },
+        }
+        wrapper = DatabaseWrapper(settings_dict, alias='sqlite_test')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_pragmas_applied_on_connect(self):
+        """Функция проверяет применение PRAGMA к новому соединению."""
+        with self.make_wrapper().cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_serialized_writes_take_writer_lock(self):
+        """Функция проверяет, что запись проходит через блокировку
+        писателя и освобождает её."""
+        wrapper = self.make_wrapper(serialize_writes=True)
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (x INTEGER)')
+            cursor.execute('INSERT INTO t VALUES (1)')
+        self.assertTrue(os.path.exists(wrapper.writer_lock.path))
+        self.assertEqual(wrapper.writer_lock._depth, 0)
+        wrapper.set_autocommit(True)
+        with wrapper.cursor():
+            wrapper._start_transaction_under_autocommit()
+            self.assertEqual(wrapper.writer_lock._depth, 1)
+            wrapper.commit()
+        self.assertEqual(wrapper.writer_lock._depth, 0)
@@ -0,0 +1,55 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, override_settings
+
+CSS = 'body { color: #212529; }\n' * 100
+
+
+class CompressedStaticTests(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'site.css'), 'w') as css:
+            css.write(CSS)
+        settings_override = override_settings(
+            STATIC_ROOT=self.root,
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder',
+            ],
+            STATICFILES_STORAGE='core.static.CompressedManifestStorage',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_collectstatic_writes_hashed_and_gzipped_files(self):
+        """Функция проверяет файлы с хешем и их сжатые копии."""
+        hashed = staticfiles_storage.stored_name('css/site.css')
+        self.assertNotEqual(hashed, 'css/site.css')
+        with open(staticfiles_storage.path(hashed) + '.gz', 'rb') as packed:
+            self.assertEqual(gzip.decompress(packed.read()).decode(), CSS)
+
+    def test_hashed_file_served_compressed_and_immutable(self):
+        """Функция проверяет отдачу сжатой копии с вечным кешем."""
+        url = staticfiles_storage.url('css/site.css')
+        response = Client().get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'text/css')
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(body.decode(), CSS)
+
+    def test_plain_name_revalidated(self):
+        """Функция проверяет, что файл без хеша кешируется ненадолго."""
+        response = Client().get('/static/css/site.css')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertNotIn('immutable', response['Cache-Control'])
@@ -0,0 +1,110 @@
+import re
+from unittest import mock
+
+from django.core.cache import cache
+from django.db.models import QuerySet
+from django.template import engines
+from django.template.context import make_context
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post, User
+
+from ..streaming import FLUSH, iter_template
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="\w+"')
+
+
+class StreamingRenderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Streamer')
+        self.group = Group.objects.create(title='Поток', slug='stream')
+        self.post = Post.objects.create(
+            author=self.user, group=self.group, text='Длинное обсуждение')
+        Comment.objects.bulk_create([
+            Comment(post=self.post, author=self.user, text=f'Ответ {number}')
+            for number in range(300)
+        ])
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.urls = [
+            reverse('posts', args=[self.user.username, self.post.id]),
+            reverse('profile', args=[self.user.username]),
+            reverse('group', args=[self.group.slug]),
+            reverse('follow_index'),
+        ]
+
+    def get_chunks(self, url):
+        with override_settings(STREAM_RESPONSES=True):
+            response = self.client.get(url)
+            self.assertTrue(response.streaming)
+            return [chunk.decode() for chunk in response.streaming_content]
+
+    def test_streamed_page_matches_rendered_page(self):
+        """Функция проверяет, что потоковая страница совпадает с обычной."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                chunks = self.get_chunks(url)
+                with override_settings(STREAM_RESPONSES=False):
+                    response = self.client.get(url)
+                self.assertFalse(response.streaming)
+                self.assertHTMLEqual(
+                    CSRF_INPUT.sub('', ''.join(chunks)),
+                    CSRF_INPUT.sub('', response.content.decode()),
+                )
+
+    def test_head_flushed_before_content(self):
+        """Функция проверяет, что шапка уходит первым куском, а
+        комментарии приходят несколькими кусками."""
+        chunks = self.get_chunks(self.urls[0])
+        self.assertIn('</nav>', chunks[0])
+        self.assertNotIn('Длинное обсуждение', chunks[0])
+        self.assertGreater(len(chunks), 2)
+        self.assertIn('Ответ 299', ''.join(chunks))
+
+    def test_csrf_cookie_set_before_stream(self):
+        """Функция проверяет, что cookie с CSRF-токеном ставится заранее."""
+        with override_settings(STREAM_RESPONSES=True):
+            response = Client().get(self.urls[0])
+        self.assertIn('csrftoken', response.cookies)
+
+
+class LazyLoopTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Looper')
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'Пост {number}')
+            for number in range(3)
+        ])
+
+    def render(self, source, posts):
+        template = engines['django'].from_string(source).template
+        return ''.join(
+            piece for piece in iter_template(
+                template, make_context({'posts': posts}))
+            if piece is not FLUSH
+        )
+
+    def test_loop_without_length_reads_iterator(self):
+        """Функция проверяет, что цикл без forloop.last не загружает
+        queryset целиком."""
+        posts = Post.objects.order_by('id')
+        with mock.patch.object(
+                QuerySet, '_fetch_all', side_effect=AssertionError):
+            output = self.render(
+                '{% for post in posts %}{{ forloop.counter }}.'
+                '{{ post.text }};{% endfor %}', posts)
+        self.assertEqual(output, '1.Пост 0;2.Пост 1;3.Пост 2;')
+
+    def test_loop_with_length_matches_render(self):
+        """Функция проверяет forloop.last, revcounter и empty."""
+        source = (
+            '{% for post in posts %}{{ forloop.revcounter }}'
+            '{% if forloop.last %}!{% endif %}{% empty %}-{% endfor %}'
+        )
+        template = engines['django'].from_string(source)
+        for posts in (Post.objects.order_by('id'), Post.objects.none()):
+            with self.subTest(posts=posts):
+                self.assertEqual(self.render(source, posts),
+                                 template.render({'posts': posts}))
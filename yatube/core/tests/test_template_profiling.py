@@ -0,0 +1,37 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from ..template_profiling import precompile_templates, template_names
+
+
+class TemplateProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Renderer')
+        for number in range(3):
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_server_timing_lists_templates(self):
+        """Функция проверяет время рендера по шаблонам в Server-Timing."""
+        response = Client().get(
+            reverse('profile', kwargs={'username': self.user.username}))
+        timing = response['Server-Timing']
+        self.assertIn('misc/post_item.html x3', timing)
+        self.assertIn('misc/base.html x1', timing)
+
+    def test_feed_cards_rendered_in_one_pass(self):
+        """Функция проверяет карточки ленты, отрисованные тегом
+        post_cards."""
+        response = Client().get(reverse('index'))
+        self.assertTemplateUsed(response, 'misc/post_item.html')
+        self.assertContains(response, 'Пост 2')
+        self.assertContains(response, 'card mb-3', count=3)
+
+    def test_precompile_loads_project_templates(self):
+        """Функция проверяет предварительную компиляцию шаблонов."""
+        self.assertIn('misc/index.html', template_names())
+        self.assertGreater(precompile_templates(), 20)
@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import Http404
+from django.test import Client, TestCase, modify_settings, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+TEMP_MEDIA = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+class RecordingMiddleware:
+    exceptions = []
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        self.exceptions.append(exception)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA)
+class TracingTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.trace_file = os.path.join(directory, 'trace.json')
+        user = User.objects.create_user(username='Traced')
+        self.post = Post.objects.create(
+            author=user, text='Трасса',
+            image=SimpleUploadedFile('pic.gif', SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+        self.url = reverse('posts', args=['Traced', self.post.id])
+
+    def events(self):
+        with open(self.trace_file) as trace:
+            return json.loads(trace.read().rstrip(',\n') + ']')
+
+    def test_sampled_request_exported_as_chrome_trace(self):
+        """Функция проверяет вложенные интервалы запроса в файле
+        формата Chrome Trace."""
+        with self.settings(TRACE_SAMPLE_RATE=1.0, TRACE_FILE=self.trace_file):
+            response = Client().get(self.url)
+        events = self.events()
+        categories = {event['cat'] for event in events}
+        self.assertTrue({'request', 'view', 'sql', 'cache', 'template',
+                         'thumbnail', 'storage'} <= categories)
+        root = events[0]
+        self.assertEqual(root['cat'], 'request')
+        self.assertEqual(root['args']['url_name'], 'posts')
+        self.assertEqual(root['args']['request_id'],
+                         response['X-Request-ID'])
+        for event in events[1:]:
+            self.assertEqual(event['ph'], 'X')
+            self.assertGreaterEqual(event['ts'], root['ts'])
+            self.assertLessEqual(event['ts'] + event['dur'],
+                                 root['ts'] + root['dur'] + 1)
+        templates = [event['name'] for event in events
+                     if event['cat'] == 'template']
+        self.assertIn('posts/post.html', templates)
+        self.assertIn('misc/post_item.html', templates)
+
+    def test_request_id_without_sampling(self):
+        """Функция проверяет идентификатор у каждого запроса и пустую
+        трассу вне выборки."""
+        with self.settings(TRACE_SAMPLE_RATE=0.0, TRACE_FILE=self.trace_file):
+            first = Client().get(self.url)
+            second = Client().get(self.url, HTTP_X_REQUEST_ID='edge-12345678')
+        self.assertEqual(len(first['X-Request-ID']), 32)
+        self.assertEqual(second['X-Request-ID'], 'edge-12345678')
+        self.assertFalse(os.path.exists(self.trace_file))
+
+    @override_settings(STREAM_RESPONSES=True)
+    def test_streamed_body_traced(self):
+        """Функция проверяет запись трассы после отдачи потокового
+        тела."""
+        with self.settings(TRACE_SAMPLE_RATE=1.0, TRACE_FILE=self.trace_file):
+            response = Client().get(self.url)
+            self.assertFalse(os.path.exists(self.trace_file))
+            b''.join(response.streaming_content)
+        categories = {event['cat'] for event in self.events()}
+        self.assertTrue({'request', 'view', 'body', 'sql'} <= categories)
+
+    @modify_settings(MIDDLEWARE={'append': f'{__name__}.RecordingMiddleware'})
+    def test_view_exception_reaches_middleware(self):
+        """Функция проверяет, что исключение трассируемой вью доходит до
+        process_exception middleware."""
+        RecordingMiddleware.exceptions.clear()
+        url = reverse('posts', args=['Traced', self.post.id + 100])
+        with self.settings(TRACE_SAMPLE_RATE=1.0, TRACE_FILE=self.trace_file):
+            response = Client().get(url)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(RecordingMiddleware.exceptions), 1)
+        self.assertIsInstance(RecordingMiddleware.exceptions[0], Http404)
+        views = [event['name'] for event in self.events()
+                 if event['cat'] == 'view']
+        self.assertEqual(views, ['view posts'])
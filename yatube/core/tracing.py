@@ -0,0 +1,235 @@
+"""Трассировка отдельных запросов.
+
+Каждый запрос получает идентификатор (заголовок X-Request-ID). Для доли
+TRACE_SAMPLE_RATE запросов записываются вложенные интервалы: вью,
+каждый SQL-запрос, вызовы кеша, рендер шаблонов и include, операции
+sorl и чтения хранилища файлов. Трасса дописывается в TRACE_FILE в
+формате Chrome Trace Event (массив событий «X» без закрывающей скобки,
+что формат допускает): файл открывается в chrome://tracing, Perfetto и
+speedscope. Вне выбранного запроса span() ничего не делает.
+"""
+import json
+import os
+import random
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+
+from django.conf import settings
+from django.template.base import Template
+from django.urls import URLResolver
+
+from .slow_queries import normalize
+
+REQUEST_ID_HEADER = 'HTTP_X_REQUEST_ID'
+REQUEST_ID = re.compile(r'^[\w-]{8,64}$', re.ASCII)
+
+_state = threading.local()
+_lock = threading.Lock()
+_original_render = None
+
+
+class Trace:
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.events = []
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+
+    def add(self, name, category, start, end, args):
+        self.events.append({
+            'name': name, 'cat': category, 'ph': 'X',
+            'ts': round(start * 1_000_000, 3),
+            'dur': round((end - start) * 1_000_000, 3),
+            'pid': self.pid, 'tid': self.tid, 'args': args,
+        })
+
+
+@contextmanager
+def span(name, category, **args):
+    trace = getattr(_state, 'trace', None)
+    if trace is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, category, start, perf_counter(), args)
+
+
+def write_trace(trace, path):
+    line = ''.join(
+        json.dumps(event, ensure_ascii=False) + ',\n'
+        for event in sorted(trace.events, key=lambda event: event['ts']))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _lock:
+        with open(path, 'a', encoding='utf-8') as output:
+            if not output.tell():
+                output.write('[\n')
+            output.write(line)
+
+
+def _traced_render(self, context):
+    with span(self.origin.template_name or '<string>', 'template'):
+        return _original_render(self, context)
+
+
+def install_template_spans():
+    """Оборачивает Template.render: через него рендерятся и страница,
+    и каждый include."""
+    global _original_render
+    if _original_render is None:
+        _original_render = Template.render
+        Template.render = _traced_render
+
+
+def trace_query(execute, sql, params, many, context):
+    if getattr(_state, 'trace', None) is None:
+        return execute(sql, params, many, context)
+    with span(normalize(sql)[:200], 'sql',
+              alias=context['connection'].alias, many=many):
+        return execute(sql, params, many, context)
+
+
+class TracedCacheMixin:
+    def get(self, key, default=None, version=None):
+        with span('cache.get', 'cache', key=key):
+            return super().get(key, default, version)
+
+    def get_many(self, keys, version=None):
+        with span('cache.get_many', 'cache', keys=len(keys)):
+            return super().get_many(keys, version)
+
+    def set(self, key, *args, **kwargs):
+        with span('cache.set', 'cache', key=key):
+            return super().set(key, *args, **kwargs)
+
+    def add(self, key, *args, **kwargs):
+        with span('cache.add', 'cache', key=key):
+            return super().add(key, *args, **kwargs)
+
+    def delete(self, key, version=None):
+        with span('cache.delete', 'cache', key=key):
+            return super().delete(key, version)
+
+    def incr(self, key, delta=1, version=None):
+        with span('cache.incr', 'cache', key=key):
+            return super().incr(key, delta, version)
+
+
+class TracedThumbnailMixin:
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with span('thumbnail.get', 'thumbnail', geometry=geometry_string):
+            return super().get_thumbnail(file_, geometry_string, **options)
+
+    def _create_thumbnail(self, source_image, geometry_string, options,
+                          thumbnail):
+        with span('thumbnail.create', 'thumbnail', file=thumbnail.name):
+            return super()._create_thumbnail(
+                source_image, geometry_string, options, thumbnail)
+
+
+class TracedStorageMixin:
+    def _open(self, name, mode='rb'):
+        with span('storage.open', 'storage', file=name):
+            return super()._open(name, mode)
+
+    def exists(self, name):
+        with span('storage.exists', 'storage', file=name):
+            return super().exists(name)
+
+    def size(self, name):
+        with span('storage.size', 'storage', file=name):
+            return super().size(name)
+
+
+class TracingMiddleware:
+    """Идентификатор запроса и трасса. Ставится первым, чтобы трасса
+    охватывала все middleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install_template_spans()
+
+    def __call__(self, request):
+        request_id = request.META.get(REQUEST_ID_HEADER, '')
+        if not REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        trace = None
+        if random.random() < settings.TRACE_SAMPLE_RATE:
+            trace = _state.trace = Trace(request_id)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.trace = None
+        response['X-Request-ID'] = request_id
+        if trace is None:
+            return response
+        if response.streaming:
+            response.streaming_content = self._traced_stream(
+                iter(response.streaming_content), request,
+                response.status_code, trace, start)
+        else:
+            self._finish(request, response.status_code, trace, start)
+        return response
+
+    def _traced_stream(self, chunks, request, status, trace, start):
+        try:
+            while True:
+                _state.trace = trace
+                try:
+                    with span('response.chunk', 'body'):
+                        chunk = next(chunks)
+                except StopIteration:
+                    return
+                finally:
+                    _state.trace = None
+                yield chunk
+        finally:
+            self._finish(request, status, trace, start)
+
+    @staticmethod
+    def _finish(request, status, trace, start):
+        match = getattr(request, 'resolver_match', None)
+        trace.add(
+            f'{request.method} {request.path}', 'request', start,
+            perf_counter(), {
+                'request_id': trace.request_id,
+                'url_name': match.view_name if match else None,
+                'status': status,
+            },
+        )
+        write_trace(trace, settings.TRACE_FILE)
+
+
+def traced_view(view_func):
+    """Интервал самой вью. Вью по-прежнему вызывает обработчик Django,
+    поэтому process_exception и ATOMIC_REQUESTS работают как обычно,
+    а атрибуты вью (csrf_exempt и т. п.) копируются на обёртку."""
+    if getattr(view_func, 'traced', False):
+        return view_func
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        match = request.resolver_match
+        with span(f'view {match.view_name}', 'view', kwargs=kwargs):
+            return view_func(request, *args, **kwargs)
+    wrapper.traced = True
+    return wrapper
+
+
+def trace_urlpatterns(urlpatterns):
+    """Оборачивает traced_view вью всех маршрутов, включая вложенные
+    через include."""
+    for pattern in urlpatterns:
+        if isinstance(pattern, URLResolver):
+            trace_urlpatterns(pattern.url_patterns)
+        else:
+            pattern.callback = traced_view(pattern.callback)
+    return urlpatterns
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from .metrics import exposition
+from .ratelimit import client_ip
+
+
+def metrics(request):
+    if client_ip(request) not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,6 +1,7 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-from .models import Group, Post
+from .deletion import schedule_post_deletion
+from .models import DeletionTask, Group, Post
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +11,19 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
     group = ('group',)
 
+    def get_deleted_objects(self, objs, request):
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        schedule_post_deletion(obj)
+        self.message_user(
+            request, f'Пост {obj.pk} будет удалён в фоне.', messages.INFO
+        )
+
+    def delete_queryset(self, request, queryset):
+        for post in queryset:
+            schedule_post_deletion(post)
+
 
 admin.site.register(Post, PostAdmin)
 
@@ -21,3 +35,14 @@ class GroupAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Group, GroupAdmin)
+
+
+class DeletionTaskAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'kind', 'title', 'created', 'finished',
+                    'deleted_rows', 'deleted_files')
+    list_filter = ('kind', 'finished')
+    readonly_fields = list_display
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(DeletionTask, DeletionTaskAdmin)
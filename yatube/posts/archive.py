@@ -0,0 +1,134 @@
+"""Горячие и холодные посты.
+
+Посты старше ARCHIVE_AFTER_DAYS вместе с комментариями переносятся
+командой archive_posts в таблицы ArchivedPost/ArchivedComment той же базы
+(или того же шарда). Архивные посты всегда старше горячих, поэтому ленты
+читают горячую таблицу и обращаются к архиву, только когда страница
+выходит за её границу. Горячую часть лент с cache_ids=True страницы
+берут из кеша лент (см. feeds).
+
+Число архивных постов ленты кешируется в кеше shared с номером
+поколения архива в ключе: archive_posts и удаление меняют поколение,
+подписки сбрасывают счётчик ленты подписок (invalidate_cold_counts).
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.functional import cached_property
+
+from . import feeds
+from .hidden import visible
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .sharding import feed
+
+GENERATION_KEY = 'archive:generation'
+COLD_COUNT_KEY = 'archive:count:{}:{}'
+
+
+def generation():
+    return caches['shared'].get_or_set(GENERATION_KEY, 1, None)
+
+
+def bump_generation():
+    shared = caches['shared']
+    try:
+        shared.incr(GENERATION_KEY)
+    except ValueError:
+        shared.set(GENERATION_KEY, 2, None)
+
+
+def invalidate_cold_counts(*count_keys):
+    current = generation()
+    caches['shared'].delete_many(
+        [COLD_COUNT_KEY.format(current, key) for key in count_keys])
+
+
+class TieredFeed:
+    def __init__(self, hot, cold, count_key, cache_ids=False):
+        self.hot = hot
+        self.cold = cold
+        self.count_key = count_key
+        self.cache_ids = cache_ids
+
+    @cached_property
+    def hot_count(self):
+        return self.hot.count()
+
+    def cold_count(self):
+        shared = caches['shared']
+        key = COLD_COUNT_KEY.format(generation(), self.count_key)
+        count = shared.get(key)
+        if count is None:
+            count = self.cold.count()
+            shared.set(key, count, settings.ARCHIVE_COUNT_TIMEOUT)
+        return count
+
+    def count(self):
+        return self.hot_count + self.cold_count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        ids = None
+        if self.cache_ids:
+            ids = feeds.newest_ids(self.count_key, self.hot)
+        # Неполный список -- это вся горячая таблица.
+        if ids is not None and (
+                stop <= len(ids) or len(ids) < settings.FEED_IDS_SIZE):
+            hot_ids = ids[start:stop]
+            posts = feeds.cards(hot_ids)
+            taken, hot_count = len(hot_ids), len(ids)
+        else:
+            posts = list(self.hot[start:stop])
+            taken = len(posts)
+            hot_count = start + taken if posts else self.hot_count
+        if taken < stop - start:
+            cold_start = max(start - hot_count, 0)
+            posts += list(self.cold[cold_start:stop - hot_count])
+        return posts
+
+
+def with_archive(hot, cold, count_key, author_ids=None, cache_ids=False):
+    return TieredFeed(
+        feed(visible(hot), author_ids), feed(visible(cold), author_ids),
+        count_key, cache_ids,
+    )
+
+
+def archive_batch(cutoff, using, batch_size):
+    """Переносит в архив до batch_size самых старых постов до cutoff.
+
+    Возвращает число перенесённых постов.
+    """
+    with transaction.atomic(using=using):
+        posts = list(
+            Post.objects.using(using).filter(pub_date__lt=cutoff)
+            .order_by('pub_date')[:batch_size]
+        )
+        if not posts:
+            return 0
+        post_ids = [post.id for post in posts]
+        comments = Comment.objects.using(using).filter(post_id__in=post_ids)
+        ArchivedPost.objects.using(using).bulk_create([
+            ArchivedPost(
+                id=post.id, text=post.text, pub_date=post.pub_date,
+                author_id=post.author_id, group_id=post.group_id,
+                image=post.image.name,
+            )
+            for post in posts
+        ])
+        ArchivedComment.objects.using(using).bulk_create([
+            ArchivedComment(
+                id=comment.id, post_id=comment.post_id,
+                author_id=comment.author_id, text=comment.text,
+                created=comment.created,
+            )
+            for comment in comments
+        ])
+        comments.delete()
+        Post.objects.using(using).filter(id__in=post_ids).delete()
+    return len(posts)
@@ -0,0 +1,242 @@
+"""Фоновое удаление пользователей и постов.
+
+Вместо каскада Collector, который загружает в память все зависимые
+объекты и надолго держит блокировку записи, пользователь сразу
+деактивируется, а зависимые строки удаляются командой process_deletions
+короткими транзакциями не больше batch_size строк. Вместе с постами
+удаляются их картинки и миниатюры sorl.
+
+Посты из очереди сразу пропадают из лент (см. hidden). Порции удаляются
+без сигналов, поэтому кеши лент, счётчиков и страниц сбрасываются здесь
+же после каждой порции.
+"""
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_image
+
+from core import page_cache
+from core.auth import forget_user
+
+from . import feeds, hidden
+from .archive import bump_generation
+from .models import (ArchivedComment, ArchivedPost, Comment, DeletionTask,
+                     Follow, Group, Post, User)
+from .paginator import invalidate_counts
+from .sharding import SHARDED_MODELS, shard_for_author
+
+COMMENT_MODELS = {Post: Comment, ArchivedPost: ArchivedComment}
+POST_MODELS = {Comment: Post, ArchivedComment: ArchivedPost}
+
+
+def raw_delete(queryset):
+    """Один DELETE без сигналов и обхода связей."""
+    return queryset._raw_delete(queryset.db)
+
+
+def _invalidate_user_pages(user_ids):
+    page_cache.invalidate(*(
+        f'user:{username}' for username in User.objects.filter(
+            id__in=user_ids).values_list('username', flat=True)
+    ))
+
+
+def _invalidate_feeds(author_ids, group_ids, post_ids=()):
+    """Сбрасывает списки лент, счётчики и страницы с постами авторов
+    и групп, а также карточки постов post_ids."""
+    feed_keys = [
+        'index',
+        *(f'profile:{author_id}' for author_id in author_ids),
+        *(f'group:{group_id}' for group_id in group_ids),
+    ]
+    feeds.invalidate(feed_keys, post_ids)
+    invalidate_counts(*feed_keys, *(
+        f'follow:{user_id}' for user_id in Follow.objects.filter(
+            author_id__in=author_ids).values_list('user_id', flat=True)
+    ))
+    page_cache.invalidate('index', *(
+        f'group:{slug}' for slug in Group.objects.filter(
+            id__in=group_ids).values_list('slug', flat=True)
+    ))
+    _invalidate_user_pages(author_ids)
+
+
+def schedule_user_deletion(user):
+    User.objects.filter(pk=user.pk).update(is_active=False)
+    forget_user(user.pk)
+    task, _ = DeletionTask.objects.get_or_create(
+        kind=DeletionTask.USER, object_id=user.pk,
+        defaults={'title': user.username},
+    )
+    hidden.forget()
+    alias = shard_for_author(user.pk) or 'default'
+    group_ids = set()
+    for model in (Post, ArchivedPost):
+        group_ids.update(
+            model.objects.using(alias).filter(author_id=user.pk)
+            .exclude(group_id=None).values_list('group_id', flat=True)
+            .distinct()
+        )
+    bump_generation()
+    _invalidate_feeds({user.pk}, group_ids)
+    page_cache.forget_personal(user.pk)
+    return task
+
+
+def schedule_post_deletion(post):
+    task, _ = DeletionTask.objects.get_or_create(
+        kind=DeletionTask.POST, object_id=post.pk,
+        defaults={'title': f'{post.author.username}/{post.pk}'},
+    )
+    hidden.forget()
+    if isinstance(post, ArchivedPost):
+        bump_generation()
+    _invalidate_feeds(
+        {post.author_id}, {post.group_id} - {None}, [post.pk])
+    return task
+
+
+def _post_databases():
+    return settings.POST_SHARDS or ['default']
+
+
+def _delete_posts(model, alias, posts, batch_size):
+    """Удаляет сначала комментарии постов порциями, затем сами посты
+    и их файлы. Возвращает (строк, файлов)."""
+    comment_model = COMMENT_MODELS[model]
+    post_ids = [post_id for post_id, image, author_id, group_id in posts]
+    author_ids = {author_id for _, _, author_id, _ in posts}
+    comment_ids = list(
+        comment_model.objects.using(alias).filter(post_id__in=post_ids)
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if comment_ids:
+        rows = raw_delete(comment_model.objects.using(alias).filter(
+            id__in=comment_ids))
+        _invalidate_user_pages(author_ids)
+        return rows, 0
+    rows = raw_delete(model.objects.using(alias).filter(id__in=post_ids))
+    images = [image for _, image, _, _ in posts if image]
+    for image in images:
+        delete_image(image)
+    if model is ArchivedPost:
+        bump_generation()
+    _invalidate_feeds(
+        author_ids,
+        {group_id for _, _, _, group_id in posts if group_id is not None},
+        post_ids,
+    )
+    return rows, len(images)
+
+
+def _delete_comments(model, alias, user_id, batch_size):
+    """Удаляет порцию комментариев пользователя к чужим постам и
+    сбрасывает страницы авторов этих постов."""
+    comments = list(
+        model.objects.using(alias).filter(author_id=user_id)
+        .values_list('id', 'post_id')[:batch_size]
+    )
+    if not comments:
+        return 0
+    rows = raw_delete(model.objects.using(alias).filter(
+        id__in=[comment_id for comment_id, post_id in comments]))
+    _invalidate_user_pages(set(
+        POST_MODELS[model].objects.using(alias).filter(
+            id__in={post_id for comment_id, post_id in comments})
+        .values_list('author_id', flat=True)
+    ))
+    return rows
+
+
+def _delete_follows(user_id, batch_size):
+    """Удаляет порцию подписок пользователя и на пользователя."""
+    follows = list(
+        Follow.objects.filter(Q(user_id=user_id) | Q(author_id=user_id))
+        .values_list('id', 'user_id', 'author_id')[:batch_size]
+    )
+    if not follows:
+        return 0
+    rows = raw_delete(Follow.objects.filter(
+        id__in=[follow_id for follow_id, _, _ in follows]))
+    followers = {follower for _, follower, _ in follows}
+    invalidate_counts(*(f'follow:{follower}' for follower in followers))
+    for follower in followers:
+        page_cache.forget_personal(follower)
+    _invalidate_user_pages(
+        followers | {author_id for _, _, author_id in follows})
+    return rows
+
+
+def _delete_user_row(user_id):
+    """Удаляет оставшиеся в глобальной базе связи и саму строку
+    пользователя, не обходя шардированные таблицы через Collector."""
+    for relation in User._meta.related_objects:
+        model = relation.related_model
+        if model._meta.label_lower in SHARDED_MODELS:
+            continue
+        queryset = model._base_manager.using('default').filter(
+            **{relation.field.name: user_id})
+        if relation.on_delete is models.SET_NULL:
+            queryset.update(**{relation.field.name: None})
+        elif relation.on_delete is models.CASCADE:
+            raw_delete(queryset)
+    for field in User._meta.many_to_many:
+        through = field.remote_field.through
+        raw_delete(through.objects.using('default').filter(
+            **{field.m2m_field_name(): user_id}))
+    forget_user(user_id)
+    page_cache.forget_personal(user_id)
+    return raw_delete(User.objects.using('default').filter(pk=user_id))
+
+
+def _step_user(task, batch_size):
+    user_id = task.object_id
+    alias = shard_for_author(user_id) or 'default'
+    for model in (Post, ArchivedPost):
+        posts = list(
+            model.objects.using(alias).filter(author_id=user_id)
+            .values_list('id', 'image', 'author_id', 'group_id')[:batch_size]
+        )
+        if posts:
+            return _delete_posts(model, alias, posts, batch_size)
+    for alias in _post_databases():
+        for model in (Comment, ArchivedComment):
+            rows = _delete_comments(model, alias, user_id, batch_size)
+            if rows:
+                return rows, 0
+    return _delete_follows(user_id, batch_size), 0
+
+
+def _step_post(task, batch_size):
+    for alias in _post_databases():
+        for model in (Post, ArchivedPost):
+            posts = list(
+                model.objects.using(alias).filter(id=task.object_id)
+                .values_list('id', 'image', 'author_id', 'group_id')
+            )
+            if posts:
+                return _delete_posts(model, alias, posts, batch_size)
+    return 0, 0
+
+
+def step(task, batch_size):
+    """Выполняет одну ограниченную порцию удаления.
+
+    Возвращает число удалённых строк; ноль означает, что задача
+    завершена.
+    """
+    run_step = _step_user if task.kind == DeletionTask.USER else _step_post
+    rows, files = run_step(task, batch_size)
+    if not rows and task.kind == DeletionTask.USER:
+        with transaction.atomic(using='default'):
+            rows = _delete_user_row(task.object_id)
+        task.finished = timezone.now()
+    elif not rows:
+        task.finished = timezone.now()
+    task.deleted_rows += rows
+    task.deleted_files += files
+    task.save(update_fields=['deleted_rows', 'deleted_files', 'finished'])
+    if task.finished:
+        hidden.forget()
+    return 0 if task.finished else rows
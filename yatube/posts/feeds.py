@@ -0,0 +1,144 @@
+"""Кеш лент: списки id и карточки постов.
+
+Для общей ленты, лент групп и лент авторов в кеше лежат id
+FEED_IDS_SIZE новейших горячих постов массивом array('q') -- несколько
+байт на пост вместо pickle моделей. Новый пост, смена группы и удаление
+сбрасывают затронутые списки через invalidate(), и следующий запрос
+строит их заново одним запросом. Списки не правятся на месте: чтение
+и запись списка гонялись бы с параллельными записями. Короткий
+FEED_IDS_TIMEOUT ограничивает жизнь списка, построенного по данным
+до записи.
+
+Посты хранятся отдельно, по ключу на пост, в виде PostCard с
+__slots__: текст, дата, картинка, имя автора и slug группы. Страница
+ленты собирает карточки одним cache.get_many и читает из базы только
+недостающие. Карточки сбрасываются той же invalidate() при правке
+поста и при изменении автора (invalidate_author).
+"""
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Group, Post, User
+from .sharding import attach_global_relations, shard_for_author
+
+IDS_KEY = 'feed:ids:{}'
+CARD_KEY = 'feed:card:{}'
+
+
+class PostCard:
+    """Снимок поста для лент. author, group и image собираются из полей
+    снимка без запросов к базе."""
+
+    __slots__ = (
+        'id', 'text', 'pub_date', 'image_name', 'author_id', 'username',
+        'first_name', 'last_name', 'group_id', 'group_slug',
+    )
+
+    def __init__(self, post):
+        self.id = post.id
+        self.text = post.text
+        self.pub_date = post.pub_date
+        self.image_name = post.image.name or ''
+        self.author_id = post.author_id
+        self.username = post.author.username
+        self.first_name = post.author.first_name
+        self.last_name = post.author.last_name
+        self.group_id = post.group_id
+        self.group_slug = post.group.slug if post.group_id else None
+
+    @property
+    def author(self):
+        return User(
+            id=self.author_id, username=self.username,
+            first_name=self.first_name, last_name=self.last_name,
+        )
+
+    @property
+    def group(self):
+        if self.group_id is None:
+            return None
+        return Group(id=self.group_id, slug=self.group_slug)
+
+    @property
+    def image(self):
+        field = Post._meta.get_field('image')
+        return field.attr_class(None, field, self.image_name)
+
+    @property
+    def pub_date_format(self):
+        return self.pub_date.strftime('%d %b %Y')
+
+
+def feed_keys(post):
+    keys = ['index', f'profile:{post.author_id}']
+    if post.group_id is not None:
+        keys.append(f'group:{post.group_id}')
+    return keys
+
+
+def _store_cards(posts):
+    cache.set_many(
+        {CARD_KEY.format(post.id): PostCard(post) for post in posts},
+        settings.FEED_CARD_TIMEOUT,
+    )
+
+
+def newest_ids(feed_key, hot):
+    """id новейших постов ленты. Промах строит список одним срезом hot
+    и заодно кладёт в кеш карточки его постов."""
+    key = IDS_KEY.format(feed_key)
+    ids = cache.get(key)
+    if ids is None:
+        posts = hot[:settings.FEED_IDS_SIZE]
+        if not settings.POST_SHARDS:
+            posts = posts.select_related('author', 'group')
+        posts = list(posts)
+        _store_cards(posts)
+        ids = array('q', (post.id for post in posts))
+        cache.set(key, ids, settings.FEED_IDS_TIMEOUT)
+    return ids
+
+
+def cards(ids):
+    """Карточки постов в порядке ids. Пропавшие из базы посты
+    пропускаются."""
+    found = cache.get_many([CARD_KEY.format(post_id) for post_id in ids])
+    by_id = {card.id: card for card in found.values()}
+    missing = [post_id for post_id in ids if post_id not in by_id]
+    if missing:
+        queryset = Post.objects.filter(id__in=missing)
+        if settings.POST_SHARDS:
+            posts = attach_global_relations([
+                post for alias in settings.POST_SHARDS
+                for post in queryset.using(alias)
+            ])
+        else:
+            posts = list(queryset.select_related('author', 'group'))
+        _store_cards(posts)
+        by_id.update((post.id, PostCard(post)) for post in posts)
+    return [by_id[post_id] for post_id in ids if post_id in by_id]
+
+
+def invalidate(feed_keys=(), post_ids=()):
+    """Сбрасывает списки лент feed_keys и карточки постов post_ids."""
+    cache.delete_many(
+        [IDS_KEY.format(feed_key) for feed_key in feed_keys]
+        + [CARD_KEY.format(post_id) for post_id in post_ids]
+    )
+
+
+def invalidate_author(author_id):
+    """Сбрасывает карточки постов автора и списки, где они есть:
+    карточки хранят имя автора."""
+    alias = shard_for_author(author_id) or 'default'
+    posts = list(Post.objects.using(alias).filter(
+        author_id=author_id).values_list('id', 'group_id'))
+    invalidate(
+        ['index', f'profile:{author_id}', *{
+            f'group:{group_id}' for _, group_id in posts
+            if group_id is not None
+        }],
+        [post_id for post_id, _ in posts],
+    )
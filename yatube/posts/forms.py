@@ -1,6 +1,7 @@
 from django.forms import ModelForm
 from django.forms.widgets import Textarea
 
+from .lookups import all_groups
 from .models import Comment, Post
 
 
@@ -9,6 +10,13 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        group = self.fields['group']
+        group.choices = [('', group.empty_label)] + [
+            (item.pk, str(item)) for item in all_groups()
+        ]
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,42 @@
+"""Посты, ожидающие фонового удаления.
+
+Пока process_deletions удаляет строки порциями, посты удаляемых
+пользователей и удаляемые посты не должны попадать в ленты. Их id
+берутся из незавершённых DeletionTask и хранятся в общем кеше, пока
+очередь удаления не изменится: её меняют и веб-процессы, и команда
+process_deletions, и сброс должен быть виден им всем.
+"""
+from django.core.cache import caches
+
+from .models import DeletionTask
+
+PENDING_KEY = 'deletion:pending'
+
+
+def pending():
+    """(id авторов, id постов) незавершённых задач удаления."""
+    hidden = caches['shared'].get(PENDING_KEY)
+    if hidden is None:
+        tasks = DeletionTask.objects.filter(finished__isnull=True)
+        hidden = (
+            frozenset(tasks.filter(kind=DeletionTask.USER).values_list(
+                'object_id', flat=True)),
+            frozenset(tasks.filter(kind=DeletionTask.POST).values_list(
+                'object_id', flat=True)),
+        )
+        caches['shared'].set(PENDING_KEY, hidden, None)
+    return hidden
+
+
+def forget():
+    caches['shared'].delete(PENDING_KEY)
+
+
+def visible(queryset):
+    """queryset постов без ожидающих удаления."""
+    author_ids, post_ids = pending()
+    if author_ids:
+        queryset = queryset.exclude(author_id__in=author_ids)
+    if post_ids:
+        queryset = queryset.exclude(id__in=post_ids)
+    return queryset
@@ -0,0 +1,89 @@
+"""Кеш групп и имён пользователей в памяти процесса.
+
+Группы и соответствие username → id почти не меняются, а нужны почти
+каждой странице. Процесс держит их в словарях и сверяет только версию
+в кеше shared, общем для всех процессов: сигналы при изменении Group
+или User записывают новую версию, и все процессы при следующем
+обращении сбрасывают свои копии. Группы после сброса перечитываются
+целиком, имена пользователей — по одному при промахе. Наружу отдаются
+копии групп, чтобы правка объекта в одном запросе не попала в другие.
+"""
+import uuid
+from copy import deepcopy
+
+from django.core.cache import caches
+from django.http import Http404
+
+from core.auth import cached_user
+
+from .models import Group, User
+
+VERSION_KEY = 'lookups:version'
+
+_state = {'version': None, 'groups': None, 'usernames': {}}
+
+
+def invalidate():
+    caches['shared'].set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _current():
+    shared = caches['shared']
+    version = shared.get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        if not shared.add(VERSION_KEY, version, None):
+            version = shared.get(VERSION_KEY)
+    if version != _state['version']:
+        _state.update(version=version, groups=None, usernames={})
+    return _state
+
+
+def _groups():
+    state = _current()
+    groups = state['groups']
+    if groups is None:
+        group_list = list(Group.objects.order_by('pk'))
+        groups = {
+            'list': group_list,
+            'slug': {group.slug: group for group in group_list},
+        }
+        state['groups'] = groups
+    return groups
+
+
+def preload():
+    """Заполняет кеш при старте процесса."""
+    _groups()
+    _current()['usernames'].update(
+        User.objects.filter(is_active=True).values_list('username', 'id'))
+
+
+def all_groups():
+    return deepcopy(_groups()['list'])
+
+
+def get_group_or_404(slug):
+    group = deepcopy(_groups()['slug'].get(slug))
+    if group is None:
+        group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        raise Http404
+    return group
+
+
+def get_user_or_404(username):
+    """Активный пользователь по имени: id из памяти процесса, объект
+    из общего кеша пользователей (каждый раз новая копия)."""
+    usernames = _current()['usernames']
+    user_id = usernames.get(username)
+    user = cached_user(user_id) if user_id is not None else None
+    if user is None or user.username != username:
+        usernames.pop(username, None)
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            raise Http404
+        usernames[username] = user.id
+    if not user.is_active:
+        raise Http404
+    return user
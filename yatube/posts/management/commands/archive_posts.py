@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.archive import archive_batch, bump_generation
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты и их комментарии в архивные таблицы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Архивировать посты старше указанного числа дней.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        for alias in settings.POST_SHARDS or ['default']:
+            while True:
+                moved = archive_batch(cutoff, alias, options['batch_size'])
+                if not moved:
+                    break
+                total += moved
+                bump_generation()
+                self.stdout.write(f'{alias}: перенесено {moved}')
+        self.stdout.write(f'Всего в архиве новых постов: {total}')
@@ -0,0 +1,55 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from posts.media_gc import collect
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из MEDIA_ROOT картинки без постов и миниатюры '
+            'без исходных картинок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько места освободится.',
+        )
+        parser.add_argument(
+            '--quarantine', nargs='?', metavar='DIR',
+            const=os.path.join(settings.MEDIA_ROOT, '.quarantine'),
+            help='Переносить файлы в карантин вместо удаления.',
+        )
+        parser.add_argument(
+            '--limit', type=int,
+            help='Не больше стольких файлов за проход.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=settings.MEDIA_GC_MIN_AGE,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.MEDIA_GC_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        report = collect(
+            dry_run=options['dry_run'], quarantine=options['quarantine'],
+            limit=options['limit'], min_age=options['min_age'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(
+            f'Просмотрено файлов: {report.scanned} '
+            f'({filesizeformat(report.scanned_bytes)}), '
+            f'лишних: {report.orphans} '
+            f'({filesizeformat(report.orphan_bytes)}), '
+            f'слишком новых: {report.fresh}')
+        if options['dry_run']:
+            return
+        action = 'Перенесено в карантин' if options['quarantine'] \
+            else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action}: {report.removed} '
+            f'({filesizeformat(report.removed_bytes)})'))
+        if not report.complete:
+            self.stdout.write('Достигнут --limit, запустите ещё раз.')
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.trending import compact
+
+
+class Command(BaseCommand):
+    help = 'Сжимает оценки популярного и обновляет кеш топа.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Повторять каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            dropped = compact()
+            self.stdout.write(f'Выбыло из рейтинга: {dropped}')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.deletion import step
+from posts.models import DeletionTask
+
+
+class Command(BaseCommand):
+    help = 'Удаляет пользователей и посты из очереди порциями.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Пауза между порциями в секундах, чтобы не занимать '
+                 'писателя SQLite подолгу.',
+        )
+
+    def handle(self, *args, **options):
+        tasks = DeletionTask.objects.filter(finished__isnull=True)
+        for task in tasks:
+            while step(task, options['batch_size']):
+                self.stdout.write(
+                    f'{task}: удалено строк {task.deleted_rows}, '
+                    f'файлов {task.deleted_files}'
+                )
+                time.sleep(options['pause'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{task}: готово, строк {task.deleted_rows}, '
+                f'файлов {task.deleted_files}'
+            ))
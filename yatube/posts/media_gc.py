@@ -0,0 +1,191 @@
+"""Сборка мусора в MEDIA_ROOT.
+
+Старые картинки постов после замены в post_edit и миниатюры удалённых
+картинок остаются на диске. Дерево обходится потоково через os.scandir,
+файлы проверяются пачками: картинки в posts/ -- по Post.image и
+ArchivedPost.image во всех базах постов, миниатюры в THUMBNAIL_PREFIX --
+по хранилищу ключей sorl (таблица KVStore). Миниатюра живая, только
+если её ключ есть в хранилище и её исходная картинка кому-то нужна.
+
+Файлы моложе min_age не трогаются: картинка сохраняется на диск раньше,
+чем строка поста попадает в базу. За проход удаляется не больше limit
+файлов; вместо удаления файлы можно переносить в карантин.
+"""
+import json
+import os
+import time
+
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from .models import ArchivedPost, Post
+
+IMAGE_MODELS = (Post, ArchivedPost)
+
+
+class Report:
+    def __init__(self):
+        self.scanned = self.scanned_bytes = 0
+        self.orphans = self.orphan_bytes = 0
+        self.removed = self.removed_bytes = 0
+        self.fresh = 0
+        self.complete = True
+
+
+def walk(root, skip=()):
+    """Файлы дерева root: (путь относительно root, размер, mtime).
+    Каталоги читаются по одному, без списка всего дерева в памяти."""
+    stack = ['']
+    while stack:
+        relative = stack.pop()
+        try:
+            entries = os.scandir(os.path.join(root, relative))
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                path = os.path.join(relative, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    if path not in skip:
+                        stack.append(path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    name = path.replace(os.sep, '/')
+                    yield name, stat.st_size, stat.st_mtime
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def referenced_images(names):
+    """Имена из names, на которые ссылается хоть один пост."""
+    found = set()
+    for alias in settings.POST_SHARDS or ['default']:
+        for model in IMAGE_MODELS:
+            found.update(
+                model.objects.using(alias).filter(image__in=names)
+                .values_list('image', flat=True))
+    return found
+
+
+def _thumbnail_key(name):
+    return add_prefix(ImageFile(name, default.storage).key)
+
+
+def dead_thumbnails(batch_size):
+    """Ключи миниатюр, исходные картинки которых не нужны ни одному
+    посту, и ключи хранилища самих исходных картинок."""
+    prefix = add_prefix('', 'thumbnails')
+    dead, dead_sources = set(), []
+    rows = KVStore.objects.filter(key__startswith=prefix).values_list(
+        'key', 'value').order_by('key').iterator()
+    for batch in _batches(rows, batch_size):
+        source_keys = {
+            add_prefix(key[len(prefix):]): (key, json.loads(value))
+            for key, value in batch
+        }
+        names = {
+            key: json.loads(value)['name']
+            for key, value in KVStore.objects.filter(
+                key__in=source_keys).values_list('key', 'value')
+        }
+        live = referenced_images(list(names.values()))
+        for key, (thumbnails_key, thumbnail_keys) in source_keys.items():
+            if names.get(key) not in live:
+                dead.update(add_prefix(thumbnail) for thumbnail in
+                            thumbnail_keys)
+                dead_sources += [key, thumbnails_key]
+    return dead, dead_sources
+
+
+def orphans(files, dead, batch_size):
+    """Неиспользуемые файлы из потока (путь, размер, mtime)."""
+    upload_to = Post.image.field.upload_to
+    thumbnail_prefix = thumbnail_settings.THUMBNAIL_PREFIX
+    for batch in _batches(files, batch_size):
+        images = [name for name, size, mtime in batch
+                  if name.startswith(upload_to)]
+        live_images = referenced_images(images) if images else set()
+        keys = {name: _thumbnail_key(name) for name, size, mtime in batch
+                if name.startswith(thumbnail_prefix)}
+        stored = set(KVStore.objects.filter(
+            key__in=keys.values()).values_list('key', flat=True))
+        for name, size, mtime in batch:
+            if name in keys:
+                key = keys[name]
+                if key not in stored or key in dead:
+                    yield name, size, key
+            elif name.startswith(upload_to) and name not in live_images:
+                yield name, size, None
+
+
+def _remove(root, name, quarantine):
+    path = os.path.join(root, name)
+    if quarantine:
+        os.renames(path, os.path.join(quarantine, name))
+        return
+    os.remove(path)
+    # Пустые каталоги миниатюр тоже замедляют обход.
+    directory = os.path.dirname(name)
+    while directory:
+        try:
+            os.rmdir(os.path.join(root, directory))
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+def collect(dry_run=False, quarantine=None, limit=None, min_age=None,
+            batch_size=None):
+    """Один проход сборки мусора. Возвращает Report; complete=False,
+    если проход остановлен на limit."""
+    root = settings.MEDIA_ROOT
+    min_age = settings.MEDIA_GC_MIN_AGE if min_age is None else min_age
+    batch_size = batch_size or settings.MEDIA_GC_BATCH_SIZE
+    report = Report()
+    skip = ()
+    if quarantine and os.path.commonpath(
+            [root, quarantine]) == os.path.normpath(root):
+        skip = (os.path.relpath(quarantine, root),)
+    dead, dead_sources = dead_thumbnails(batch_size)
+    cutoff = time.time() - min_age
+
+    def candidates():
+        for name, size, mtime in walk(root, skip):
+            report.scanned += 1
+            report.scanned_bytes += size
+            if mtime <= cutoff:
+                yield name, size, mtime
+            else:
+                report.fresh += 1
+
+    for name, size, key in orphans(candidates(), dead, batch_size):
+        if limit is not None and report.orphans >= limit:
+            report.complete = False
+            break
+        report.orphans += 1
+        report.orphan_bytes += size
+        if dry_run:
+            continue
+        _remove(root, name, quarantine)
+        if key is not None:
+            default.kvstore._delete_raw(key)
+        report.removed += 1
+        report.removed_bytes += size
+    # Ключи мёртвых исходников нужны, пока на диске остаются их
+    # миниатюры.
+    if report.complete and not dry_run and not report.fresh and dead_sources:
+        default.kvstore._delete_raw(*dead_sources)
+    return report
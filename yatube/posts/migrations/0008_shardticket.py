@@ -0,0 +1,23 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_auto_20210708_0720'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardTicket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_author_user_following'),
+        ),
+    ]
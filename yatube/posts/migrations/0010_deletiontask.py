@@ -0,0 +1,33 @@
+# Generated by Django 2.2.6 on 2026-10-19 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'Пользователь'), ('post', 'Пост')], max_length=4)),
+                ('object_id', models.IntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('finished', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('deleted_rows', models.PositiveIntegerField(default=0)),
+                ('deleted_files', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['created'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='deletiontask',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_deletion_task'),
+        ),
+    ]
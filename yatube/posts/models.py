@@ -4,6 +4,16 @@ from django.db import models
 User = get_user_model()
 
 
+class RoutedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        """Без явного using база выбирается роутером по самому объекту,
+        а не по модели: так пост попадает в шард своего автора."""
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
@@ -27,6 +37,8 @@ class Post(models.Model):
     )
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
 
+    objects = RoutedQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
 
@@ -46,6 +58,8 @@ class Comment(models.Model):
     text = models.TextField()
     created = models.DateTimeField('date published', auto_now_add=True)
 
+    objects = RoutedQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
 
@@ -64,3 +78,108 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_author_user_following'
             )
         ]
+
+
+class ShardTicket(models.Model):
+    """Глобальная последовательность id для шардированных моделей."""
+
+
+class ArchivedPost(models.Model):
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField()
+    pub_date = models.DateTimeField('date published', db_index=True)
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='archived_posts'
+    )
+    group = models.ForeignKey(
+        Group, on_delete=models.SET_NULL, blank=True, null=True,
+        related_name='archived_posts'
+    )
+    image = models.ImageField(upload_to='posts/', blank=True, null=True)
+
+    class Meta:
+        ordering = ['-pub_date']
+
+    def __str__(self):
+        return self.text[:15]
+
+    @property
+    def pub_date_format(self):
+        return self.pub_date.strftime('%d %b %Y')
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost, on_delete=models.CASCADE, related_name='comments')
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='archived_comments')
+    text = models.TextField()
+    created = models.DateTimeField('date published')
+
+    class Meta:
+        ordering = ['-created']
+
+
+class DeletionTask(models.Model):
+    USER = 'user'
+    POST = 'post'
+    KIND_CHOICES = ((USER, 'Пользователь'), (POST, 'Пост'))
+
+    kind = models.CharField(max_length=4, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    title = models.CharField(max_length=200)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(blank=True, null=True, db_index=True)
+    deleted_rows = models.PositiveIntegerField(default=0)
+    deleted_files = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['created']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'], name='unique_deletion_task'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.title}'
+
+
+class Recommendation(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='recommendations'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='recommended_to'
+    )
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ['user', 'rank']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rank'], name='unique_recommendation_rank'
+            )
+        ]
+
+
+class TrendingScore(models.Model):
+    POST = 'post'
+    GROUP = 'group'
+    KIND_CHOICES = ((POST, 'Пост'), (GROUP, 'Группа'))
+
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    era = models.IntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id', 'era'],
+                name='unique_trending_score',
+            )
+        ]
+        indexes = [models.Index(fields=['kind', 'era', '-score'])]
@@ -0,0 +1,56 @@
+"""Пагинатор лент с кешированным числом постов и сокращённым списком
+страниц: вместо всех номеров выводится окно вокруг текущей страницы."""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+COUNT_KEY = 'paginator:count:{}'
+
+
+def invalidate_counts(*count_keys):
+    cache.delete_many([COUNT_KEY.format(key) for key in count_keys])
+
+
+class FeedPaginator(Paginator):
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return Paginator.count.func(self)
+        key = COUNT_KEY.format(self.count_key)
+        count = cache.get(key)
+        if count is None:
+            count = Paginator.count.func(self)
+            cache.set(key, count, settings.FEED_COUNT_TIMEOUT)
+        return count
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+def feed_page(request, posts):
+    paginator = FeedPaginator(
+        posts, settings.NUMBER_OF_POSTS_ON_PAGE, count_key=posts.count_key
+    )
+    return paginator.get_page(request.GET.get('page'))
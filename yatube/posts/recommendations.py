@@ -0,0 +1,125 @@
+"""Рекомендации «кого читать» по графу подписок.
+
+Граф Follow загружается в NumPy как разреженная матрица смежности в
+формате CSR: indptr и indices по плотным номерам пользователей. Оценка
+кандидата c для пользователя u — число авторов, на которых подписан u
+и которые сами подписаны на c (второй шаг по графу, строка A·A). Для
+пачки пользователей все пары второго шага разворачиваются массивами,
+считаются через np.unique и отбираются top-K без циклов Python. Пачки
+подбираются по числу пар и считаются параллельно в пуле процессов.
+
+NumPy нужен только этой команде; страницы читают готовую таблицу
+Recommendation одним запросом по индексу (user, rank).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+
+from .models import Follow, Recommendation
+
+_graph = {}
+
+
+def load_graph():
+    """Возвращает (ids, indptr, indices): ids переводит плотный номер
+    обратно в id пользователя."""
+    pairs = Follow.objects.values_list('user_id', 'author_id').iterator()
+    edges = np.fromiter(chain.from_iterable(pairs), dtype=np.int64)
+    ids, dense = np.unique(edges, return_inverse=True)
+    dense = dense.reshape(-1, 2)
+    order = np.lexsort((dense[:, 1], dense[:, 0]))
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(dense[:, 0], minlength=len(ids)), out=indptr[1:])
+    return ids, indptr, dense[order, 1]
+
+
+def _ranges(starts, lengths):
+    """Склеенные np.arange(start, start + length) для всех отрезков."""
+    total = int(lengths.sum())
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total, dtype=np.int64)
+
+
+def _init_worker(indptr, indices, top_k):
+    _graph.update(indptr=indptr, indices=indices, top_k=top_k)
+
+
+def score_chunk(users):
+    """Top-K кандидатов для пачки пользователей: массивы владельцев,
+    кандидатов, оценок и мест."""
+    indptr, indices = _graph['indptr'], _graph['indices']
+    size = len(indptr) - 1
+    lengths = indptr[users + 1] - indptr[users]
+    owners = np.repeat(users, lengths)
+    followed = indices[_ranges(indptr[users], lengths)]
+    second = indptr[followed + 1] - indptr[followed]
+    candidate_owners = np.repeat(owners, second)
+    candidates = indices[_ranges(indptr[followed], second)]
+    keys = candidate_owners * size + candidates
+    keep = (candidates != candidate_owners) & ~np.isin(
+        keys, owners * size + followed)
+    keys, scores = np.unique(keys[keep], return_counts=True)
+    owners, candidates = np.divmod(keys, size)
+    order = np.lexsort((candidates, -scores, owners))
+    owners, candidates, scores = (
+        owners[order], candidates[order], scores[order])
+    starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+    sizes = np.diff(np.r_[starts, len(owners)])
+    ranks = np.arange(len(owners)) - np.repeat(starts, sizes)
+    top = ranks < _graph['top_k']
+    return owners[top], candidates[top], scores[top], ranks[top]
+
+
+def chunk_users(indptr, indices, chunk_pairs):
+    """Делит пользователей с подписками на пачки примерно по chunk_pairs
+    пар второго шага."""
+    out_degree = np.diff(indptr)
+    users = np.flatnonzero(out_degree)
+    edge_cost = np.r_[0, np.cumsum(out_degree[indices])]
+    cost = np.cumsum(edge_cost[indptr[users + 1]] - edge_cost[indptr[users]])
+    if not len(users):
+        return []
+    bounds = np.searchsorted(
+        cost, np.arange(chunk_pairs, cost[-1], chunk_pairs), side='right')
+    return [chunk for chunk in np.split(users, bounds) if len(chunk)]
+
+
+def compute(top_k, workers=1, chunk_pairs=2_000_000):
+    """Считает рекомендации для всех подписчиков. Возвращает список
+    массивов (user_id, author_id, score, rank) по пачкам."""
+    ids, indptr, indices = load_graph()
+    chunks = chunk_users(indptr, indices, chunk_pairs)
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(
+            workers, initializer=_init_worker,
+            initargs=(indptr, indices, top_k),
+        ) as pool:
+            results = list(pool.map(score_chunk, chunks))
+    else:
+        _init_worker(indptr, indices, top_k)
+        results = [score_chunk(chunk) for chunk in chunks]
+    return [
+        (ids[owners], ids[candidates], scores, ranks)
+        for owners, candidates, scores, ranks in results
+    ]
+
+
+def store(results, batch_size=5000):
+    with transaction.atomic():
+        Recommendation.objects.all().delete()
+        for columns in results:
+            rows = zip(*(column.tolist() for column in columns))
+            Recommendation.objects.bulk_create([
+                Recommendation(
+                    user_id=user_id, author_id=author_id,
+                    score=score, rank=rank,
+                )
+                for user_id, author_id, score, rank in rows
+            ], batch_size=batch_size)
+    return sum(len(columns[0]) for columns in results)
+
+
+def rebuild(top_k, workers=1, chunk_pairs=2_000_000):
+    return store(compute(top_k, workers, chunk_pairs))
@@ -0,0 +1,140 @@
+"""Шардирование постов и комментариев (включая архивные) по автору поста.
+
+Пользователи, группы и подписки живут в глобальной базе default, посты и
+комментарии -- в одной из баз POST_SHARDS, выбранной по хешу author_id.
+Ленты по нескольким авторам собираются со всех шардов слиянием по
+pub_date. Первичные ключи выдаёт глобальная таблица ShardTicket, поэтому
+id постов и комментариев уникальны между шардами.
+"""
+import heapq
+import zlib
+from itertools import islice
+from operator import attrgetter
+
+from django.conf import settings
+
+from .models import (ArchivedComment, ArchivedPost, Comment, Group, Post,
+                     ShardTicket, User)
+
+SHARDED_MODELS = (
+    'posts.post', 'posts.comment',
+    'posts.archivedpost', 'posts.archivedcomment',
+)
+
+
+def shard_for_author(author_id):
+    shards = settings.POST_SHARDS
+    if not shards:
+        return None
+    return shards[zlib.crc32(str(author_id).encode()) % len(shards)]
+
+
+def shard_of(instance):
+    shards = settings.POST_SHARDS
+    if instance._state.db in shards:
+        return instance._state.db
+    if isinstance(instance, User):
+        return shard_for_author(instance.pk)
+    if isinstance(instance, (Post, ArchivedPost)):
+        return shard_for_author(instance.author_id)
+    if isinstance(instance, (Comment, ArchivedComment)):
+        post = type(instance).post.field.get_cached_value(instance, None)
+        if post is not None:
+            return shard_of(post)
+    return None
+
+
+def next_id():
+    """Выдаёт id из глобальной последовательности (AUTOINCREMENT SQLite
+    не переиспользует удалённые значения)."""
+    ticket = ShardTicket.objects.using('default').create()
+    ShardTicket.objects.using('default').filter(pk__lte=ticket.pk).delete()
+    return ticket.pk
+
+
+def attach_global_relations(posts):
+    """Подставляет авторов и группы из глобальной базы двумя запросами
+    вместо ленивой загрузки на каждый пост."""
+    authors = User.objects.in_bulk({post.author_id for post in posts})
+    groups = Group.objects.in_bulk(
+        {post.group_id for post in posts if post.group_id}
+    )
+    for post in posts:
+        post.author = authors[post.author_id]
+        if post.group_id:
+            post.group = groups[post.group_id]
+    return posts
+
+
+def merge_by_pub_date(*iterables):
+    return heapq.merge(*iterables, key=attrgetter('pub_date'), reverse=True)
+
+
+class ShardedFeed:
+    """Последовательность для Paginator: count() и срезы
+    scatter-gather по шардам."""
+
+    def __init__(self, queryset, shards):
+        self.queryset = queryset
+        self.shards = shards
+
+    def count(self):
+        return sum(
+            self.queryset.using(alias).count() for alias in self.shards
+        )
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        parts = [
+            list(self.queryset.using(alias)[:stop]) for alias in self.shards
+        ]
+        posts = list(islice(merge_by_pub_date(*parts), start, stop))
+        return attach_global_relations(posts)
+
+
+def feed(queryset, author_ids=None):
+    """Лента постов со всех шардов (или только шардов данных авторов).
+
+    Без шардирования возвращает queryset без изменений.
+    """
+    if not settings.POST_SHARDS:
+        return queryset
+    if author_ids is None:
+        shards = settings.POST_SHARDS
+    else:
+        shards = sorted({shard_for_author(pk) for pk in author_ids})
+    return ShardedFeed(queryset, shards)
+
+
+class ShardRouter:
+    def _db_for(self, model, instance=None, **hints):
+        shards = settings.POST_SHARDS
+        if not shards:
+            return None
+        if model._meta.label_lower in SHARDED_MODELS:
+            return None if instance is None else shard_of(instance)
+        if instance is not None and instance._state.db in shards:
+            return 'default'
+        return None
+
+    db_for_read = _db_for
+    db_for_write = _db_for
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not settings.POST_SHARDS:
+            return None
+        aliases = {'default', *settings.POST_SHARDS}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not settings.POST_SHARDS:
+            return None
+        sharded = f'{app_label}.{model_name}' in SHARDED_MODELS
+        if db in settings.POST_SHARDS:
+            return sharded
+        return False if sharded else None
@@ -0,0 +1,159 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core import page_cache
+from core.jobs import enqueue
+
+from . import feeds, lookups, sharding, trending
+from .archive import invalidate_cold_counts
+from .models import Comment, Follow, Group, Post, User
+from .paginator import invalidate_counts
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def assign_sharded_id(sender, instance, **kwargs):
+    if settings.POST_SHARDS and instance.pk is None:
+        instance.pk = sharding.next_id()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feed_counts(sender, instance, **kwargs):
+    invalidate_counts(
+        'index', f'group:{instance.group_id}', f'profile:{instance.author_id}'
+    )
+
+
+def post_page_scopes(post):
+    """Области страниц с постом, включая группу до правки."""
+    scopes = [f'user:{post.author.username}']
+    if post.group_id is not None:
+        scopes.append(f'group:{post.group.slug}')
+    saved_group_id = getattr(post, '_saved_group_id', None)
+    if saved_group_id not in (None, post.group_id):
+        scopes += [f'group:{slug}' for slug in Group.objects.filter(
+            pk=saved_group_id).values_list('slug', flat=True)]
+    return scopes
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    page_cache.invalidate(*post_page_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    page_cache.invalidate(f'user:{instance.post.author.username}')
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """Группа поста до правки: пост надо убрать из её ленты."""
+    if not instance._state.adding:
+        instance._saved_group_id = Post.objects.using(
+            instance._state.db).filter(pk=instance.pk).values_list(
+            'group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def update_post_feeds(sender, instance, created, **kwargs):
+    """Новый пост меняет все свои списки, правка -- карточку и, при
+    смене группы, списки обеих групп."""
+    if created:
+        feeds.invalidate(feeds.feed_keys(instance))
+        return
+    group_ids = {getattr(instance, '_saved_group_id', None), instance.group_id}
+    feed_keys = []
+    if len(group_ids) > 1:
+        feed_keys = [f'group:{group_id}' for group_id in group_ids
+                     if group_id is not None]
+    feeds.invalidate(feed_keys, [instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def drop_post_feeds(sender, instance, **kwargs):
+    feeds.invalidate(feeds.feed_keys(instance), [instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def record_trending_post(sender, instance, created, **kwargs):
+    if created:
+        trending.record(instance, settings.TRENDING_POST_WEIGHT)
+
+
+@receiver(post_save, sender=Post)
+def schedule_thumbnail(sender, instance, **kwargs):
+    if instance.image:
+        enqueue(
+            'posts.tasks.make_thumbnail', [instance.image.name],
+            queue='thumbnails', dedup_key=f'thumbnail:{instance.image.name}',
+            using=instance._state.db,
+        )
+
+
+@receiver(post_save, sender=Comment)
+def record_trending_comment(sender, instance, created, **kwargs):
+    if created:
+        trending.record(instance.post, settings.TRENDING_COMMENT_WEIGHT)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feed_count(sender, instance, **kwargs):
+    invalidate_counts(f'follow:{instance.user_id}')
+    invalidate_cold_counts(f'follow:{instance.user_id}')
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, **kwargs):
+    """Счётчики подписок есть в карточках обоих пользователей, а кнопка
+    подписки -- в личном контексте подписчика."""
+    page_cache.invalidate(
+        f'user:{instance.user.username}', f'user:{instance.author.username}')
+    page_cache.forget_personal(instance.user_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_lookups(sender, instance, **kwargs):
+    lookups.invalidate()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_pages(sender, instance, **kwargs):
+    page_cache.invalidate(f'group:{instance.slug}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_username_lookups(sender, instance, created=False,
+                                update_fields=None, **kwargs):
+    """Новое имя найдётся и промахом, а вход обновляет только
+    last_login, так что версию меняют лишь правки и удаления."""
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    lookups.invalidate()
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_feeds(sender, instance, created=False,
+                            update_fields=None, **kwargs):
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    feeds.invalidate_author(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_pages(sender, instance, created=False,
+                          update_fields=None, **kwargs):
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    page_cache.invalidate(f'user:{instance.username}')
+    page_cache.forget_personal(instance.pk)
@@ -0,0 +1,12 @@
+"""Фоновые задачи приложения posts для очереди core.jobs."""
+from sorl.thumbnail import get_thumbnail
+
+# Размер и кадрирование картинки поста в шаблонах лент.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def make_thumbnail(image_name):
+    """Создаёт миниатюру заранее, чтобы первая страница с постом не
+    ждала Pillow."""
+    get_thumbnail(image_name, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
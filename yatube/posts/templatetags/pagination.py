@@ -0,0 +1,11 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag
+def elided_page_range(page):
+    paginator = page.paginator
+    if not hasattr(paginator, 'get_elided_page_range'):
+        return paginator.page_range
+    return list(paginator.get_elided_page_range(page.number))
@@ -0,0 +1,37 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+class PostCardsNode(template.Node):
+    def __init__(self, posts, template_name):
+        self.posts = posts
+        self.template_name = template_name
+
+    def iter_render(self, context):
+        """Карточки ленты за один проход: шаблон ищется один раз, а
+        контекст дополняется один раз на всю ленту, а не на каждый
+        include. При потоковом рендере карточки отдаются по одной."""
+        posts = self.posts.resolve(context)
+        card = context.template.engine.get_template(
+            self.template_name.resolve(context))
+        with context.push():
+            for post in posts:
+                context['post'] = post
+                yield card.render(context)
+
+    def render(self, context):
+        return mark_safe(''.join(self.iter_render(context)))
+
+
+@register.tag
+def post_cards(parser, token):
+    """{% post_cards page [template_name] %}"""
+    bits = token.split_contents()
+    if len(bits) not in (2, 3):
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает ленту и, необязательно, имя шаблона')
+    template_name = bits[2] if len(bits) == 3 else "'misc/post_item.html'"
+    return PostCardsNode(
+        parser.compile_filter(bits[1]), parser.compile_filter(template_name))
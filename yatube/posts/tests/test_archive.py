@@ -0,0 +1,81 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import GENERATION_KEY, bump_generation, generation
+from ..models import ArchivedComment, ArchivedPost, Comment, Post, User
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='OldAuthor')
+        self.client = Client()
+        for number in range(15):
+            Post.objects.create(author=self.user, text=f'Пост {number}')
+        self.old_post = Post.objects.order_by('pub_date').first()
+        Comment.objects.create(
+            post=self.old_post, author=self.user, text='Старый комментарий'
+        )
+        old_ids = Post.objects.order_by('pub_date').values_list(
+            'id', flat=True)[:8]
+        Post.objects.filter(id__in=list(old_ids)).update(
+            pub_date=timezone.now() - timedelta(days=400)
+        )
+        call_command('archive_posts', batch_size=3, stdout=StringIO())
+
+    def test_old_posts_moved_to_archive(self):
+        """Функция проверяет перенос старых постов и комментариев."""
+        self.assertEqual(Post.objects.count(), 7)
+        self.assertEqual(ArchivedPost.objects.count(), 8)
+        self.assertEqual(ArchivedComment.objects.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_feed_reaches_archive_past_boundary(self):
+        """Функция проверяет, что лента продолжается архивом."""
+        first = self.client.get(reverse('index')).context['page']
+        self.assertEqual(first.paginator.count, 15)
+        self.assertEqual(
+            [isinstance(post, ArchivedPost) for post in first],
+            [False] * 7 + [True] * 3
+        )
+        cache.clear()
+        second = self.client.get(reverse('index') + '?page=2')
+        self.assertTrue(all(
+            isinstance(p, ArchivedPost) for p in second.context['page']
+        ))
+
+    def test_archived_post_page_still_works(self):
+        """Функция проверяет страницу архивного поста."""
+        response = self.client.get(reverse('posts', kwargs={
+            'username': self.user.username, 'post_id': self.old_post.id}))
+        self.assertEqual(response.context['post'].id, self.old_post.id)
+        self.assertEqual(len(response.context['comments']), 1)
+        self.assertEqual(response.context['number_of_posts'], 15)
+
+    def test_follow_resets_archived_count(self):
+        """Функция проверяет, что подписка меняет число архивных постов
+        в ленте подписок."""
+        reader = User.objects.create_user(username='Reader')
+        client = Client()
+        client.force_login(reader)
+        url = reverse('follow_index')
+        self.assertEqual(client.get(url).context['page'].paginator.count, 0)
+        client.get(reverse('profile_follow', args=[self.user.username]))
+        self.assertEqual(client.get(url).context['page'].paginator.count, 15)
+        client.get(reverse('profile_unfollow', args=[self.user.username]))
+        self.assertEqual(client.get(url).context['page'].paginator.count, 0)
+
+    def test_generation_shared_between_processes(self):
+        """Функция проверяет, что поколение архива видно всем
+        процессам."""
+        self.assertEqual(caches['shared'].get(GENERATION_KEY), generation())
+        before = generation()
+        cache.clear()
+        bump_generation()
+        self.assertEqual(caches['shared'].get(GENERATION_KEY), before + 1)
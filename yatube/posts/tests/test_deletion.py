@@ -0,0 +1,135 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..deletion import schedule_post_deletion, schedule_user_deletion
+from ..models import Comment, DeletionTask, Follow, Group, Post, User
+
+TEMP_MEDIA = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA)
+class BackgroundDeletionTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Prolific')
+        self.reader = User.objects.create_user(username='Reader')
+        self.reader_post = Post.objects.create(
+            author=self.reader, text='Пост читателя')
+        for number in range(5):
+            post = Post.objects.create(
+                author=self.user, text=f'Пост {number}',
+                image=SimpleUploadedFile('pic.gif', SMALL_GIF,
+                                         content_type='image/gif'),
+            )
+            Comment.objects.create(post=post, author=self.reader, text='!')
+            Comment.objects.create(
+                post=self.reader_post, author=self.user, text='?')
+        self.image_path = post.image.path
+        Follow.objects.create(user=self.reader, author=self.user)
+        Follow.objects.create(user=self.user, author=self.reader)
+
+    def test_user_hidden_immediately(self):
+        """Функция проверяет, что пользователь скрыт сразу."""
+        schedule_user_deletion(self.user)
+        response = Client().get(
+            reverse('profile', kwargs={'username': self.user.username}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 5)
+
+    def test_dependent_rows_and_files_removed_in_batches(self):
+        """Функция проверяет удаление зависимых строк и файлов порциями."""
+        task = schedule_user_deletion(self.user)
+        out = StringIO()
+        call_command('process_deletions', batch_size=2, stdout=out)
+        task.refresh_from_db()
+        self.assertIsNotNone(task.finished)
+        self.assertEqual(task.deleted_rows, 18)
+        self.assertEqual(task.deleted_files, 5)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.reader_post])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(os.path.exists(self.image_path))
+        self.assertIn('готово', out.getvalue())
+
+    def test_admin_schedules_instead_of_cascading(self):
+        """Функция проверяет, что удаление в админке ставится в очередь."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        client = Client()
+        client.force_login(admin)
+        client.post(
+            reverse('admin:auth_user_delete', args=[self.user.pk]),
+            {'post': 'yes'},
+        )
+        self.assertTrue(DeletionTask.objects.filter(
+            object_id=self.user.pk, finished__isnull=True).exists())
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 5)
+
+    def test_scheduled_user_posts_leave_cached_feeds(self):
+        """Функция проверяет, что посты удаляемого пользователя сразу
+        пропадают из закешированных ленты и группы."""
+        group = Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(author=self.user, group=group, text='В группе')
+        index, group_page = reverse('index'), reverse('group', args=['group'])
+        self.assertContains(self.client.get(index), 'Пост 4')
+        self.assertContains(self.client.get(group_page), 'В группе')
+        schedule_user_deletion(self.user)
+        response = self.client.get(index)
+        self.assertNotContains(response, 'Пост 4')
+        self.assertContains(response, 'Пост читателя')
+        self.assertNotContains(self.client.get(group_page), 'В группе')
+
+    def test_scheduled_post_hidden_immediately(self):
+        """Функция проверяет, что удаляемый пост сразу скрыт."""
+        post = Post.objects.filter(author=self.user).latest('pub_date')
+        post_page = reverse('posts', kwargs={
+            'username': self.user.username, 'post_id': post.pk})
+        self.assertContains(self.client.get(reverse('index')), post.text)
+        self.assertEqual(self.client.get(post_page).status_code,
+                         HTTPStatus.OK)
+        schedule_post_deletion(post)
+        self.assertNotContains(self.client.get(reverse('index')), post.text)
+        self.assertEqual(self.client.get(post_page).status_code,
+                         HTTPStatus.NOT_FOUND)
+        call_command('process_deletions', stdout=StringIO())
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertContains(self.client.get(reverse('index')), 'Пост 3')
+
+    def test_batches_invalidate_pages_of_other_authors(self):
+        """Функция проверяет, что порции удаления сбрасывают страницы
+        постов, под которыми были комментарии пользователя."""
+        Comment.objects.create(
+            post=self.reader_post, author=self.user, text='Прощальный')
+        post_page = reverse('posts', kwargs={
+            'username': self.reader.username,
+            'post_id': self.reader_post.pk,
+        })
+        self.assertContains(self.client.get(post_page), 'Прощальный')
+        schedule_user_deletion(self.user)
+        call_command('process_deletions', batch_size=2, stdout=StringIO())
+        self.assertNotContains(self.client.get(post_page), 'Прощальный')
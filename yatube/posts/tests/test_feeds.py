@@ -0,0 +1,107 @@
+import pickle
+from array import array
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from .. import feeds
+from ..archive import with_archive
+from ..models import ArchivedPost, Group, Post, User
+
+
+class FeedCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='Feeder', first_name='Лента', last_name='Кешева')
+        self.group = Group.objects.create(title='Кеш', slug='cache')
+        self.other = Group.objects.create(title='Другая', slug='other')
+        self.posts = [
+            Post.objects.create(
+                author=self.user, text=f'Пост {number}', group=self.group)
+            for number in range(12)
+        ]
+
+    def group_feed(self, group):
+        return with_archive(
+            Post.objects.filter(group_id=group.id),
+            ArchivedPost.objects.filter(group_id=group.id),
+            f'group:{group.id}', cache_ids=True,
+        )
+
+    def cached_ids(self, feed_key):
+        return cache.get(feeds.IDS_KEY.format(feed_key))
+
+    def test_second_page_read_without_sql(self):
+        """Функция проверяет, что повторное чтение ленты не ходит в базу,
+        а карточки заменяют модели в шаблонах."""
+        first = self.group_feed(self.group)[0:10]
+        self.assertEqual(first[0].text, 'Пост 11')
+        with self.assertNumQueries(0):
+            page = self.group_feed(self.group)[0:10]
+        self.assertEqual([card.id for card in page],
+                         [post.id for post in reversed(self.posts[2:])])
+        card = page[0]
+        self.assertEqual(card.author, self.user)
+        self.assertEqual(card.author.get_full_name(), 'Лента Кешева')
+        self.assertEqual(card.group, self.group)
+        self.assertFalse(card.image)
+        self.assertFalse(hasattr(card, '__dict__'))
+        self.assertIsInstance(self.cached_ids(f'group:{self.group.id}'),
+                              array)
+
+    def test_only_missing_cards_are_fetched(self):
+        """Функция проверяет, что из базы читаются только недостающие
+        карточки, одним запросом."""
+        self.group_feed(self.group)[0:10]
+        cache.delete_many([
+            feeds.CARD_KEY.format(post.id) for post in self.posts[5:8]])
+        with self.assertNumQueries(1):
+            page = self.group_feed(self.group)[0:10]
+        self.assertEqual(len(page), 10)
+
+    def test_new_post_drops_lists(self):
+        """Функция проверяет, что новый пост сбрасывает списки, а не
+        правит их на месте."""
+        self.group_feed(self.group)[0:10]
+        post = Post.objects.create(
+            author=self.user, text='Свежий', group=self.group)
+        self.assertIsNone(self.cached_ids(f'group:{self.group.id}'))
+        self.assertEqual(self.group_feed(self.group)[0:1][0].id, post.id)
+        ids = self.cached_ids(f'group:{self.group.id}')
+        self.assertEqual(ids[0], post.id)
+        self.assertEqual(len(ids), 13)
+
+    def test_author_rename_forgets_cards(self):
+        """Функция проверяет, что переименование автора сбрасывает
+        карточки его постов и списки."""
+        self.group_feed(self.group)[0:10]
+        self.user.username = 'Renamed'
+        self.user.save()
+        self.assertIsNone(self.cached_ids(f'group:{self.group.id}'))
+        card = self.group_feed(self.group)[0:1][0]
+        self.assertEqual(card.author.username, 'Renamed')
+
+    def test_edit_and_delete(self):
+        """Функция проверяет смену группы, правку текста и удаление."""
+        self.group_feed(self.group)[0:10]
+        self.group_feed(self.other)[0:10]
+        post = self.posts[-1]
+        post.text = 'Правка'
+        post.group = self.other
+        post.save()
+        self.assertIsNone(self.cached_ids(f'group:{self.group.id}'))
+        self.assertEqual(self.group_feed(self.other)[0:1][0].text, 'Правка')
+        self.assertNotIn(
+            post.id, [card.id for card in self.group_feed(self.group)[0:10]])
+        post.delete()
+        self.assertIsNone(self.cached_ids(f'group:{self.other.id}'))
+        self.assertEqual(len(self.group_feed(self.other)[0:10]), 0)
+
+    def test_card_pickles_compactly(self):
+        """Функция проверяет, что карточка меньше pickle модели поста."""
+        post = Post.objects.select_related('author', 'group').first()
+        card = pickle.loads(pickle.dumps(feeds.PostCard(post)))
+        self.assertEqual(card.text, post.text)
+        self.assertLess(len(pickle.dumps(feeds.PostCard(post))),
+                        len(pickle.dumps(post)))
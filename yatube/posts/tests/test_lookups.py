@@ -0,0 +1,72 @@
+from django.core.cache import cache, caches
+from django.http import Http404
+from django.test import TestCase
+
+from .. import lookups
+from ..forms import PostForm
+from ..models import Group, User
+
+
+class LookupCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(title='Кеш', slug='cached')
+        self.user = User.objects.create_user(username='Lookup')
+        lookups.preload()
+
+    def test_lookups_served_from_memory(self):
+        """Функция проверяет поиск группы и пользователя без запросов."""
+        lookups.get_user_or_404('Lookup')
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.get_group_or_404('cached'), self.group)
+            self.assertEqual(lookups.get_user_or_404('Lookup'), self.user)
+            choices = list(PostForm().fields['group'].choices)
+        self.assertEqual(choices[1], (self.group.pk, 'Кеш'))
+
+    def test_group_change_invalidates(self):
+        """Функция проверяет сброс кеша групп при изменении группы."""
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(
+            lookups.get_group_or_404('cached').title, 'Новое название')
+        self.group.delete()
+        with self.assertRaises(Http404):
+            lookups.get_group_or_404('cached')
+
+    def test_rename_and_deactivation(self):
+        """Функция проверяет сброс имени при переименовании и отказ
+        для неактивного пользователя."""
+        self.user.username = 'Renamed'
+        self.user.save()
+        with self.assertRaises(Http404):
+            lookups.get_user_or_404('Lookup')
+        self.assertEqual(lookups.get_user_or_404('Renamed'), self.user)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(Http404):
+            lookups.get_user_or_404('Renamed')
+
+    def test_version_from_other_process(self):
+        """Функция проверяет сброс по версии, записанной другим
+        процессом."""
+        lookups.invalidate()
+        with self.assertNumQueries(1):
+            lookups.get_group_or_404('cached')
+
+    def test_version_shared_between_processes(self):
+        """Функция проверяет, что версия хранится вне памяти процесса."""
+        caches['shared'].set(lookups.VERSION_KEY, 'other-process', None)
+        cache.clear()
+        with self.assertNumQueries(1):
+            lookups.get_group_or_404('cached')
+
+    def test_lookups_return_copies(self):
+        """Функция проверяет, что правка найденного объекта не портит
+        кеш процесса."""
+        lookups.get_group_or_404('cached').title = 'Испорчено'
+        lookups.all_groups()[0].title = 'Испорчено'
+        lookups.get_user_or_404('Lookup').username = 'Испорчено'
+        self.assertEqual(lookups.get_group_or_404('cached').title, 'Кеш')
+        self.assertEqual(lookups.all_groups()[0].title, 'Кеш')
+        self.assertEqual(
+            lookups.get_user_or_404('Lookup').username, 'Lookup')
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from ..media_gc import collect
+from ..models import Post, User
+
+TEMP_MEDIA = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def add_thumbnail(source_name, name):
+    """Сохраняет миниатюру и записывает её в хранилище ключей sorl так
+    же, как это делает get_thumbnail."""
+    default.storage.save(name, ContentFile(SMALL_GIF))
+    source = ImageFile(source_name, default.storage)
+    source.set_size((2, 1))
+    default.kvstore.set(source)
+    thumbnail = ImageFile(name, default.storage)
+    thumbnail.set_size((2, 1))
+    default.kvstore.set(thumbnail, source)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA)
+class MediaGarbageCollectorTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        shutil.rmtree(TEMP_MEDIA, ignore_errors=True)
+        os.makedirs(TEMP_MEDIA)
+        self.post = Post.objects.create(
+            author=User.objects.create_user(username='Author'),
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('old.gif', SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+        self.old_name = self.post.image.name
+        add_thumbnail(self.old_name, 'cache/aa/bb/old.gif')
+        self.post.image = SimpleUploadedFile(
+            'new.gif', SMALL_GIF, content_type='image/gif')
+        self.post.save()
+        self.new_name = self.post.image.name
+        add_thumbnail(self.new_name, 'cache/cc/dd/new.gif')
+        default.storage.save('cache/ee/ff/lost.gif', ContentFile(SMALL_GIF))
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(TEMP_MEDIA, name))
+
+    def test_removes_only_orphans(self):
+        """Функция проверяет удаление старой картинки, её миниатюры и
+        миниатюры без записи в хранилище, а также сохранность текущих
+        файлов."""
+        report = collect(min_age=0)
+        self.assertEqual(report.scanned, 5)
+        self.assertEqual(report.removed, 3)
+        self.assertEqual(report.removed_bytes, 3 * len(SMALL_GIF))
+        self.assertTrue(report.complete)
+        self.assertFalse(self.exists(self.old_name))
+        self.assertFalse(self.exists('cache/aa'))
+        self.assertFalse(self.exists('cache/ee'))
+        self.assertTrue(self.exists(self.new_name))
+        self.assertTrue(self.exists('cache/cc/dd/new.gif'))
+        source = ImageFile(self.old_name, default.storage)
+        self.assertIsNone(default.kvstore.get(source))
+        self.assertEqual(collect(min_age=0).orphans, 0)
+
+    def test_dry_run_and_min_age(self):
+        """Функция проверяет, что пробный запуск и свежие файлы ничего
+        не удаляют."""
+        self.assertEqual(collect(min_age=3600).orphans, 0)
+        report = collect(dry_run=True, min_age=0)
+        self.assertEqual(report.orphans, 3)
+        self.assertEqual(report.removed, 0)
+        self.assertTrue(self.exists(self.old_name))
+
+    def test_limit_and_quarantine(self):
+        """Функция проверяет ограничение прохода и перенос файлов в
+        карантин."""
+        quarantine = os.path.join(TEMP_MEDIA, '.quarantine')
+        first = collect(limit=2, min_age=0, quarantine=quarantine)
+        self.assertEqual(first.removed, 2)
+        self.assertFalse(first.complete)
+        second = collect(limit=2, min_age=0, quarantine=quarantine)
+        self.assertEqual(second.removed, 1)
+        self.assertTrue(second.complete)
+        self.assertTrue(os.path.exists(
+            os.path.join(quarantine, self.old_name)))
+        self.assertTrue(self.exists(self.new_name))
+
+    def test_command_output(self):
+        """Функция проверяет отчёт команды collect_media."""
+        out = StringIO()
+        call_command('collect_media', dry_run=True, min_age=0, stdout=out)
+        self.assertIn('лишних: 3', out.getvalue())
+        self.assertTrue(self.exists(self.old_name))
@@ -0,0 +1,45 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..paginator import FeedPaginator
+
+
+class FeedPaginatorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Paginated')
+        self.group = Group.objects.create(title='Много', slug='many')
+        Post.objects.bulk_create([
+            Post(author=self.user, group=self.group, text=f'Пост {number}')
+            for number in range(150)
+        ])
+
+    def test_elided_range_keeps_window_around_current_page(self):
+        """Функция проверяет окно номеров страниц вокруг текущей."""
+        paginator = FeedPaginator(list(range(2000)), 10)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(100)),
+            [1, 2, '…', 97, 98, 99, 100, 101, 102, 103, '…', 199, 200],
+        )
+        self.assertEqual(list(FeedPaginator(list(range(30)), 10)
+                              .get_elided_page_range(2)), [1, 2, 3])
+
+    def test_count_cached_until_post_written(self):
+        """Функция проверяет кеширование числа постов и сброс при записи."""
+        posts = Post.objects.filter(group=self.group)
+        key = f'group:{self.group.id}'
+        self.assertEqual(FeedPaginator(posts, 10, count_key=key).count, 150)
+        with self.assertNumQueries(0):
+            FeedPaginator(posts, 10, count_key=key).count
+        Post.objects.create(author=self.user, group=self.group, text='Ещё')
+        self.assertEqual(FeedPaginator(posts, 10, count_key=key).count, 151)
+
+    def test_group_page_renders_elided_links(self):
+        """Функция проверяет, что страница группы выводит не все ссылки."""
+        response = Client().get(
+            reverse('group', kwargs={'slug': 'many'}) + '?page=8')
+        self.assertContains(response, '…', count=2)
+        self.assertNotContains(response, '?page=4"')
+        self.assertContains(response, '?page=15"')
@@ -0,0 +1,70 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Recommendation, User
+from ..recommendations import chunk_users, compute, load_graph, rebuild
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        self.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('reader', 'anna', 'boris', 'vera', 'gleb', 'dina')
+        }
+        for user, author in (
+            ('reader', 'anna'), ('reader', 'boris'),
+            ('anna', 'vera'), ('boris', 'vera'), ('anna', 'gleb'),
+            ('anna', 'reader'), ('vera', 'dina'),
+        ):
+            Follow.objects.create(
+                user=self.users[user], author=self.users[author])
+
+    def suggested(self, name, **kwargs):
+        rebuild(top_k=kwargs.pop('top_k', 10), **kwargs)
+        return [
+            (item.author.username, item.score)
+            for item in Recommendation.objects.filter(user=self.users[name])
+        ]
+
+    def test_friends_of_friends_ranked_by_score(self):
+        """Функция проверяет оценки второго шага и исключение себя и
+        уже отслеживаемых авторов."""
+        self.assertEqual(
+            self.suggested('reader'), [('vera', 2), ('gleb', 1)])
+        self.assertEqual(
+            self.suggested('anna'), [('boris', 1), ('dina', 1)])
+        self.assertEqual(self.suggested('reader', top_k=1), [('vera', 2)])
+
+    def test_chunks_and_pool_give_same_result(self):
+        """Функция проверяет, что пачки и пул процессов не меняют ответ."""
+        ids, indptr, indices = load_graph()
+        self.assertGreater(len(chunk_users(indptr, indices, 1)), 1)
+        whole = compute(10)
+        split = compute(10, workers=2, chunk_pairs=1)
+
+        def rows(results):
+            return sorted(
+                row for columns in results
+                for row in zip(*(column.tolist() for column in columns))
+            )
+
+        self.assertEqual(rows(whole), rows(split))
+
+    def test_suggestions_on_follow_page(self):
+        """Функция проверяет блок рекомендаций на странице подписок."""
+        rebuild(top_k=10)
+        client = Client()
+        client.force_login(self.users['reader'])
+        response = client.get(reverse('follow_index'))
+        self.assertEqual(
+            [item.author for item in response.context['suggestions']],
+            [self.users['vera'], self.users['gleb']],
+        )
+        Follow.objects.create(
+            user=self.users['reader'], author=self.users['vera'])
+        response = client.get(reverse('profile', args=['anna']))
+        self.assertEqual(
+            [item.author for item in response.context['suggestions']],
+            [self.users['gleb']],
+        )
+        self.assertContains(response, '@gleb')
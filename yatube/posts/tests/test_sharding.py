@@ -0,0 +1,121 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.core.cache import cache
+from django.test import (
+    Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+from django.utils import timezone
+
+from core.tests.databases import ExtraDatabasesMixin
+
+from ..models import Comment, Group, Post, User
+from ..sharding import ShardedFeed, merge_by_pub_date, shard_for_author
+
+
+class ShardFunctionsTests(SimpleTestCase):
+    @override_settings(POST_SHARDS=['shard_0', 'shard_1', 'shard_2'])
+    def test_author_always_lands_on_same_shard(self):
+        """Функция проверяет стабильное распределение авторов по шардам."""
+        shards = [shard_for_author(author_id) for author_id in range(300)]
+        self.assertEqual(shards, [shard_for_author(i) for i in range(300)])
+        self.assertEqual(set(shards), {'shard_0', 'shard_1', 'shard_2'})
+
+    def test_merge_keeps_newest_first(self):
+        """Функция проверяет слияние лент шардов по дате публикации."""
+        first = [SimpleNamespace(pub_date=d) for d in (9, 5, 1)]
+        second = [SimpleNamespace(pub_date=d) for d in (8, 7, 2)]
+        merged = [post.pub_date for post in merge_by_pub_date(first, second)]
+        self.assertEqual(merged, [9, 8, 7, 5, 2, 1])
+
+
+@override_settings(POST_SHARDS=['default'])
+class ShardedViewsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ShardAuthor')
+        self.group = Group.objects.create(title='Шард', slug='shard')
+        self.client = Client()
+        for number in range(12):
+            Post.objects.create(
+                author=self.user, text=f'Пост {number}', group=self.group
+            )
+
+    def test_feeds_are_gathered_from_shards(self):
+        """Функция проверяет ленты, собранные со всех шардов."""
+        for url in (reverse('index'),
+                    reverse('group', kwargs={'slug': 'shard'})):
+            with self.subTest(url=url):
+                page = self.client.get(url).context['page']
+                self.assertIsInstance(page.paginator.object_list.hot,
+                                      ShardedFeed)
+                self.assertEqual(page.paginator.count, 12)
+                self.assertEqual(page[0].text, 'Пост 11')
+
+    def test_post_view_reads_author_shard(self):
+        """Функция проверяет страницу поста из шарда автора."""
+        post = self.user.posts.first()
+        response = self.client.get(reverse('posts', kwargs={
+            'username': self.user.username, 'post_id': post.id}))
+        self.assertEqual(response.context['post'], post)
+
+
+TWO_SHARDS = ['posts_shard_0', 'posts_shard_1']
+
+
+@override_settings(POST_SHARDS=TWO_SHARDS)
+class TwoShardsTests(ExtraDatabasesMixin, TransactionTestCase):
+    extra_databases = TWO_SHARDS
+    databases = {'default', *TWO_SHARDS}
+
+    def setUp(self):
+        cache.clear()
+        self.authors = {}
+        number = 0
+        while len(self.authors) < 2:
+            user = User.objects.create_user(username=f'author{number}')
+            self.authors.setdefault(shard_for_author(user.pk), user)
+            number += 1
+        self.posts = []
+        start = timezone.now() - timedelta(hours=1)
+        for number in range(6):
+            author = self.authors[TWO_SHARDS[number % 2]]
+            post = Post.objects.create(author=author, text=f'Пост {number}')
+            Post.objects.using(post._state.db).filter(pk=post.pk).update(
+                pub_date=start + timedelta(minutes=number))
+            self.posts.append(post)
+
+    def test_posts_live_in_author_shards_with_unique_ids(self):
+        """Функция проверяет, что посты лежат в шардах авторов, а id
+        уникальны между шардами."""
+        for alias in TWO_SHARDS:
+            with self.subTest(alias=alias):
+                stored = Post.objects.using(alias)
+                self.assertEqual(set(stored.values_list(
+                    'author_id', flat=True)), {self.authors[alias].pk})
+                self.assertEqual(stored.count(), 3)
+        ids = [post.pk for post in self.posts]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+
+    def test_feed_merges_shards_by_pub_date(self):
+        """Функция проверяет порядок общей ленты из двух шардов."""
+        page = self.client.get(reverse('index')).context['page']
+        self.assertEqual(page.paginator.count, 6)
+        self.assertEqual([post.text for post in page],
+                         [f'Пост {number}' for number in range(5, -1, -1)])
+
+    def test_comments_follow_post_shard(self):
+        """Функция проверяет, что комментарий попадает в шард поста."""
+        post = self.posts[1]
+        reader = self.authors[TWO_SHARDS[0]]
+        Comment.objects.create(post=post, author=reader, text='Ответ')
+        self.assertTrue(Comment.objects.using(post._state.db).filter(
+            post_id=post.pk).exists())
+        other = next(alias for alias in TWO_SHARDS
+                     if alias != post._state.db)
+        self.assertFalse(Comment.objects.using(other).exists())
+        response = self.client.get(reverse('posts', kwargs={
+            'username': post.author.username, 'post_id': post.pk}))
+        self.assertContains(response, 'Ответ')
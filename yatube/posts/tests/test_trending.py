@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..deletion import schedule_post_deletion, schedule_user_deletion
+from ..models import Comment, Group, Post, TrendingScore, User
+from ..trending import bump, compact, refresh, top_ids
+
+HOUR = 60 * 60
+
+
+@override_settings(TRENDING_HALF_LIFE=HOUR, TRENDING_ERA=24 * HOUR,
+                   TRENDING_MIN_SCORE=0.05)
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Trendy')
+        self.group = Group.objects.create(title='Горячее', slug='hot')
+        self.quiet = Post.objects.create(author=self.user, text='Тихий')
+        self.busy = Post.objects.create(
+            author=self.user, group=self.group, text='Обсуждаемый')
+
+    def test_comments_raise_post_and_group(self):
+        """Функция проверяет рост оценки поста и группы от комментариев."""
+        for number in range(3):
+            Comment.objects.create(
+                post=self.busy, author=self.user, text=f'Ответ {number}')
+        self.assertEqual(top_ids(TrendingScore.POST, 2),
+                         [self.busy.id, self.quiet.id])
+        self.assertEqual(top_ids(TrendingScore.GROUP, 5), [self.group.id])
+
+    def test_old_activity_decays(self):
+        """Функция проверяет, что давняя активность уступает свежей."""
+        TrendingScore.objects.all().delete()
+        now = 10 * 24 * HOUR + 12 * HOUR
+        bump(TrendingScore.POST, self.quiet.id, 1, now - HOUR)
+        bump(TrendingScore.POST, self.busy.id, 3, now - 24 * HOUR)
+        bump(TrendingScore.POST, self.busy.id, 0.2, now)
+        self.assertEqual(TrendingScore.objects.filter(
+            object_id=self.busy.id).count(), 2)
+        self.assertEqual(top_ids(TrendingScore.POST, 2),
+                         [self.quiet.id, self.busy.id])
+        self.assertEqual(compact(now + 3 * HOUR), 2)
+        self.assertEqual(list(TrendingScore.objects.values_list(
+            'object_id', 'era')), [(self.quiet.id, 10)])
+
+    def test_trending_page_reads_one_cache_key(self):
+        """Функция проверяет, что страница берёт топ из кеша."""
+        Comment.objects.create(post=self.busy, author=self.user, text='!')
+        compact()
+        with self.assertNumQueries(0):
+            response = Client().get(reverse('trending'))
+        self.assertEqual(response.context['posts'][0], self.busy)
+        self.assertContains(response, 'Горячее')
+
+    def test_pending_deletions_leave_trending(self):
+        """Функция проверяет, что удаляемые посты и посты удаляемых
+        пользователей пропадают из популярного, даже из собранного топа."""
+        other = User.objects.create_user(username='Leaving')
+        leaving = Post.objects.create(author=other, text='Уходящий')
+        for post in (self.busy, self.quiet, leaving):
+            Comment.objects.create(post=post, author=self.user, text='!')
+        compact()
+        schedule_post_deletion(self.busy)
+        schedule_user_deletion(other)
+        response = Client().get(reverse('trending'))
+        self.assertEqual(list(response.context['posts']), [self.quiet])
+        self.assertEqual(refresh()['posts'], [self.quiet])
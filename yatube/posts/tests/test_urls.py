@@ -4,6 +4,9 @@ from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.test import Client, TestCase
 
+from users.forms import RESERVED_USERNAMES, CreationForm
+
+from .. import urls
 from ..models import Group, Post, User
 
 
@@ -13,7 +16,6 @@ class TaskURLTests(TestCase):
     @classmethod
     def setUp(self):
         cache.clear()
-        super().setUpClass()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='AndreyG')
         self.user_2 = User.objects.create_user(username='TatianaK')
@@ -83,3 +85,26 @@ class TaskURLTests(TestCase):
         self.assertRedirects(
             response,
             f'/auth/login/?next=/{self.user_2.username}/{self.post.id}/edit/')
+
+
+class ReservedUsernameTests(TestCase):
+    def test_static_prefixes_reserved(self):
+        """Функция проверяет, что каждый постоянный первый сегмент
+        адресов posts нельзя занять именем пользователя."""
+        prefixes = {
+            str(pattern.pattern).split('/')[0] for pattern in urls.urlpatterns
+        }
+        self.assertLessEqual(
+            {prefix for prefix in prefixes
+             if prefix and not prefix.startswith('<')},
+            RESERVED_USERNAMES)
+
+    def test_signup_rejects_reserved_username(self):
+        """Функция проверяет, что регистрация с именем trending
+        отклоняется."""
+        form = CreationForm(data={
+            'username': 'Trending', 'email': 'a@example.com',
+            'password1': 'Long-pass-123', 'password2': 'Long-pass-123',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('username', form.errors)
@@ -276,8 +276,11 @@ class CacheTest(TaskPagesTests, TestCase):
         self.assertEqual(page[0].author, self.post_2.author)
         self.post_2.delete()
         response_2 = self.authorized_client.get(reverse(self.home_page))
-        self.assertEqual(response.content, response_2.content)
-        self.assertEqual(response_2.context, None)
+        # Общую копию получает и вошедший пользователь, со своей
+        # навигацией.
+        self.assertContains(response_2, self.post_2.text)
+        self.assertContains(response_2, reverse('logout'))
+        self.assertNotIn('page', response_2.context)
         cache.clear()
         response_3 = self.authorized_client.get(reverse(self.home_page))
         self.assertNotEqual(response_3.context, None)
@@ -325,14 +328,17 @@ class SubscriptionToAuthors(TestCase):
             self.profile_follow, kwargs={'username': self.author.username}))
         response = self.third_subscriber_authorization.get(reverse(
             self.profile, kwargs={'username': self.author.username}))
-        self.assertEqual(response.context['following'], 1)
+        self.assertIn(self.author.username, response.context['following'])
+        self.assertContains(response, reverse(
+            self.profile_unfollow, kwargs={'username': self.author.username}))
 
     def test_unsubscribe_to_user(self):
         self.third_subscriber_authorization.get(reverse(
             self.profile_unfollow, kwargs={'username': self.author.username}))
         response = self.third_subscriber_authorization.get(reverse(
             self.profile, kwargs={'username': self.author.username}))
-        self.assertEqual(response.context['following'], 0)
+        self.assertNotIn(self.author.username,
+                         response.context['following'])
 
     def test_new_post_visible_to_subscribers(self):
         self.first_subscriber_authorization.get(reverse(
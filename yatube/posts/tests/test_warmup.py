@@ -0,0 +1,65 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+from ..trending import TRENDING_KEY
+from ..warmup import hot_urls, hot_urls_from_counts, hot_urls_from_log, warm
+
+LOG = '''\
+127.0.0.1 - - [19/Oct/2026:10:00:00 +0000] "GET /group/big/ HTTP/1.1" 200 512
+127.0.0.1 - - [19/Oct/2026:10:00:01 +0000] "GET /group/big/ HTTP/1.1" 200 512
+127.0.0.1 - - [19/Oct/2026:10:00:02 +0000] "GET / HTTP/1.1" 200 512
+127.0.0.1 - - [19/Oct/2026:10:00:03 +0000] "GET /static/a.css HTTP/1.1" 200 9
+127.0.0.1 - - [19/Oct/2026:10:00:04 +0000] "GET /missing/ HTTP/1.1" 404 9
+127.0.0.1 - - [19/Oct/2026:10:00:05 +0000] "POST /new/ HTTP/1.1" 302 0
+'''
+
+
+class WarmupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.popular = User.objects.create_user(username='Popular')
+        self.reader = User.objects.create_user(username='Reader')
+        Follow.objects.create(user=self.reader, author=self.popular)
+        self.small = Group.objects.create(title='Малая', slug='small')
+        self.big = Group.objects.create(title='Большая', slug='big')
+        Post.objects.create(author=self.reader, group=self.small, text='1')
+        for number in range(3):
+            Post.objects.create(
+                author=self.popular, group=self.big, text=str(number))
+
+    def test_urls_from_log(self):
+        """Функция проверяет выбор частых страниц из журнала доступа."""
+        self.assertEqual(hot_urls_from_log(LOG.splitlines(), 5),
+                         ['/group/big/', '/'])
+
+    def test_urls_from_counts(self):
+        """Функция проверяет выбор групп и авторов по числу постов и
+        подписчиков."""
+        self.assertEqual(hot_urls_from_counts(1, pages=2), [
+            '/', '/?page=2', reverse('trending'),
+            reverse('group', args=['big']),
+            reverse('profile', args=['Popular']),
+        ])
+
+    def test_hot_urls_prefer_configured_log(self):
+        """Функция проверяет, что при заданном журнале доступа адреса
+        берутся из него."""
+        with tempfile.NamedTemporaryFile('w', suffix='.log') as log:
+            log.write(LOG)
+            log.flush()
+            with override_settings(CACHE_WARM_ACCESS_LOG=log.name):
+                self.assertEqual(hot_urls(5), ['/group/big/', '/'])
+        self.assertEqual(hot_urls(1)[0], reverse('index'))
+
+    def test_warm_fills_caches(self):
+        """Функция проверяет, что прогрев заполняет кеш страниц."""
+        urls = hot_urls_from_counts(5)
+        results = warm(urls, concurrency=1, host='testserver')
+        self.assertEqual({status for url, status, seconds in results}, {200})
+        self.assertIsNotNone(cache.get(TRENDING_KEY))
+        with self.assertNumQueries(0):
+            self.client.get(reverse('index'))
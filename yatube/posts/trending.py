@@ -0,0 +1,145 @@
+"""Популярные посты и группы с затухающей оценкой.
+
+Оценка затухает вдвое за TRENDING_HALF_LIFE секунд. Чтобы не
+пересчитывать все строки при каждом событии, вклад события хранится
+умноженным на 2 ** ((t - начало эры) / полураспад): тогда новое событие
+только прибавляет своё значение одним UPDATE, а порядок строк одной эры
+не зависит от текущего времени. Эра длится TRENDING_ERA секунд, чтобы
+множители не переполнялись; команда compact_trending переносит строки
+прошлых эр в текущую, удаляет затухшие и пересобирает кеш топа, так
+что страница популярного читает один ключ кеша. Посты, ожидающие
+удаления, в топ не попадают, а из уже собранного топа убираются при
+чтении.
+"""
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+
+from .hidden import pending, visible
+from .models import Group, Post, TrendingScore
+from .sharding import attach_global_relations
+
+TRENDING_KEY = 'trending:top'
+
+
+def _era(now):
+    return int(now // settings.TRENDING_ERA)
+
+
+def _growth(seconds):
+    return 2 ** (seconds / settings.TRENDING_HALF_LIFE)
+
+
+def _add(kind, object_id, era, value):
+    scores = TrendingScore.objects.filter(
+        kind=kind, object_id=object_id, era=era)
+    if scores.update(score=F('score') + value):
+        return
+    try:
+        with transaction.atomic():
+            TrendingScore.objects.create(
+                kind=kind, object_id=object_id, era=era, score=value)
+    except IntegrityError:
+        scores.update(score=F('score') + value)
+
+
+def bump(kind, object_id, amount, now=None):
+    now = time.time() if now is None else now
+    era = _era(now)
+    _add(kind, object_id, era,
+         amount * _growth(now - era * settings.TRENDING_ERA))
+
+
+def record(post, amount, now=None):
+    bump(TrendingScore.POST, post.id, amount, now)
+    if post.group_id:
+        bump(TrendingScore.GROUP, post.group_id, amount, now)
+
+
+def top_ids(kind, size):
+    """id с наибольшей оценкой, сложенной по всем эрам. Порядок от
+    текущего времени не зависит: все оценки затухают одинаково."""
+    scores = TrendingScore.objects.filter(kind=kind)
+    eras = list(scores.values_list('era', flat=True).distinct())
+    if not eras:
+        return []
+    current = max(eras) * settings.TRENDING_ERA
+    decayed = Case(
+        *[When(era=era, then=Value(
+            _growth(era * settings.TRENDING_ERA - current)))
+          for era in eras],
+        output_field=FloatField(),
+    )
+    return list(
+        scores.values('object_id')
+        .annotate(total=Sum(F('score') * decayed))
+        .order_by('-total', 'object_id')
+        .values_list('object_id', flat=True)[:size]
+    )
+
+
+def _posts_by_ids(ids):
+    if not settings.POST_SHARDS:
+        posts = visible(
+            Post.objects.select_related('author', 'group')).in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+    posts = {}
+    for alias in settings.POST_SHARDS:
+        posts.update(visible(Post.objects.using(alias)).in_bulk(ids))
+    return attach_global_relations([posts[pk] for pk in ids if pk in posts])
+
+
+def refresh():
+    size = settings.TRENDING_SIZE
+    group_ids = top_ids(TrendingScore.GROUP, size)
+    groups = Group.objects.in_bulk(group_ids)
+    top = {
+        'posts': _posts_by_ids(top_ids(TrendingScore.POST, size)),
+        'groups': [groups[pk] for pk in group_ids if pk in groups],
+    }
+    cache.set(TRENDING_KEY, top, settings.TRENDING_TIMEOUT)
+    return top
+
+
+def trending():
+    top = cache.get(TRENDING_KEY)
+    if top is None:
+        top = refresh()
+    author_ids, post_ids = pending()
+    if author_ids or post_ids:
+        top = {**top, 'posts': [
+            post for post in top['posts']
+            if post.author_id not in author_ids and post.id not in post_ids
+        ]}
+    return top
+
+
+def compact(now=None):
+    """Переносит оценки прошлых эр в текущую и удаляет затухшие.
+    Возвращает число выбывших из рейтинга постов и групп."""
+    now = time.time() if now is None else now
+    era = _era(now)
+    era_start = era * settings.TRENDING_ERA
+    with transaction.atomic():
+        old = TrendingScore.objects.filter(era__lt=era)
+        merged = defaultdict(float)
+        for kind, object_id, row_era, score in old.values_list(
+                'kind', 'object_id', 'era', 'score'):
+            merged[kind, object_id] += score * _growth(
+                row_era * settings.TRENDING_ERA - era_start)
+        old.delete()
+        dropped = 0
+        for (kind, object_id), score in merged.items():
+            if score >= settings.TRENDING_MIN_SCORE:
+                _add(kind, object_id, era, score)
+            else:
+                dropped += 1
+        threshold = settings.TRENDING_MIN_SCORE * _growth(now - era_start)
+        dropped += TrendingScore.objects.filter(
+            score__lt=threshold).delete()[0]
+    refresh()
+    return dropped
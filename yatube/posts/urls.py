@@ -7,6 +7,7 @@ urlpatterns = [
     path('new/', views.new_post, name='new_post'),
     path('group/<slug:slug>/', views.group_posts, name='group'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('trending/', views.trending_index, name='trending'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
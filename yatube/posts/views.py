@@ -1,54 +1,100 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from core.page_cache import shared_page
+from core.streaming import stream_render
+
+from .archive import with_archive
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .hidden import pending
+from .lookups import get_group_or_404, get_user_or_404
+from .models import ArchivedPost, Follow, Post, Recommendation, User
+from .paginator import feed_page
+from .trending import trending
 
 
-@cache_page(20)
+@shared_page(20, scopes=('index',))
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, settings.NUMBER_OF_POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = with_archive(
+        Post.objects.all(), ArchivedPost.objects.all(), 'index',
+        cache_ids=True,
+    )
+    page = feed_page(request, post_list)
     return render(request, 'misc/index.html', {'page': page, })
 
 
+def trending_index(request):
+    return render(request, 'posts/trending.html', trending())
+
+
+@shared_page(scopes=('group:{slug}',))
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group)
-    paginator = Paginator(posts, settings.NUMBER_OF_POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'posts/group.html', {
+    group = get_group_or_404(slug)
+    posts = with_archive(
+        Post.objects.filter(group_id=group.id),
+        ArchivedPost.objects.filter(group_id=group.id),
+        f'group:{group.id}', cache_ids=True,
+    )
+    page = feed_page(request, posts)
+    return stream_render(request, 'posts/group.html', {
         'group': group, 'page': page,
     })
 
 
+@shared_page(scopes=('user:{username}',))
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    number_of_posts = Post.objects.filter(author_id=user.id).count()
-    paginator = Paginator(user.posts.all(), settings.NUMBER_OF_POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    following = request.user.is_authenticated and (Follow.objects.filter(
-        user=request.user, author=user).exists())
-    return render(request, 'misc/profile.html', {
+    user = get_user_or_404(username)
+    posts = with_archive(
+        user.posts.all(), user.archived_posts.all(), f'profile:{user.id}',
+        author_ids=[user.id], cache_ids=True,
+    )
+    page = feed_page(request, posts)
+    number_of_posts = page.paginator.count
+    return stream_render(request, 'misc/profile.html', {
         'number_of_posts': number_of_posts, 'page': page, 'author': user,
-        'following': following,
     })
 
 
+def get_suggestions(user):
+    if not user.is_authenticated:
+        return Recommendation.objects.none()
+    followed = Follow.objects.filter(user=user).values('author_id')
+    return Recommendation.objects.filter(
+        user=user, author__is_active=True,
+    ).exclude(author_id__in=followed).select_related(
+        'author')[:settings.RECOMMENDATIONS_SHOWN]
+
+
+def personal_context(user):
+    """Личный контекст фрагментов общего кеша страниц."""
+    return {
+        'following': set(Follow.objects.filter(user=user).values_list(
+            'author__username', flat=True)),
+        'suggestions': list(get_suggestions(user)),
+    }
+
+
+def get_post_or_404(username, post_id, archived=False):
+    author = get_user_or_404(username)
+    post = author.posts.filter(id=post_id).first()
+    if post is None and archived:
+        post = author.archived_posts.filter(id=post_id).first()
+    if post is None or post.id in pending()[1]:
+        raise Http404
+    return post
+
+
+@shared_page(scopes=('user:{username}',))
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post.objects.select_related('author'), id=post_id,
-                             author__username=username)
+    post = get_post_or_404(username, post_id, archived=True)
     form = CommentForm()
     comments = post.comments.all()
-    return render(request, 'posts/post.html', {
-        'number_of_posts': post.author.posts.count(), 'post': post,
+    number_of_posts = (post.author.posts.count()
+                       + post.author.archived_posts.count())
+    return stream_render(request, 'posts/post.html', {
+        'number_of_posts': number_of_posts, 'post': post,
         'author': post.author, 'form': form, 'comments': comments
     })
 
@@ -72,7 +118,7 @@ def new_post(request):
 
 @login_required
 def post_edit(request, username, post_id):
-    post = get_object_or_404(Post, pk=post_id, author__username=username)
+    post = get_post_or_404(username, post_id)
     if request.user != post.author:
         return redirect('posts', username=username, post_id=post_id)
     form = PostForm(request.POST or None, files=request.FILES or None,
@@ -98,7 +144,7 @@ def server_error(request):
 
 @login_required
 def add_comment(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_post_or_404(username, post_id)
     comments = post.comments.all()
     form = CommentForm(request.POST or None)
     if form.is_valid():
@@ -114,11 +160,17 @@ def add_comment(request, username, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, settings.NUMBER_OF_POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(request, 'posts/follow.html', {'page': page, })
+    author_ids = list(Follow.objects.filter(
+        user=request.user).values_list('author_id', flat=True))
+    posts = with_archive(
+        Post.objects.filter(author_id__in=author_ids),
+        ArchivedPost.objects.filter(author_id__in=author_ids),
+        f'follow:{request.user.id}', author_ids=author_ids,
+    )
+    page = feed_page(request, posts)
+    return stream_render(request, 'posts/follow.html', {
+        'page': page, 'suggestions': get_suggestions(request.user),
+    })
 
 
 @login_required
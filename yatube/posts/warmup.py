@@ -0,0 +1,105 @@
+"""Прогрев кешей после выкладки.
+
+Самые посещаемые адреса берутся из журнала доступа или, без журнала,
+из числа постов в группах и подписчиков у авторов. Страницы
+рендерятся целиком через тестовый клиент Django в нескольких потоках:
+заполняются кеш страниц, счётчики лент, кеш популярного и миниатюры
+sorl. Прогрев идёт в самом рабочем процессе при старте
+(CACHE_WARM_ON_START): кеш страниц и популярного у каждого процесса
+свой, и отдельная команда прогрела бы только собственный.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from .models import Group, Post, User
+
+LOG_REQUEST = re.compile(
+    r'"GET (?P<path>/\S*) HTTP/[\d.]+" (?P<status>\d{3})')
+SKIPPED_PREFIXES = ('/static/', '/media/', '/admin/', '/auth/')
+
+_local = threading.local()
+
+
+def hot_urls_from_log(lines, limit):
+    """Самые частые успешные GET-запросы к страницам из журнала
+    в common/combined log format."""
+    hits = Counter()
+    for line in lines:
+        match = LOG_REQUEST.search(line)
+        if (match and match['status'] == '200'
+                and not match['path'].startswith(SKIPPED_PREFIXES)):
+            hits[match['path']] += 1
+    return [path for path, count in hits.most_common(limit)]
+
+
+def _group_post_counts():
+    counts = Counter()
+    for alias in settings.POST_SHARDS or ['default']:
+        counts.update(dict(
+            Post.objects.using(alias).exclude(group_id=None).order_by()
+            .values_list('group_id').annotate(posts=Count('id'))
+        ))
+    return counts
+
+
+def hot_urls_from_counts(limit, pages=1):
+    """Лента, популярное, крупнейшие группы и авторы с наибольшим
+    числом подписчиков."""
+    index = reverse('index')
+    urls = [index] + [f'{index}?page={page}' for page in range(2, pages + 1)]
+    urls.append(reverse('trending'))
+    group_ids = [pk for pk, count in _group_post_counts().most_common(limit)]
+    slugs = Group.objects.in_bulk(group_ids)
+    urls += [reverse('group', args=[slugs[pk].slug])
+             for pk in group_ids if pk in slugs]
+    usernames = (
+        User.objects.filter(is_active=True)
+        .annotate(followers=Count('following'))
+        .order_by('-followers', 'id')
+        .values_list('username', flat=True)[:limit]
+    )
+    urls += [reverse('profile', args=[username]) for username in usernames]
+    return urls
+
+
+def render_url(url, host):
+    client = getattr(_local, 'client', None)
+    if client is None:
+        client = _local.client = Client(HTTP_HOST=host)
+    started = time.monotonic()
+    response = client.get(url)
+    if response.streaming:
+        for chunk in response.streaming_content:
+            pass
+    response.close()
+    return url, response.status_code, time.monotonic() - started
+
+
+def hot_urls(limit):
+    """Адреса для прогрева: из CACHE_WARM_ACCESS_LOG, если он задан,
+    иначе по числу постов и подписчиков."""
+    if settings.CACHE_WARM_ACCESS_LOG:
+        with open(settings.CACHE_WARM_ACCESS_LOG, errors='replace') as log:
+            return hot_urls_from_log(log, limit)
+    return hot_urls_from_counts(limit)
+
+
+def warm(urls, concurrency=4, host=None):
+    """Рендерит адреса не больше чем в concurrency потоков.
+    Возвращает (адрес, статус, секунды) в исходном порядке."""
+    host = host or next((
+        allowed.lstrip('.') for allowed in settings.ALLOWED_HOSTS
+        if allowed != '*'
+    ), 'localhost')
+    if concurrency <= 1:
+        return [render_url(url, host) for url in urls]
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(lambda url: render_url(url, host), urls))
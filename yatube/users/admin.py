@@ -0,0 +1,29 @@
+from django.contrib import admin, messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from posts.deletion import schedule_user_deletion
+
+User = get_user_model()
+
+
+class BackgroundDeleteUserAdmin(UserAdmin):
+    """Удаление ставится в очередь process_deletions вместо каскада
+    Collector прямо в запросе админки."""
+
+    def get_deleted_objects(self, objs, request):
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        schedule_user_deletion(obj)
+        self.message_user(
+            request, f'{obj} скрыт и будет удалён в фоне.', messages.INFO
+        )
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            schedule_user_deletion(user)
+
+
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeleteUserAdmin)
@@ -1,10 +1,21 @@
+from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm
 
 User = get_user_model()
 
+# Первые сегменты адресов posts: профиль с таким именем перекрыт ими.
+RESERVED_USERNAMES = frozenset(
+    ('new', 'group', 'follow', 'trending', '404', '500'))
+
 
 class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+    def clean_username(self):
+        username = self.cleaned_data['username']
+        if username.lower() in RESERVED_USERNAMES:
+            raise forms.ValidationError('Это имя пользователя занято.')
+        return username
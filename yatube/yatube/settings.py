@@ -1,4 +1,5 @@
 import os
+import tempfile
 from os.path import join
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -17,7 +18,8 @@ ALLOWED_HOSTS = [
 INSTALLED_APPS = [
     'about',
     'users',
-    'posts',
+    'posts.apps.PostsConfig',
+    'core.apps.CoreConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -28,24 +30,67 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.tracing.TracingMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
+    'core.profiling.CProfileMiddleware',
+    'core.template_profiling.TemplateProfilerMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.static.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.replication.ReplicaMiddleware',
+    'core.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
+CPROFILE_SAMPLE_RATE = 0.0
+CPROFILE_TOKEN_MAX_AGE = 60 * 60
+CPROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+CPROFILE_STACK_INTERVAL = 0.005
+
+METRICS_ENABLED = True
+METRICS_DIR = os.environ.get(
+    'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'yatube-metrics'))
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+
+SLOW_QUERY_THRESHOLD = 0.2
+SLOW_QUERY_LOG = os.path.join(BASE_DIR, 'logs', 'slow_queries.jsonl')
+# Журнал ротирует logrotate; столько его копий читает slow_queries.
+SLOW_QUERY_LOG_BACKUPS = 5
+
+TRACE_SAMPLE_RATE = 0.0 if DEBUG else 0.01
+TRACE_FILE = os.path.join(BASE_DIR, 'traces', 'trace.json')
+
+MEMORY_DIAGNOSTICS = False
+MEMORY_SNAPSHOT_INTERVAL = 15 * 60
+MEMORY_TRACEBACK_FRAMES = 5
+MEMORY_REPORT_TOP = 15
+MEMORY_DIR = os.path.join(BASE_DIR, 'memory')
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+TEMPLATE_PROFILING = False
+TEMPLATE_PRECOMPILE = not DEBUG
+STREAM_RESPONSES = not DEBUG
+STREAM_CHUNK_SIZE = 8192
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR, join(BASE_DIR, 'templates/users')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if TEMPLATE_PRECOMPILE else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'yatube.context_processors.year',
                 'django.template.context_processors.debug',
@@ -59,13 +104,51 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.sqlite_backend',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'timeout': 20,
+            'pragmas': SQLITE_PRAGMAS,
+            'immediate_transactions': True,
+            'serialize_writes': False,
+        },
     }
 }
 
+POST_SHARD_COUNT = 0
+POST_SHARDS = [f'posts_shard_{i}' for i in range(POST_SHARD_COUNT)]
+DATABASES.update({
+    alias: {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'{alias}.sqlite3'),
+        'OPTIONS': {
+            **DATABASES['default']['OPTIONS'],
+            'pragmas': {**SQLITE_PRAGMAS, 'foreign_keys': 'OFF'},
+        },
+    }
+    for alias in POST_SHARDS
+})
+
+DATABASE_ROUTERS = [
+    'posts.sharding.ShardRouter',
+    'core.replication.ReplicaRouter',
+]
+DATABASE_REPLICAS = []
+REPLICA_READ_VIEWS = ('index', 'group', 'profile', 'posts')
+REPLICA_MAX_LAG = 5
+REPLICA_PIN_SECONDS = 10
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -97,21 +180,103 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static/img'),
 ]
+if not DEBUG:
+    STATICFILES_STORAGE = 'core.static.CompressedManifestStorage'
+STATIC_COMPRESS_MIN_SIZE = 512
+STATIC_MAX_AGE = 3600
+
+AUTHENTICATION_BACKENDS = ['core.auth.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = 300
+
+SESSION_ENGINE = 'core.sessions'
+# Отложенные изменения сессий и их очередь должны видеть и воркеры,
+# и команда flush_sessions.
+SESSION_CACHE_ALIAS = 'shared'
+SESSION_WRITE_BEHIND = True
 
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = 'index'
 
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+EMAIL_BACKEND = 'core.mail.QueuedEmailBackend'
+EMAIL_DELIVERY_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_RETRY_BACKOFF = 60
+EMAIL_BATCH_SIZE = 100
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+JOB_QUEUES = {'default': 4, 'mail': 1, 'thumbnails': 2}
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 30
+JOB_LEASE = 10 * 60
+JOB_POLL_INTERVAL = 1.0
+JOB_SCHEDULE = {
+    'send_queued_mail': {
+        'task': 'core.mail.send_queued', 'args': [EMAIL_BATCH_SIZE],
+        'every': 60, 'queue': 'mail',
+    },
+    'compact_trending': {
+        'task': 'posts.trending.compact', 'every': 60 * 60,
+    },
+}
+
+LOOKUP_PRELOAD = not DEBUG
+CACHE_WARM_ON_START = False
+CACHE_WARM_ACCESS_LOG = None
+CACHE_WARM_LIMIT = 20
+CACHE_WARM_CONCURRENCY = 4
+
+PAGE_CACHE_TIMEOUT = 5 * 60
+PAGE_CACHE_PERSONAL_TIMEOUT = 60
+PAGE_CACHE_PERSONAL_CONTEXT = 'posts.views.personal_context'
+
 NUMBER_OF_POSTS_ON_PAGE = 10
+FEED_COUNT_TIMEOUT = 300
+FEED_IDS_SIZE = 100
+FEED_IDS_TIMEOUT = 5 * 60
+FEED_CARD_TIMEOUT = 60 * 60
+
+RATELIMIT_IP_META = 'REMOTE_ADDR'
+RATELIMITS = {
+    'new_post': {'rate': '10/m', 'methods': ('POST',)},
+    'add_comment': {'rate': '20/m', 'methods': ('POST',)},
+    'profile_follow': {'rate': '30/m', 'methods': ('GET', 'POST')},
+    'signup': {'rate': '5/h', 'methods': ('POST',)},
+}
+
+RECOMMENDATIONS_TOP_K = 10
+RECOMMENDATIONS_SHOWN = 5
+
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_ERA = 7 * 24 * 60 * 60
+TRENDING_POST_WEIGHT = 1.0
+TRENDING_COMMENT_WEIGHT = 2.0
+TRENDING_MIN_SCORE = 0.05
+TRENDING_SIZE = 20
+TRENDING_TIMEOUT = 60
+
+ARCHIVE_AFTER_DAYS = 180
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_COUNT_TIMEOUT = 60 * 60
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+DEFAULT_FILE_STORAGE = 'core.backends.FileSystemStorage'
+THUMBNAIL_BACKEND = 'core.backends.ThumbnailBackend'
+MEDIA_GC_MIN_AGE = 24 * 60 * 60
+MEDIA_GC_BATCH_SIZE = 500
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.backends.LocMemCache',
+    },
+    # Общий для всех процессов кеш: версии, маркеры и счётчики, которые
+    # должны видеть все воркеры и команды. add и incr в нём атомарны.
+    'shared': {
+        'BACKEND': 'core.backends.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'shared_cache'),
+    },
 }
+
+# Тесты получают свой каталог кеша shared и чистят его перед каждым тестом.
+TEST_RUNNER = 'core.test_runner.TestRunner'
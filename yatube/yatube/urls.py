@@ -4,6 +4,9 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core.tracing import trace_urlpatterns
+from core.views import metrics
+
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa
 
@@ -12,6 +15,7 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path("admin/", admin.site.urls),
+    path('metrics', metrics, name='metrics'),
     path("", include("posts.urls")),
 ]
 
@@ -20,3 +24,5 @@ if settings.DEBUG:
                           document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL,
                           document_root=settings.STATIC_ROOT)
+
+urlpatterns = trace_urlpatterns(urlpatterns)
@@ -1,7 +1,28 @@
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+if settings.MEMORY_DIAGNOSTICS:
+    from core.memory import start
+
+    start()
+
+if settings.TEMPLATE_PRECOMPILE:
+    from core.template_profiling import precompile_templates
+
+    precompile_templates()
+
+if settings.LOOKUP_PRELOAD:
+    from posts.lookups import preload
+
+    preload()
+
+if settings.CACHE_WARM_ON_START:
+    from posts.warmup import hot_urls, warm
+
+    warm(hot_urls(settings.CACHE_WARM_LIMIT), settings.CACHE_WARM_CONCURRENCY)